@@ -0,0 +1,63 @@
+"""Convert event date/time strings to starts_at
+
+Revision ID: 1c6f0a8e5b93
+Revises: e3b7d91f0c52
+Create Date: 2026-03-23 10:12:41.507389
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c6f0a8e5b93'
+down_revision: Union[str, None] = 'e3b7d91f0c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('starts_at', sa.DateTime(), nullable=True))
+    # Dates and times were entered as "YYYY-MM-DD" and "HH:MM"; anything else
+    # keeps its date (at midnight) or, failing that, falls back to created_at.
+    # The shape checks alone let out-of-range values such as "2024-13-45" or
+    # "25:00" through, and a bare ::timestamp cast of those aborts the whole
+    # migration, so the cast goes through a helper that returns NULL instead.
+    op.execute("""
+        CREATE FUNCTION pg_temp.try_timestamp(value text) RETURNS timestamp AS $$
+        BEGIN
+            RETURN value::timestamp;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(r"""
+        UPDATE events SET starts_at = coalesce(
+            CASE WHEN date ~ '^\d{4}-\d{2}-\d{2}$' AND time ~ '^\d{1,2}:\d{2}(:\d{2})?$'
+                THEN pg_temp.try_timestamp(date || ' ' || time) END,
+            CASE WHEN date ~ '^\d{4}-\d{2}-\d{2}$'
+                THEN pg_temp.try_timestamp(date) END,
+            created_at,
+            now()
+        )
+    """)
+    op.execute("DROP FUNCTION pg_temp.try_timestamp(text)")
+    op.alter_column('events', 'starts_at', nullable=False)
+    op.create_index('ix_events_starts_at_id', 'events', ['starts_at', 'id'], unique=False)
+    op.drop_column('events', 'time')
+    op.drop_column('events', 'date')
+
+
+def downgrade() -> None:
+    op.add_column('events', sa.Column('date', sa.String(), nullable=True))
+    op.add_column('events', sa.Column('time', sa.String(), nullable=True))
+    op.execute("""
+        UPDATE events SET date = to_char(starts_at, 'YYYY-MM-DD'), time = to_char(starts_at, 'HH24:MI')
+    """)
+    op.alter_column('events', 'date', nullable=False)
+    op.alter_column('events', 'time', nullable=False)
+    op.drop_index('ix_events_starts_at_id', table_name='events')
+    op.drop_column('events', 'starts_at')
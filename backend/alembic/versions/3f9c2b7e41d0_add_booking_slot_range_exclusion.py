@@ -0,0 +1,102 @@
+"""Add booking slot range and overlap exclusion constraint
+
+Revision ID: 3f9c2b7e41d0
+Revises: a45c9fb7d82d
+Create Date: 2026-01-08 10:14:32.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2b7e41d0'
+down_revision: Union[str, None] = 'a45c9fb7d82d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_STATUSES = "status IN ('pending', 'confirmed', 'completed')"
+# Rows without a slot range are never compared: tsrange(NULL, NULL) is unbounded and overlaps everything
+CONSTRAINT_PREDICATE = f"{ACTIVE_STATUSES} AND slot_start IS NOT NULL AND slot_end IS NOT NULL"
+# Starting hour of a time slot, with the rules of parse_time_slot() in
+# app/services/availability.py: "HH:MM", "HH:MM:SS", "H:MM AM", "H AM" or
+# "HAM" (case-insensitive, surrounding whitespace ignored). Minutes are
+# dropped, slots start on the hour. NULL when the value matches none of them.
+TIME_SLOT = "upper(regexp_replace(time_slot, '^\\s+|\\s+$', '', 'g'))"
+SLOT_HOUR = f"""
+    CASE
+        WHEN {TIME_SLOT} ~ '^(2[0-3]|[01]\\d|\\d):([0-5]\\d|\\d)(:([0-5]\\d|\\d))?$'
+            THEN substring({TIME_SLOT} from '^\\d+')::int
+        WHEN {TIME_SLOT} ~ '^(1[0-2]|0[1-9]|[1-9])(:([0-5]\\d|\\d)\\s+|\\s+|)(AM|PM)$'
+            THEN substring({TIME_SLOT} from '^\\d+')::int % 12
+                 + CASE WHEN {TIME_SLOT} LIKE '%PM' THEN 12 ELSE 0 END
+    END
+"""
+
+
+def upgrade() -> None:
+    # btree_gist lets the GiST exclusion constraint compare turf_id with "="
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.add_column('bookings', sa.Column('slot_start', sa.DateTime(), nullable=True))
+    op.add_column('bookings', sa.Column('slot_end', sa.DateTime(), nullable=True))
+
+    # Backfill from date + starting hour + duration (hours), ending at midnight
+    # at the latest, as slot_range() does
+    op.execute(
+        f"""
+        UPDATE bookings
+        SET slot_start = date + make_interval(hours => slot_hour),
+            slot_end = date + make_interval(hours => LEAST(slot_hour + GREATEST(COALESCE(duration, 1), 1), 24))
+        FROM (SELECT id AS slot_id, {SLOT_HOUR} AS slot_hour FROM bookings) AS slots
+        WHERE bookings.id = slots.slot_id AND slot_hour IS NOT NULL
+        """
+    )
+
+    # An active booking whose slot cannot be parsed cannot be checked for
+    # overlaps; it has to be fixed by hand
+    unparseable = [] if context.is_offline_mode() else op.get_bind().execute(sa.text(
+        f"""
+        SELECT id, date, time_slot FROM bookings
+        WHERE {ACTIVE_STATUSES} AND slot_start IS NULL
+        ORDER BY date, id
+        """
+    )).all()
+    if unparseable:
+        listing = "\n".join(f"  {row.id} {row.date} {row.time_slot!r}" for row in unparseable)
+        raise RuntimeError(
+            f"Found {len(unparseable)} active bookings with an unrecognised time_slot. "
+            f"Correct or cancel them before applying this migration:\n{listing}"
+        )
+
+    conflicts = 0 if context.is_offline_mode() else op.get_bind().execute(sa.text(
+        f"""
+        SELECT count(*) FROM bookings a
+        JOIN bookings b ON a.turf_id = b.turf_id AND a.id < b.id
+        WHERE a.{ACTIVE_STATUSES} AND b.{ACTIVE_STATUSES}
+          AND a.slot_start IS NOT NULL AND b.slot_start IS NOT NULL
+          AND tsrange(a.slot_start, a.slot_end) && tsrange(b.slot_start, b.slot_end)
+        """
+    )).scalar()
+    if conflicts:
+        raise RuntimeError(
+            f"Found {conflicts} pairs of overlapping active bookings. "
+            "Cancel or reschedule them before applying this migration."
+        )
+
+    op.execute(
+        f"""
+        ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlapping_slots
+        EXCLUDE USING gist (turf_id WITH =, tsrange(slot_start, slot_end) WITH &&)
+        WHERE ({CONSTRAINT_PREDICATE})
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('bookings_no_overlapping_slots', 'bookings')
+    op.drop_column('bookings', 'slot_end')
+    op.drop_column('bookings', 'slot_start')
@@ -0,0 +1,33 @@
+"""Add payment callback queue columns
+
+Revision ID: 46987d139a09
+Revises: eab60c4b1f84
+Create Date: 2026-02-24 11:53:18.640377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '46987d139a09'
+down_revision: Union[str, None] = 'eab60c4b1f84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('payment_callbacks', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('payment_callbacks', sa.Column('last_error', sa.String(), nullable=True))
+    op.create_index(
+        'ix_payment_callbacks_unprocessed', 'payment_callbacks', ['received_at'],
+        unique=False, postgresql_where=sa.text('processed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_callbacks_unprocessed', table_name='payment_callbacks')
+    op.drop_column('payment_callbacks', 'last_error')
+    op.drop_column('payment_callbacks', 'attempts')
@@ -0,0 +1,33 @@
+"""Add notification feed indexes
+
+Revision ID: 5d2a8f3c9e17
+Revises: 46987d139a09
+Create Date: 2026-03-02 10:14:06.392871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a8f3c9e17'
+down_revision: Union[str, None] = '46987d139a09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_notifications_user_id_created_at_id', 'notifications', ['user_id', 'created_at', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_notifications_unread_user_id', 'notifications', ['user_id'],
+        unique=False, postgresql_where=sa.text('read IS NOT TRUE')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_unread_user_id', table_name='notifications')
+    op.drop_index('ix_notifications_user_id_created_at_id', table_name='notifications')
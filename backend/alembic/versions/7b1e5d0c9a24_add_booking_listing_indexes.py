@@ -0,0 +1,30 @@
+"""Add booking listing indexes
+
+Revision ID: 7b1e5d0c9a24
+Revises: 3f9c2b7e41d0
+Create Date: 2026-01-15 09:02:47.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e5d0c9a24'
+down_revision: Union[str, None] = '3f9c2b7e41d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_bookings_created_at_id', 'bookings', ['created_at', 'id'], unique=False)
+    op.create_index('ix_bookings_user_id_created_at_id', 'bookings', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_bookings_turf_id_date', 'bookings', ['turf_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_turf_id_date', table_name='bookings')
+    op.drop_index('ix_bookings_user_id_created_at_id', table_name='bookings')
+    op.drop_index('ix_bookings_created_at_id', table_name='bookings')
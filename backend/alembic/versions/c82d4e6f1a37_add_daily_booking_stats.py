@@ -0,0 +1,45 @@
+"""Add daily booking stats rollup
+
+Revision ID: c82d4e6f1a37
+Revises: 7b1e5d0c9a24
+Create Date: 2026-02-03 14:41:09.870213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c82d4e6f1a37'
+down_revision: Union[str, None] = '7b1e5d0c9a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_booking_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('turf_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['turf_id'], ['turfs.id'], ),
+    sa.PrimaryKeyConstraint('day', 'turf_id', 'status')
+    )
+
+    # Initial population; later rebuilds can use backfill_stats.py
+    op.execute(
+        """
+        INSERT INTO daily_booking_stats (day, turf_id, status, bookings, revenue)
+        SELECT CAST(created_at AS DATE), turf_id, COALESCE(status, 'pending'), count(*), COALESCE(sum(amount), 0)
+        FROM bookings
+        WHERE created_at IS NOT NULL
+        GROUP BY CAST(created_at AS DATE), turf_id, COALESCE(status, 'pending')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_booking_stats')
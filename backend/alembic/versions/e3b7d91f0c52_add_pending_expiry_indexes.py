@@ -0,0 +1,34 @@
+"""Add pending expiry indexes
+
+Revision ID: e3b7d91f0c52
+Revises: 9a41c6e2d8b5
+Create Date: 2026-03-16 09:47:12.830514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7d91f0c52'
+down_revision: Union[str, None] = '9a41c6e2d8b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_payments_pending_created_at', 'payments', ['created_at'],
+        unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index(
+        'ix_bookings_pending_created_at', 'bookings', ['created_at'],
+        unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_pending_created_at', table_name='bookings')
+    op.drop_index('ix_payments_pending_created_at', table_name='payments')
@@ -0,0 +1,36 @@
+"""Add payment callbacks table
+
+Revision ID: eab60c4b1f84
+Revises: c82d4e6f1a37
+Create Date: 2026-02-19 16:27:55.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eab60c4b1f84'
+down_revision: Union[str, None] = 'c82d4e6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('payment_callbacks',
+    sa.Column('dedupe_key', sa.String(), nullable=False),
+    sa.Column('checkout_request_id', sa.String(), nullable=False),
+    sa.Column('result_code', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('dedupe_key')
+    )
+    op.create_index(op.f('ix_payment_callbacks_checkout_request_id'), 'payment_callbacks', ['checkout_request_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payment_callbacks_checkout_request_id'), table_name='payment_callbacks')
+    op.drop_table('payment_callbacks')
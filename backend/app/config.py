@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from pydantic import field_validator, Field
 from functools import lru_cache
 from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class Settings(BaseSettings):
     # App Config
@@ -13,9 +14,16 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_MODE: str = "queue"  # queue (pool in each worker) or pgbouncer (no pool, behind an external PgBouncer)
     DB_POOL_SIZE: int = 20
     DB_MAX_OVERFLOW: int = 40
     DB_POOL_RECYCLE: int = 3600
+    DB_POOL_TIMEOUT: float = 30  # Seconds a request waits for a free connection before failing
+    DB_MAX_CONNECTIONS: int = 0  # Connections all workers together may open; caps the pool of each (0 = no cap)
+    DB_RESERVED_CONNECTIONS: int = 5  # Left out of DB_MAX_CONNECTIONS for migrations, psql and cron jobs
+    WEB_CONCURRENCY: int = 1  # Worker processes (the variable uvicorn --workers defaults to)
+    DB_POOL_PRE_PING: bool = False  # Ping every connection on checkout (one extra round trip per request)
+    DB_HEALTHCHECK_INTERVAL: int = 30  # Seconds between background liveness checks of the pool (0 = off)
 
     # Firebase Credentials (for backend admin SDK)
     FIREBASE_PROJECT_ID: Optional[str] = None
@@ -23,6 +31,13 @@ class Settings(BaseSettings):
     FIREBASE_CLIENT_EMAIL: Optional[str] = None
     FIREBASE_SERVICE_ACCOUNT_PATH: Optional[str] = "firebase-service-account.json"
 
+    # Authentication caches (per worker)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # Verified ID tokens kept until their "exp"
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 60  # Seconds a cached user row may lag behind the database
+    AUTH_VERIFY_WORKERS: int = 4  # Threads dedicated to Firebase token verification
+    AUTH_VERIFY_MAX_PENDING: int = 256  # Verifications allowed in flight before answering 503
+
     # M-Pesa Credentials
     MPESA_CONSUMER_KEY: str
     MPESA_CONSUMER_SECRET: str
@@ -30,6 +45,77 @@ class Settings(BaseSettings):
     MPESA_SHORTCODE: str
     MPESA_ENV: str = "sandbox"
     CALLBACK_URL: Optional[str] = None  # Required in production
+    MPESA_BASE_URL: Optional[str] = None  # Override the Daraja host (e.g. a local stub)
+    MPESA_MAX_CONNECTIONS: int = 20
+    MPESA_TOKEN_REFRESH_MARGIN: int = 300  # Refresh the OAuth token this many seconds before expiry
+    MPESA_CALLBACK_MODE: str = "sync"  # sync: apply before acknowledging, queue: enqueue and acknowledge
+    CALLBACK_WORKERS: int = 2  # Queue drainers per process (queue mode)
+    CALLBACK_BATCH_SIZE: int = 100
+    CALLBACK_POLL_INTERVAL: float = 1.0
+    CALLBACK_MAX_ATTEMPTS: int = 5  # Give up on a queued callback after this many failures
+    PAYMENT_EVENTS_TIMEOUT: int = 300  # Longest a payment event stream stays open (seconds)
+
+    # Expiry sweeper (one worker at a time, elected with a Postgres advisory lock)
+    SWEEPER_ENABLED: bool = True
+    SWEEPER_INTERVAL_SECONDS: int = 60
+    SWEEPER_BATCH_SIZE: int = 500  # Rows expired per UPDATE
+    PAYMENT_PENDING_TTL_MINUTES: int = 15  # Pending payments older than this become "expired"
+    BOOKING_PENDING_TTL_MINUTES: int = 60  # Unpaid pending bookings older than this are cancelled (0 = never)
+    SWEEPER_RECONCILE: bool = False  # Ask Daraja's STK query API before expiring a payment
+    SWEEPER_RECONCILE_LIMIT: int = 20  # STK queries per sweep
+
+    # Server-Sent Events
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_RETRY_MS: int = 5000  # Reconnect delay suggested to EventSource clients
+    SSE_MAX_QUEUED_EVENTS: int = 100  # Per-connection buffer before backpressure kicks in
+    NOTIFICATION_REPLAY_LIMIT: int = 100  # Missed notifications resent on reconnect (Last-Event-ID)
+
+    # Notifications
+    NOTIFICATION_COUNT_CACHE_SIZE: int = 10000
+    NOTIFICATION_COUNT_CACHE_TTL: int = 60  # Seconds a cached unread count may miss other workers' writes
+    FANOUT_BATCH_SIZE: int = 5000  # Notifications inserted (and committed) per fan-out batch
+
+    # Pub/sub fan-out between worker processes
+    PUBSUB_BACKEND: str = "memory"  # memory (single worker) or postgres (LISTEN/NOTIFY bridge)
+    PUBSUB_DATABASE_URL: Optional[str] = None  # Direct (session-mode) connection; defaults to DATABASE_URL
+    PUBSUB_CHANNEL: str = "goalhub_events"
+
+    # Rate limiting: comma separated "path_prefix=requests/seconds" policies
+    RATE_LIMITS: str = "/api/stkpush=10/900"
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (single worker) or redis (shared)
+    RATE_LIMIT_SWEEP_SECONDS: int = 60  # Evict idle in-memory keys this often
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Bookings
+    VENUE_TIMEZONE: str = "Africa/Nairobi"  # IANA zone of the venues; event times are wall-clock times in it
+    OPENING_HOUR: int = 8  # First bookable hour (inclusive)
+    CLOSING_HOUR: int = 23  # Last bookable hour (exclusive)
+    AVAILABILITY_REFRESH_SECONDS: int = 60  # Rebuild the occupancy index this often
+    AVAILABILITY_MAX_DAYS: int = 31  # Longest range accepted by availability queries
+
+    # Turf catalogue (GET /api/turfs/)
+    TURF_CATALOG_CACHE_TTL: int = 300  # Seconds a worker may serve a catalogue changed by another worker
+    TURF_CATALOG_MAX_AGE: int = 60  # Cache-Control max-age for clients, which then revalidate with the ETag
+
+    # Events
+    EVENTS_MAX_AGE: int = 60  # Cache-Control max-age of the public event listing
+
+    # Dashboard
+    DASHBOARD_CACHE_TTL: int = 30  # Seconds a dashboard payload is shared between callers
+
+    # Observability
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json (one object per line) or text
+    LOG_SAMPLE_RATES: str = ""  # "EVENT=rate" pairs, e.g. "CALLBACK_RECEIVED=0.1" keeps 10% of those events
+    METRICS_ENABLED: bool = True  # Record request/query/M-Pesa metrics and serve them at /metrics
+    QUERY_BUDGET_ENABLED: bool = False  # Check requests against their query budgets (development/CI)
+    QUERY_BUDGET_MAX_QUERIES: int = 20  # Default queries allowed per request (0 = unlimited)
+    QUERY_BUDGET_MAX_SECONDS: float = 0  # Default database time allowed per request (0 = unlimited)
+    QUERY_BUDGET_MAX_REPEATS: int = 3  # Runs of one statement shape before it is flagged as N+1 (0 = off)
+    QUERY_BUDGET_SLOW_QUERY_SECONDS: float = 0.25  # Single statements slower than this are flagged (0 = off)
+
+    # Responses
+    VALIDATE_LIST_RESPONSES: bool = False  # Re-validate list endpoint rows against their schema (development aid)
 
     @field_validator('CALLBACK_URL')
     @classmethod
@@ -53,6 +139,56 @@ class Settings(BaseSettings):
             raise ValueError('MPESA_ENV must be either "sandbox" or "production"')
         return v
 
+    @field_validator('MPESA_CALLBACK_MODE')
+    @classmethod
+    def validate_callback_mode(cls, v: str) -> str:
+        """Validate M-Pesa callback processing mode"""
+        if v not in ['sync', 'queue']:
+            raise ValueError('MPESA_CALLBACK_MODE must be either "sync" or "queue"')
+        return v
+
+    @field_validator('RATE_LIMIT_BACKEND')
+    @classmethod
+    def validate_rate_limit_backend(cls, v: str) -> str:
+        """Validate rate limit store"""
+        if v not in ['memory', 'redis']:
+            raise ValueError('RATE_LIMIT_BACKEND must be either "memory" or "redis"')
+        return v
+
+    @field_validator('DB_POOL_MODE')
+    @classmethod
+    def validate_db_pool_mode(cls, v: str) -> str:
+        """Validate database pooling mode"""
+        if v not in ['queue', 'pgbouncer']:
+            raise ValueError('DB_POOL_MODE must be either "queue" or "pgbouncer"')
+        return v
+
+    @field_validator('PUBSUB_BACKEND')
+    @classmethod
+    def validate_pubsub_backend(cls, v: str) -> str:
+        """Validate pub/sub backend"""
+        if v not in ['memory', 'postgres']:
+            raise ValueError('PUBSUB_BACKEND must be either "memory" or "postgres"')
+        return v
+
+    @field_validator('VENUE_TIMEZONE')
+    @classmethod
+    def validate_venue_timezone(cls, v: str) -> str:
+        """Validate venue timezone name"""
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f'VENUE_TIMEZONE must be an IANA timezone name (e.g. "Africa/Nairobi"), got "{v}"')
+        return v
+
+    @field_validator('LOG_FORMAT')
+    @classmethod
+    def validate_log_format(cls, v: str) -> str:
+        """Validate log output format"""
+        if v not in ['json', 'text']:
+            raise ValueError('LOG_FORMAT must be either "json" or "text"')
+        return v
+
     @field_validator('ALLOWED_ORIGINS')
     @classmethod
     def validate_origins(cls, v: str) -> str:
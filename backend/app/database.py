@@ -1,17 +1,174 @@
+import time
+import uuid
+from typing import Optional, Tuple
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from app.config import settings
+from app.utils.metrics import DB_BUCKETS, Histogram, current_request
+
+db_query_seconds = Histogram("db_query_duration_seconds", "Database query latency", ("operation",), buckets=DB_BUCKETS)
+db_pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection (including new connects)",
+    buckets=DB_BUCKETS,
+)
+
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+class _TimedCheckout:
+    """Records how long every checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    """Opens a connection per checkout, so its checkout time is the connect time"""
+
+
+def pool_limits(max_connections: int, reserved: int, workers: int, pool_size: int, max_overflow: int,
+                dedicated: int = 0) -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) for one worker process. With a connection
+    budget, the budget minus the reserved connections is split evenly between
+    the workers, less the connections each opens outside the pool
+    (`dedicated`); the configured pool size is kept if it fits and the rest
+    of the worker's share becomes overflow.
+    """
+    if not max_connections:
+        return pool_size, max_overflow
+    per_worker = (max_connections - reserved) // max(workers, 1) - dedicated
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} leaves no connections for {workers} workers "
+            f"({reserved} reserved, {dedicated} per worker outside the pool)"
+        )
+    size = min(pool_size, per_worker)
+    return size, per_worker - size
+
+
+def unique_statement_name() -> str:
+    # PgBouncer may run the next transaction on a server connection that already has a statement of this name
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def engine_options(mode: Optional[str] = None, pool_size: Optional[int] = None,
+                   max_overflow: Optional[int] = None, pre_ping: Optional[bool] = None) -> dict:
+    """create_async_engine() arguments for a pooling mode (defaults from settings)"""
+    mode = mode or settings.DB_POOL_MODE
+    instrumented = settings.METRICS_ENABLED
+    if mode == "pgbouncer":
+        # PgBouncer (transaction mode) pools the server connections; a second
+        # pool here would only hold PgBouncer slots idle. Prepared statements
+        # live on one server connection, so asyncpg must not cache them.
+        return {
+            "poolclass": InstrumentedNullPool if instrumented else NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": unique_statement_name,
+            },
+        }
+
+    default_size, default_overflow = pool_limits(
+        settings.DB_MAX_CONNECTIONS, settings.DB_RESERVED_CONNECTIONS, settings.WEB_CONCURRENCY,
+        settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW,
+        dedicated=1 if settings.PUBSUB_BACKEND == "postgres" else 0,  # The LISTEN connection
+    )
+    return {
+        "poolclass": InstrumentedQueuePool if instrumented else AsyncAdaptedQueuePool,
+        "pool_size": default_size if pool_size is None else pool_size,
+        "max_overflow": default_overflow if max_overflow is None else max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        # Off by default: the pool health check finds dead connections in the background
+        "pool_pre_ping": settings.DB_POOL_PRE_PING if pre_ping is None else pre_ping,
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Recycle connections after specified seconds
+    }
+
 
 # Create Async Engine with connection pooling
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.NODE_ENV == "development",
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections after specified seconds
+    **engine_options(),
 )
 
+
+class PoolEvents:
+    """Connections opened and invalidated by an engine's pool"""
+
+    def __init__(self):
+        self.connects = 0
+        self.invalidations = 0
+
+    def attach(self, target) -> None:
+        pool = getattr(target, "sync_engine", target).pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+
+pool_events = PoolEvents()
+pool_events.attach(engine)
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    stats = {"mode": settings.DB_POOL_MODE, "connects": pool_events.connects, "invalidations": pool_events.invalidations}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = statement.lstrip()[:6].upper()
+    db_query_seconds.labels(operation if operation in QUERY_OPERATIONS else "OTHER").observe(elapsed)
+
+    # The request's context reaches here through SQLAlchemy's greenlet bridge
+    request = current_request.get()
+    if request is not None:
+        request.queries += 1
+        request.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+if settings.METRICS_ENABLED:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
 # Create Async Session Factory
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
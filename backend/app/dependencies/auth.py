@@ -1,17 +1,44 @@
 import firebase_admin
 from firebase_admin import auth, credentials
-from fastapi import Depends, HTTPException, status, Security
+from fastapi import Depends, HTTPException, Query, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.database import get_db
 from app.models.user import User
 from app.config import settings
+from app.utils.cache import LRUCache
+from app.services.dashboard import invalidate_dashboard_cache
+from uuid import UUID
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
 import os
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # Initialize HTTP Bearer security scheme
 security = HTTPBearer()
+# Same scheme without the automatic 403, for endpoints that also accept other credentials
+optional_security = HTTPBearer(auto_error=False)
+
+# Decoded token claims keyed by SHA-256 of the token, kept until the token's "exp"
+token_cache = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+
+# User rows keyed by Firebase uid. The TTL bounds staleness for writes made by other workers.
+user_cache = LRUCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+# Most statements authenticate() runs for one request: on a cold cache the user
+# lookup, plus the INSERT and the refresh SELECT on first sign-in. Routes behind
+# get_current_user add this to their own count in @query_budget.
+AUTH_MAX_QUERIES = 3
+
+def invalidate_cached_user(user_id: UUID) -> None:
+    """Drop a user from the lookup cache after its row was updated or deleted"""
+    user_cache.discard_where(lambda user: user.id == user_id)
 
 # Variable to track if Firebase Admin is initialized
 firebase_app = None
@@ -32,13 +59,13 @@ def get_firebase_app():
             }
             cred = credentials.Certificate(cred_dict)
             firebase_app = firebase_admin.initialize_app(cred)
-            print("✅ Firebase Admin initialized with environment variables")
+            logger.info("✅ Firebase Admin initialized with environment variables")
 
         # Option 2: Use service account file
         elif settings.FIREBASE_SERVICE_ACCOUNT_PATH and os.path.exists(settings.FIREBASE_SERVICE_ACCOUNT_PATH):
             cred = credentials.Certificate(settings.FIREBASE_SERVICE_ACCOUNT_PATH)
             firebase_app = firebase_admin.initialize_app(cred)
-            print(f"✅ Firebase Admin initialized with {settings.FIREBASE_SERVICE_ACCOUNT_PATH}")
+            logger.info("✅ Firebase Admin initialized with %s", settings.FIREBASE_SERVICE_ACCOUNT_PATH)
 
         # Fallback: Mock mode (ONLY in development)
         else:
@@ -48,7 +75,7 @@ def get_firebase_app():
                     "Set FIREBASE_PRIVATE_KEY, FIREBASE_PROJECT_ID, FIREBASE_CLIENT_EMAIL "
                     "or provide FIREBASE_SERVICE_ACCOUNT_PATH"
                 )
-            print("⚠️ Firebase Service Account not configured. Running in MOCK AUTH mode (development only).")
+            logger.warning("⚠️ Firebase Service Account not configured. Running in MOCK AUTH mode (development only).")
             firebase_app = "MOCK_MODE"
 
     except ValueError:
@@ -57,57 +84,150 @@ def get_firebase_app():
     except Exception as e:
         if settings.NODE_ENV == "production":
             raise RuntimeError(f"❌ Failed to initialize Firebase in production: {str(e)}")
-        print(f"⚠️ Firebase initialization failed, falling back to MOCK MODE: {str(e)}")
+        logger.warning("⚠️ Firebase initialization failed, falling back to MOCK MODE: %s", e)
         firebase_app = "MOCK_MODE"
 
     return firebase_app
 
-async def get_current_user(
-    token: HTTPAuthorizationCredentials = Security(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """
-    Verifies the Firebase ID Token and returns the corresponding User from the database.
-    If the user doesn't exist in DB, creates a new record.
-    """
+def verify_token(id_token: str) -> dict:
+    """Verify a Firebase ID token (or a mock token in MOCK MODE) and return its claims"""
     app = get_firebase_app()
-    id_token = token.credentials
-    
-    firebase_user = None
 
-    # 1. Verify Token with Firebase
     if app == "MOCK_MODE":
         # DEVELOPMENT ONLY: Decode token slightly or trust it for local dev if needed
         # For now, we'll assume a dummy user structure if it's a specific mock token
         # or just fail if we want to be strict.
         # Let's support a "mock" token for easy testing without internet/keys
         if id_token.startswith("mock-token-"):
-            firebase_user = {
+            return {
                 "uid": id_token.replace("mock-token-", ""),
                 "email": f"{id_token.replace('mock-token-', '')}@example.com",
                 "name": "Mock User",
                 "picture": None
             }
-        else:
-             # In mock mode, basic JWT decoding could vary, but let's just error 
-             # if it's not our special mock token, to avoid confusion.
-             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Backend in Mock Mode. Use a token starting with 'mock-token-'",
-            )
-    else:
-        try:
-            firebase_user = auth.verify_id_token(id_token)
-        except Exception as e:
-            print(f"Error verifying token: {e}")
+        # In mock mode, basic JWT decoding could vary, but let's just error
+        # if it's not our special mock token, to avoid confusion.
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Backend in Mock Mode. Use a token starting with 'mock-token-'",
+        )
+
+    try:
+        return auth.verify_id_token(id_token)
+    except Exception as e:
+        logger.info("Error verifying token: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+class TokenVerifier:
+    """
+    Runs the blocking Firebase token verification (RSA signature check and
+    occasional public-key certificate refetch) on a dedicated, bounded thread
+    pool so it never stalls the event loop. When too many verifications are
+    already waiting, new ones are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="token-verify")
+
+    @property
+    def queue_depth(self) -> int:
+        """Verifications waiting for a free thread"""
+        return max(self.in_flight - self.max_workers, 0)
+
+    async def verify(self, id_token: str) -> dict:
+        if get_firebase_app() == "MOCK_MODE":
+            return verify_token(id_token)
+
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, please retry",
+                headers={"Retry-After": "1"},
             )
 
-    if not firebase_user:
-        raise HTTPException(status_code=401, detail="User could not be authenticated")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, verify_token, id_token)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+token_verifier = TokenVerifier(
+    max_workers=settings.AUTH_VERIFY_WORKERS,
+    max_pending=settings.AUTH_VERIFY_MAX_PENDING,
+)
+
+async def get_current_user(
+    token: HTTPAuthorizationCredentials = Security(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Verifies the Firebase ID Token and returns the corresponding User from the database.
+    If the user doesn't exist in DB, creates a new record.
+    Verified claims and user rows are cached, so repeat requests skip both steps.
+    """
+    return await authenticate(token.credentials, db)
+
+async def get_stream_user(
+    token: HTTPAuthorizationCredentials | None = Security(optional_security),
+    access_token: str | None = Query(None, description="ID token, for clients that cannot set headers (EventSource)"),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Like get_current_user, but also accepts the ID token as ?access_token=,
+    because the browser EventSource API cannot send an Authorization header.
+    """
+    id_token = token.credentials if token else access_token
+    if not id_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await authenticate(id_token, db)
+
+async def authenticate(id_token: str, db: AsyncSession) -> User:
+    """Resolve an ID token to its User, creating the user on first sign-in"""
+    token_key = hashlib.sha256(id_token.encode()).hexdigest()
+
+    firebase_user = token_cache.get(token_key)
+    if firebase_user:
+        user = user_cache.get(firebase_user.get('uid'))
+        if user:
+            return user
+    else:
+        # 1. Verify Token with Firebase
+        firebase_user = await token_verifier.verify(id_token)
+        if not firebase_user:
+            raise HTTPException(status_code=401, detail="User could not be authenticated")
+
+        # Cache verified claims until the token itself expires
+        expires_at = firebase_user.get('exp')
+        ttl = expires_at - time.time() if expires_at else settings.AUTH_USER_CACHE_TTL
+        token_cache.set(token_key, firebase_user, ttl=ttl)
 
     uid = firebase_user.get('uid')
     email = firebase_user.get('email')
@@ -134,6 +254,7 @@ async def get_current_user(
             await db.commit()
             await db.refresh(new_user)
             user = new_user
+            invalidate_dashboard_cache()
         except Exception as e:
             await db.rollback()
             # Handle race condition if user created in parallel
@@ -142,4 +263,5 @@ async def get_current_user(
             if not user:
                  raise HTTPException(status_code=500, detail="Could not create user record")
 
+    user_cache.set(uid, user)
     return user
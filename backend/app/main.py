@@ -1,17 +1,60 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 from app.config import settings
 from app.routers import payments, turfs, bookings, users, events, notifications, dashboard
 from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.security import SecurityHeadersMiddleware
-from app.database import get_db
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.request_id import REQUEST_ID_HEADER, RequestIdMiddleware
+from app.database import get_db, pool_stats
+from app.services.mpesa import mpesa_client
+from app.services.callback_worker import callback_workers, queue_depth
+from app.services.pubsub import hub, build_pubsub_bridge
+from app.services.sweeper import expiry_sweeper
+from app.services.turf_catalog import turf_catalog
+from app.services.pool_health import pool_health
+from app.dependencies.auth import token_verifier
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.responses import FastJSONResponse
+from app.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from app.utils.query_budget import QueryBudgetMiddleware
+from app.utils.logger import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived clients shared by all requests of this worker
+    await mpesa_client.start()
+    pubsub_bridge = build_pubsub_bridge(hub)
+    if pubsub_bridge:
+        await pubsub_bridge.start()
+    if settings.MPESA_CALLBACK_MODE == "queue":
+        callback_workers.start()
+    if settings.SWEEPER_ENABLED:
+        expiry_sweeper.start()
+    pool_health.start()
+    yield
+    await pool_health.stop()
+    await expiry_sweeper.stop()
+    await callback_workers.stop()
+    if pubsub_bridge:
+        await pubsub_bridge.stop()
+    await mpesa_client.close()
+    token_verifier.shutdown()
 
 app = FastAPI(
     title="Goalhub API",
     description="Backend API for Goalhub Turf Booking Platform",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS - use settings from environment
@@ -23,15 +66,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
 
-print(f"🌐 CORS configured for origins: {origins}")
+logger.info("🌐 CORS configured for origins: %s", origins)
 
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
-# Add rate limiting for payment endpoints
-app.add_middleware(RateLimitMiddleware, max_requests=10, window_seconds=900)
+# Add rate limiting (per-route policies from settings.RATE_LIMITS)
+app.add_middleware(RateLimitMiddleware)
+
+# N+1 and slow-query detection (development/CI)
+if settings.QUERY_BUDGET_ENABLED:
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Request latency includes the other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost, so everything logged while serving a request carries its id
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(payments.router)
 app.include_router(turfs.router)
@@ -51,13 +106,22 @@ async def health_check(db: AsyncSession = Depends(get_db)):
         "status": "healthy",
         "environment": settings.NODE_ENV,
         "mpesa_env": settings.MPESA_ENV,
-        "database": "unknown"
+        "database": "unknown",
+        "db_pool": {**pool_stats(), "health_check": pool_health.stats()},
+        "auth_verifier": token_verifier.stats(),
+        "callback_queue": callback_workers.stats(),
+        "pubsub": hub.stats(),
+        "sweeper": expiry_sweeper.stats(),
+        "turf_catalog": turf_catalog.stats(),
     }
 
     # Check database connectivity
     try:
-        await db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
         health_status["database"] = "connected"
+        if settings.MPESA_CALLBACK_MODE == "queue":
+            depth, lag = await queue_depth(db)
+            health_status["callback_queue"].update(depth=depth, oldest_age_seconds=lag)
     except Exception as e:
         health_status["status"] = "unhealthy"
         health_status["database"] = "disconnected"
@@ -69,6 +133,21 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 
     return health_status
 
+if settings.METRICS_ENABLED:
+    # Component stats reported by /health, exported as gauges
+    REGISTRY.register_stats("goalhub_db_pool", "Database connection pool", pool_stats)
+    REGISTRY.register_stats("goalhub_db_pool_health", "Background pool liveness checks", pool_health.stats)
+    REGISTRY.register_stats("goalhub_auth_verifier", "Firebase token verification", token_verifier.stats)
+    REGISTRY.register_stats("goalhub_callback_queue", "M-Pesa callback queue workers", callback_workers.stats)
+    REGISTRY.register_stats("goalhub_pubsub", "Real-time event hub", hub.stats)
+    REGISTRY.register_stats("goalhub_sweeper", "Pending payment/booking expiry sweeper", expiry_sweeper.stats)
+    REGISTRY.register_stats("goalhub_turf_catalog", "Turf catalogue cache", turf_catalog.stats)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics of this worker process"""
+        return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Goalhub API"}
@@ -0,0 +1,78 @@
+"""
+Request metrics middleware.
+
+Records, per route template (e.g. /api/bookings/{booking_id}), the request
+latency and the number and total duration of the database queries the
+request ran. A request is measured until its last body chunk is sent, so
+background tasks are not included and an SSE stream counts for its whole
+lifetime.
+"""
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import DB_BUCKETS, Gauge, Histogram, RequestMetrics, current_request
+
+# Label used for requests that matched no route, to keep label values bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests being served")
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Database queries run per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per HTTP request", ("route",),
+    buckets=DB_BUCKETS,
+)
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; costs two clock reads and three histogram updates per request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request = RequestMetrics()
+        token = current_request.set(request)
+        status = 500
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            recorded = True
+            route = route_label(scope)
+            http_request_seconds.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            http_request_db_queries.labels(route).observe(request.queries)
+            http_request_db_seconds.labels(route).observe(request.db_seconds)
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not recorded:
+                record()
+
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_requests_in_progress.dec()
+            current_request.reset(token)
+            if not recorded:
+                record()
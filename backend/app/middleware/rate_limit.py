@@ -1,44 +1,51 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-import time
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Optional
+import logging
+import math
+from app.services.rate_limit import RateLimiter, build_rate_limiter
 
+logger = logging.getLogger(__name__)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+
+class RateLimitMiddleware:
     """
-    Rate limiting middleware for payment endpoints.
-    Limits requests to max_requests per window_seconds per IP address.
+    Per-IP rate limiting for the routes listed in settings.RATE_LIMITS.
+    Each route prefix has its own policy; unmatched paths are not limited.
+    Pure ASGI middleware: allowed requests are passed straight through.
     """
 
-    def __init__(self, app, max_requests: int = 10, window_seconds: int = 900):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.requests = defaultdict(list)
-
-    async def dispatch(self, request: Request, call_next):
-        # Only apply to payment endpoints
-        if not request.url.path.startswith("/api/stkpush"):
-            return await call_next(request)
-
-        client_ip = request.client.host
-        now = time.time()
-
-        # Clean old requests outside the time window
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < self.window_seconds
-        ]
-
-        # Check rate limit
-        if len(self.requests[client_ip]) >= self.max_requests:
-            return JSONResponse(
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or build_rate_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.limiter.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        try:
+            result = await self.limiter.hit(client_ip, policy)
+        except Exception as e:
+            # Fail open: an unavailable rate limit store must not take the API down
+            logger.warning("⚠️ Rate limiter unavailable, allowing request: %s", e)
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            response = JSONResponse(
                 status_code=429,
-                content={"error": "Too many payment requests, please try again later."}
+                content={"error": "Too many requests, please try again later."},
+                headers={"Retry-After": str(math.ceil(result.retry_after))}
             )
+            await response(scope, receive, send)
+            return
 
-        # Record this request
-        self.requests[client_ip].append(now)
-
-        return await call_next(request)
+        await self.app(scope, receive, send)
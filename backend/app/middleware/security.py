@@ -2,57 +2,81 @@
 Security Headers Middleware
 Adds security-related HTTP headers to all responses
 """
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.config import settings
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+def build_security_headers() -> list[tuple[bytes, bytes]]:
+    """Header block added to every response, computed once from settings"""
+    headers = {}
+
+    # Strict Transport Security (HSTS) - enforce HTTPS
+    # Only add in production to avoid issues in development
+    if settings.NODE_ENV == "production":
+        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+
+    # Prevent browsers from MIME-sniffing
+    headers["X-Content-Type-Options"] = "nosniff"
+
+    # Prevent clickjacking attacks
+    headers["X-Frame-Options"] = "DENY"
+
+    # Enable browser XSS protection
+    headers["X-XSS-Protection"] = "1; mode=block"
+
+    # Control what information is sent in Referer header
+    headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+
+    # Content Security Policy
+    # Note: Adjust this based on your frontend needs
+    if settings.NODE_ENV == "production":
+        headers["Content-Security-Policy"] = (
+            "default-src 'self'; "
+            "script-src 'self'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self' data:; "
+            "connect-src 'self' https://sandbox.safaricom.co.ke https://api.safaricom.co.ke; "
+            "frame-ancestors 'none'; "
+            "base-uri 'self'; "
+            "form-action 'self'"
+        )
+
+    # Permissions Policy (formerly Feature Policy)
+    headers["Permissions-Policy"] = (
+        "geolocation=(), "
+        "microphone=(), "
+        "camera=()"
+    )
+
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+class SecurityHeadersMiddleware:
     """
-    Add security headers to all HTTP responses
+    Add security headers to all HTTP responses.
+    Pure ASGI middleware: headers are set on the http.response.start message,
+    so streaming responses pass through untouched.
     """
 
-    async def dispatch(self, request: Request, call_next):
-        response: Response = await call_next(request)
-
-        # Strict Transport Security (HSTS) - enforce HTTPS
-        # Only add in production to avoid issues in development
-        if settings.NODE_ENV == "production":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-
-        # Prevent browsers from MIME-sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-
-        # Prevent clickjacking attacks
-        response.headers["X-Frame-Options"] = "DENY"
-
-        # Enable browser XSS protection
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Control what information is sent in Referer header
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # Content Security Policy
-        # Note: Adjust this based on your frontend needs
-        if settings.NODE_ENV == "production":
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self'; "
-                "style-src 'self' 'unsafe-inline'; "
-                "img-src 'self' data: https:; "
-                "font-src 'self' data:; "
-                "connect-src 'self' https://sandbox.safaricom.co.ke https://api.safaricom.co.ke; "
-                "frame-ancestors 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self'"
-            )
-
-        # Permissions Policy (formerly Feature Policy)
-        response.headers["Permissions-Policy"] = (
-            "geolocation=(), "
-            "microphone=(), "
-            "camera=()"
-        )
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.headers = build_security_headers()
+        self.header_names = {name for name, _ in self.headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw_headers = [
+                    header for header in message.get("headers", [])
+                    if header[0].lower() not in self.header_names
+                ]
+                raw_headers.extend(self.headers)
+                message["headers"] = raw_headers
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_headers)
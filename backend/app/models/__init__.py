@@ -4,3 +4,6 @@ from .payment import Payment
 from .booking import Booking
 from .event import Event
 from .notification import Notification
+from .booking_stats import DailyBookingStat
+from .payment_callback import PaymentCallback
+from .notification_job import NotificationJob
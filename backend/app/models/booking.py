@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Numeric, Date, ForeignKey, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Numeric, Date, ForeignKey, DateTime, JSON, Index, func, text
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -24,8 +24,32 @@ class Booking(Base):
     customer_email = Column(String, nullable=True) # For guest bookings
     
     extras = Column(JSON, nullable=True) # List of extras
+
+    # Normalized slot range derived from date + time_slot + duration
+    slot_start = Column(DateTime, nullable=True)
+    slot_end = Column(DateTime, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Two active bookings on the same turf can never overlap (requires btree_gist)
+        ExcludeConstraint(
+            (turf_id, "="),
+            (func.tsrange(slot_start, slot_end), "&&"),
+            name="bookings_no_overlapping_slots",
+            using="gist",
+            where=text(
+                "status IN ('pending', 'confirmed', 'completed') "
+                "AND slot_start IS NOT NULL AND slot_end IS NOT NULL"
+            ),
+        ),
+        # Keyset pagination on (created_at, id), optionally scoped to a user
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+        Index("ix_bookings_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_bookings_turf_id_date", "turf_id", "date"),
+        # Expiry sweeper: pending bookings by age
+        Index("ix_bookings_pending_created_at", "created_at", postgresql_where=text("status = 'pending'")),
+    )
     
     # Relationships
     turf = relationship("Turf")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, Numeric, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+class DailyBookingStat(Base):
+    """
+    Rollup of bookings per creation day, turf and status.
+    Maintained incrementally by app/services/booking_stats.py.
+    """
+    __tablename__ = "daily_booking_stats"
+
+    day = Column(Date, primary_key=True)
+    turf_id = Column(UUID(as_uuid=True), ForeignKey("turfs.id"), primary_key=True)
+    status = Column(String, primary_key=True)
+
+    bookings = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy import Column, String, Text, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -10,8 +10,21 @@ class Event(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    date = Column(String, nullable=False)  # Could use Date type
-    time = Column(String, nullable=False)
+    starts_at = Column(DateTime, nullable=False)  # Wall-clock time at the venue (settings.VENUE_TIMEZONE)
     image = Column(String, nullable=True)
     location = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Chronological listing and upcoming/date-range windows
+        Index("ix_events_starts_at_id", "starts_at", "id"),
+    )
+
+    # The API still exposes the separate "date" (YYYY-MM-DD) and "time" (HH:MM) strings
+    @property
+    def date(self) -> str:
+        return self.starts_at.date().isoformat()
+
+    @property
+    def time(self) -> str:
+        return self.starts_at.strftime("%H:%M")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -18,3 +18,10 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User")
+
+    __table_args__ = (
+        # Per-user feed, newest first (user_id IS NULL rows form the staff inbox)
+        Index("ix_notifications_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Unread badge counts
+        Index("ix_notifications_unread_user_id", "user_id", postgresql_where=text("read IS NOT TRUE")),
+    )
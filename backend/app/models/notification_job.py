@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Text
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+from app.database import Base
+
+class NotificationJob(Base):
+    """
+    A bulk notification fan-out: one message sent to every user matched by an
+    audience query. Progress is committed together with each inserted batch,
+    so any worker can report it.
+    """
+    __tablename__ = "notification_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    type = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    audience = Column(JSON, nullable=False)
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed
+    total = Column(Integer, nullable=True)  # Recipients matched by the audience when the job started
+    sent = Column(Integer, default=0, nullable=False)
+    error = Column(String, nullable=True)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,9 +1,24 @@
-from sqlalchemy import Column, String, Numeric, DateTime, JSON
+from sqlalchemy import Column, String, Numeric, DateTime, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
 from app.database import Base
 
+# Allowed Payment.status transitions. Terminal states have no outgoing edges, so
+# a retried or out-of-order callback can never overwrite a settled payment.
+# "expired" is set by the sweeper when no callback arrived in time; a late
+# success callback still completes it, since the customer was charged.
+PAYMENT_TRANSITIONS = {
+    "pending": {"completed", "failed", "expired"},
+    "expired": {"completed"},
+    "completed": set(),
+    "failed": set(),
+}
+
+def payment_statuses_leading_to(target: str) -> list[str]:
+    """Statuses from which a payment may move to `target`"""
+    return [source for source, targets in PAYMENT_TRANSITIONS.items() if target in targets]
+
 class Payment(Base):
     __tablename__ = "payments"
 
@@ -11,9 +26,14 @@ class Payment(Base):
     checkout_request_id = Column(String, unique=True, index=True, nullable=False)
     phone = Column(String, nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
-    status = Column(String, default="pending") # pending, completed, failed
+    status = Column(String, default="pending") # see PAYMENT_TRANSITIONS
     reference = Column(String, nullable=True) # M-Pesa Receipt Number
     failure_reason = Column(String, nullable=True)
     callback_metadata = Column(JSON, nullable=True) # Full callback metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Expiry sweeper: pending payments by age
+        Index("ix_payments_pending_created_at", "created_at", postgresql_where=text("status = 'pending'")),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Index, text
+from datetime import datetime
+from app.database import Base
+
+class PaymentCallback(Base):
+    """
+    Every distinct M-Pesa callback delivery, keyed by a dedupe key derived from
+    its content. Safaricom retries and duplicate deliveries hit the primary key
+    and are acknowledged without being processed again.
+    """
+    __tablename__ = "payment_callbacks"
+
+    dedupe_key = Column(String, primary_key=True)
+    checkout_request_id = Column(String, index=True, nullable=False)
+    result_code = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        # The ingestion queue: unprocessed callbacks in arrival order
+        Index("ix_payment_callbacks_unprocessed", "received_at", postgresql_where=text("processed_at IS NULL")),
+    )
@@ -1,27 +1,100 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import date
 from uuid import UUID
 from app.database import get_db
-from app.models import Booking, Payment
-from app.schemas import BookingResponse, BookingCreate
-from app.dependencies.auth import get_current_user
+from app.models import Booking, Payment, Turf
+from app.schemas import BookingResponse, BookingCreate, TurfResponse
+from app.dependencies.auth import AUTH_MAX_QUERIES, get_current_user
 from app.models.user import User
+from app.services.availability import occupancy_index, slot_range, BookingSlot
+from app.services.dashboard import invalidate_dashboard_cache
+from app.services.booking_stats import StatsKey, record_booking_created, record_booking_changed
+from app.utils.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.utils.query_budget import query_budget
+from app.utils.responses import list_response, response_columns
 
 router = APIRouter(prefix="/api/bookings", tags=["bookings"])
 
+# PostgreSQL SQLSTATE raised by the bookings_no_overlapping_slots exclusion constraint
+EXCLUSION_VIOLATION = "23P01"
+
+SLOT_TAKEN_DETAIL = "This time slot is already booked for the selected turf"
+
+def is_slot_conflict(error: IntegrityError) -> bool:
+    return getattr(error.orig, "pgcode", None) == EXCLUSION_VIOLATION
+
+# Booking list columns: the booking's own fields plus its turf's, labelled "turf__<field>"
+BOOKING_LIST_COLUMNS = [
+    *response_columns(Booking, BookingResponse, exclude=("turf",)),
+    *(column.label(f"turf__{column.key}") for column in response_columns(Turf, TurfResponse)),
+]
+
+def nest_turf(row) -> dict:
+    """BookingResponse-shaped dict from a BOOKING_LIST_COLUMNS row"""
+    booking = dict(row)
+    turf = {name: booking.pop(f"turf__{name}") for name in TurfResponse.model_fields}
+    booking["turf"] = turf if turf["id"] is not None else None
+    return booking
+
 @router.get("/", response_model=List[BookingResponse])
+@query_budget(max_queries=1 + AUTH_MAX_QUERIES)
 async def get_bookings(
+    cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    turf_id: Optional[UUID] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None,
+    user_id: Optional[UUID] = Query(None, description="Admin/manager only"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # TODO: Filter for non-admins?
-    result = await db.execute(select(Booking).options(selectinload(Booking.turf)))
-    return result.scalars().all()
+    """
+    List bookings newest first, one page at a time.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    query = select(*BOOKING_LIST_COLUMNS).outerjoin(Turf, Turf.id == Booking.turf_id)
+
+    # Regular users only ever see their own bookings
+    if current_user.role not in ["admin", "manager"]:
+        if user_id and user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to view other users' bookings")
+        user_id = current_user.id
+
+    if user_id:
+        query = query.where(Booking.user_id == user_id)
+    if turf_id:
+        query = query.where(Booking.turf_id == turf_id)
+    if date_from:
+        query = query.where(Booking.date >= date_from)
+    if date_to:
+        query = query.where(Booking.date <= date_to)
+    if status:
+        query = query.where(Booking.status == status)
+
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(Booking.created_at, Booking.id) < (cursor_created_at, cursor_id))
+
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(Booking.created_at.desc(), Booking.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    bookings = [nest_turf(row) for row in result.mappings()]
+
+    headers = {}
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(bookings[-1]["created_at"], bookings[-1]["id"])
+    return list_response(BookingResponse, bookings, headers)
 
 @router.post("/", response_model=BookingResponse)
 async def create_booking(
@@ -30,34 +103,62 @@ async def create_booking(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # If payment reference provided, find payment and link it
+    try:
+        slot_start, slot_end = slot_range(booking.date, booking.time_slot, booking.duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Cheap in-memory pre-check; the exclusion constraint below is authoritative.
+    # The index may still hold bookings another worker has since cancelled or
+    # moved, so a taken slot is confirmed against the database before rejecting.
+    await occupancy_index.ensure_loaded(db)
+    if not occupancy_index.is_free(booking.turf_id, booking.date, booking.time_slot, booking.duration):
+        await occupancy_index.refresh_day(db, booking.turf_id, booking.date)
+        if not occupancy_index.is_free(booking.turf_id, booking.date, booking.time_slot, booking.duration):
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+
+    # If payment reference provided, find payment and link it. A pending payment
+    # reserves the slot; the M-Pesa callback confirms (or cancels) the booking.
     payment = None
     if checkout_request_id:
+        # Row lock: a concurrent callback waits until this booking is committed,
+        # so it always sees (and settles) the booking it paid for
         payment_result = await db.execute(
-            select(Payment).where(Payment.checkout_request_id == checkout_request_id)
+            select(Payment).where(Payment.checkout_request_id == checkout_request_id).with_for_update()
         )
         payment = payment_result.scalars().first()
 
-        # Only allow booking if payment is completed
         if not payment:
             raise HTTPException(
                 status_code=404,
-                detail="Payment not found. Please complete payment first."
+                detail="Payment not found. Please initiate payment first."
             )
 
-        if payment.status != "completed":
+        if payment.status not in ["pending", "completed"]:
             raise HTTPException(
                 status_code=400,
-                detail=f"Payment must be completed before creating booking. Current status: {payment.status}"
+                detail=f"Payment cannot be used for a booking. Current status: {payment.status}"
             )
 
     new_booking = Booking(**booking.model_dump())
     new_booking.user_id = current_user.id
-    new_booking.status = "confirmed" if payment else "pending"  # Confirmed only if paid
+    new_booking.status = "confirmed" if payment and payment.status == "completed" else "pending"  # Confirmed only if paid
     new_booking.payment_id = payment.id if payment else None
+    new_booking.slot_start, new_booking.slot_end = slot_start, slot_end
     db.add(new_booking)
-    await db.commit()
+    try:
+        await db.flush()
+        await record_booking_created(db, new_booking)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_slot_conflict(e):
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        raise
     await db.refresh(new_booking)
+
+    occupancy_index.add_booking(new_booking)
+    invalidate_dashboard_cache()
     return new_booking
 
 class BookingUpdate(BaseModel):
@@ -84,9 +185,28 @@ async def update_booking(
         raise HTTPException(status_code=404, detail="Booking not found")
         
     update_data = booking_update.model_dump(exclude_unset=True)
+    previous_slot = BookingSlot.from_booking(booking)
+    previous_stats = StatsKey.from_booking(booking)
     for key, value in update_data.items():
         setattr(booking, key, value)
+
+    if "date" in update_data or "time_slot" in update_data:
+        try:
+            booking.slot_start, booking.slot_end = slot_range(booking.date, booking.time_slot, booking.duration)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-    await db.commit()
+    try:
+        await record_booking_changed(db, previous_stats, booking)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_slot_conflict(e):
+            raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+        raise
     await db.refresh(booking)
+
+    occupancy_index.remove_booking(previous_slot)
+    occupancy_index.add_booking(booking)
+    invalidate_dashboard_cache()
     return booking
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, true
 from typing import List, Dict, Any
 from app.database import get_db
-from app.models import Booking, User
+from app.models import Booking, User, DailyBookingStat
 from app.dependencies.auth import get_current_user
+from app.services.dashboard import get_cached
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -17,32 +18,48 @@ async def get_dashboard_stats(
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Not authorized to view dashboard stats")
         
-    # 1. Total Revenue (Sum of confirmed bookings)
-    revenue_query = select(func.sum(Booking.amount)).where(Booking.status == 'confirmed')
-    revenue_result = await db.execute(revenue_query)
-    total_revenue = revenue_result.scalar() or 0
+    return await get_cached("stats", lambda: load_dashboard_stats(db))
 
-    # 2. Total Bookings
-    bookings_query = select(func.count(Booking.id)).where(Booking.status == 'confirmed')
-    bookings_result = await db.execute(bookings_query)
-    total_bookings = bookings_result.scalar() or 0
+async def load_dashboard_stats(db: AsyncSession) -> Dict[str, Any]:
+    """All dashboard totals and the 5 most recent bookings in a single statement"""
+    # 1 & 2. Total Revenue and Bookings (confirmed), read from the daily rollup
+    totals = select(
+        func.coalesce(func.sum(DailyBookingStat.revenue), 0).label("revenue"),
+        func.coalesce(func.sum(DailyBookingStat.bookings), 0).label("bookings")
+    ).where(DailyBookingStat.status == 'confirmed').cte("totals")
 
     # 3. Total Users
-    users_query = select(func.count(User.id))
-    users_result = await db.execute(users_query)
-    total_users = users_result.scalar() or 0
-    
+    total_users = select(func.count(User.id)).scalar_subquery()
+
     # 4. Recent Bookings (Last 5)
-    recent_bookings_query = select(Booking).order_by(desc(Booking.created_at)).limit(5)
-    recent_bookings_result = await db.execute(recent_bookings_query)
-    recent_bookings = recent_bookings_result.scalars().all()
+    recent = select(Booking.__table__).order_by(desc(Booking.created_at)).limit(5).cte("recent")
+
+    query = select(
+        totals.c.revenue,
+        totals.c.bookings,
+        total_users.label("users"),
+        recent
+    ).select_from(
+        totals.outerjoin(recent, true())
+    ).order_by(desc(recent.c.created_at))
+
+    result = await db.execute(query)
+    rows = result.all()
+
+    booking_columns = [column.name for column in Booking.__table__.columns]
+    recent_bookings = [
+        {name: row._mapping[recent.c[name]] for name in booking_columns}
+        for row in rows
+        if row._mapping[recent.c.id] is not None
+    ]
 
     return {
-        "revenue": total_revenue,
-        "bookings": total_bookings,
-        "users": total_users,
+        "revenue": rows[0].revenue,
+        "bookings": rows[0].bookings,
+        "users": rows[0].users,
         "recent_activity": recent_bookings
     }
+
 @router.get("/chart-data")
 async def get_dashboard_chart_data(
     current_user: User = Depends(get_current_user),
@@ -51,23 +68,26 @@ async def get_dashboard_chart_data(
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    return await get_cached("chart-data", lambda: load_dashboard_chart_data(db))
+
+async def load_dashboard_chart_data(db: AsyncSession) -> List[Dict[str, Any]]:
     # Get last 7 days metrics
     from datetime import datetime, timedelta
     today = datetime.utcnow().date()
     start_date = today - timedelta(days=6)
     
-    # Query: Group by date, sum amount
+    # Query: per-day totals from the rollup (summed across turfs)
     query = select(
-        func.date(Booking.created_at).label('date'),
-        func.sum(Booking.amount).label('revenue'),
-        func.count(Booking.id).label('count')
+        DailyBookingStat.day.label('date'),
+        func.sum(DailyBookingStat.revenue).label('revenue'),
+        func.sum(DailyBookingStat.bookings).label('count')
     ).where(
-        Booking.status == 'confirmed',
-        func.date(Booking.created_at) >= start_date
+        DailyBookingStat.status == 'confirmed',
+        DailyBookingStat.day >= start_date
     ).group_by(
-        func.date(Booking.created_at)
+        DailyBookingStat.day
     ).order_by(
-        func.date(Booking.created_at)
+        DailyBookingStat.day
     )
     
     result = await db.execute(query)
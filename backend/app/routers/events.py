@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
-from pydantic import BaseModel
+from sqlalchemy import select, tuple_
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
+from datetime import date, datetime, time, timedelta
+from app.config import settings
 from app.database import get_db
 from app.models.event import Event
+from app.utils.http_cache import cached_response, strong_etag
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.utils.query_budget import query_budget
+from app.utils.responses import list_response
+from app.utils.venue_time import venue_now
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
@@ -13,28 +20,96 @@ router = APIRouter(prefix="/api/events", tags=["events"])
 class EventBase(BaseModel):
     title: str
     description: str | None = None
-    date: str
-    time: str
+    date: str = Field(..., description="YYYY-MM-DD")
+    time: str = Field(..., description="HH:MM")
     image: str | None = None
     location: str | None = None
 
-class EventCreate(EventBase):
+class EventWrite(EventBase):
+    @model_validator(mode="after")
+    def check_schedule(self):
+        self.starts_at()
+        return self
+
+    def starts_at(self) -> datetime:
+        try:
+            return datetime.strptime(f"{self.date} {self.time}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            raise ValueError('"date" must be YYYY-MM-DD and "time" HH:MM')
+
+class EventCreate(EventWrite):
     pass
 
-class EventUpdate(EventBase):
+class EventUpdate(EventWrite):
     pass
 
 class EventResponse(EventBase):
     id: UUID
+    starts_at: datetime
     
     class Config:
         from_attributes = True
 
-# Get all events
+EVENT_LIST_COLUMNS = (
+    Event.id, Event.title, Event.description, Event.starts_at, Event.image, Event.location,
+)
+
+def event_row(row) -> dict:
+    """EventResponse-shaped dict from an EVENT_LIST_COLUMNS row"""
+    event = dict(row)
+    event["date"] = event["starts_at"].date().isoformat()
+    event["time"] = event["starts_at"].strftime("%H:%M")
+    return event
+
+# List events in chronological order
 @router.get("/", response_model=List[EventResponse])
-async def get_events(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Event))
-    return result.scalars().all()
+@query_budget(max_queries=1)
+async def get_events(
+    request: Request,
+    upcoming: bool = Query(False, description="Only events that have not started yet"),
+    from_date: Optional[date] = Query(None, alias="from", description="Events on or after this day (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Events on or before this day (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Events ordered by start time, one page at a time, served with an ETag
+    so clients can revalidate. The cursor for the next page is returned in
+    the X-Next-Cursor header.
+    """
+    if from_date and to_date and to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must be on or after 'from'")
+
+    query = select(*EVENT_LIST_COLUMNS)
+    if upcoming:
+        query = query.where(Event.starts_at >= venue_now())
+    if from_date:
+        query = query.where(Event.starts_at >= datetime.combine(from_date, time.min))
+    if to_date:
+        query = query.where(Event.starts_at < datetime.combine(to_date + timedelta(days=1), time.min))
+
+    if cursor:
+        try:
+            cursor_starts_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(Event.starts_at, Event.id) > (cursor_starts_at, cursor_id))
+
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(Event.starts_at, Event.id).limit(limit + 1)
+    result = await db.execute(query)
+    events = [event_row(row) for row in result.mappings()]
+
+    headers = {}
+    if len(events) > limit:
+        events = events[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(events[-1]["starts_at"], events[-1]["id"])
+
+    body = list_response(EventResponse, events).body
+    return cached_response(
+        request, body, strong_etag(body), f"public, max-age={settings.EVENTS_MAX_AGE}", headers=headers
+    )
 
 # Get event by ID
 @router.get("/{event_id}", response_model=EventResponse)
@@ -48,7 +123,7 @@ async def get_event(event_id: UUID, db: AsyncSession = Depends(get_db)):
 # Create event (admin/manager only)
 @router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
 async def create_event(event: EventCreate, db: AsyncSession = Depends(get_db)):
-    new_event = Event(**event.model_dump())
+    new_event = Event(**event.model_dump(exclude={"date", "time"}), starts_at=event.starts_at())
     db.add(new_event)
     await db.commit()
     await db.refresh(new_event)
@@ -62,8 +137,9 @@ async def update_event(event_id: UUID, event_update: EventUpdate, db: AsyncSessi
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    for field, value in event_update.model_dump().items():
+    for field, value in event_update.model_dump(exclude={"date", "time"}).items():
         setattr(event, field, value)
+    event.starts_at = event_update.starts_at()
     
     await db.commit()
     await db.refresh(event)
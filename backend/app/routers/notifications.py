@@ -1,12 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
+from app.config import settings
 from app.database import get_db
+from app.dependencies.auth import AUTH_MAX_QUERIES, get_current_user, get_stream_user
 from app.models.notification import Notification
+from app.models.notification_job import NotificationJob
+from app.models.user import User
+from app.services.notifications import (
+    feed_query, mark_read, notification_topics, notifications_since,
+    publish_notification, record_created, unread_count, visible_to,
+)
+from app.services.notification_fanout import run_fanout_job
+from app.services.pubsub import OVERFLOW, hub
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.utils.query_budget import query_budget
+from app.utils.responses import list_response
+from app.utils.sse import HEARTBEAT, SSE_HEADERS, format_retry, format_sse
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -27,12 +42,114 @@ class NotificationResponse(NotificationBase):
     class Config:
         from_attributes = True
 
+class UnreadCountResponse(BaseModel):
+    unread: int
+
+class MarkReadRequest(BaseModel):
+    ids: List[UUID] | None = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if not self.all and not self.ids:
+            raise ValueError('Provide "ids" or set "all" to true')
+        if len(self.ids or []) > 500:
+            raise ValueError("At most 500 ids per request")
+        return self
+
+class MarkReadResponse(BaseModel):
+    updated: int
+    unread: int
+
+class FanoutRequest(BaseModel):
+    type: str
+    message: str
+    audience: Literal["all_users", "role", "turf_bookings"]
+    role: Optional[str] = None  # audience "role"
+    turf_id: Optional[UUID] = None  # audience "turf_bookings"
+    booking_date: Optional[date] = Field(None, alias="date")  # audience "turf_bookings"
+
+    @model_validator(mode="after")
+    def check_audience(self):
+        if self.audience == "role" and not self.role:
+            raise ValueError('Audience "role" requires "role"')
+        if self.audience == "turf_bookings" and not (self.turf_id and self.booking_date):
+            raise ValueError('Audience "turf_bookings" requires "turf_id" and "date"')
+        return self
+
+    def audience_spec(self) -> dict:
+        if self.audience == "role":
+            return {"kind": "role", "role": self.role}
+        if self.audience == "turf_bookings":
+            return {"kind": "turf_bookings", "turf_id": str(self.turf_id), "date": self.booking_date.isoformat()}
+        return {"kind": self.audience}
+
+class NotificationJobResponse(BaseModel):
+    id: UUID
+    type: str
+    message: str
+    audience: dict
+    status: str
+    total: int | None
+    sent: int
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
 # Get notifications
 @router.get("/", response_model=List[NotificationResponse])
-async def get_notifications(db: AsyncSession = Depends(get_db)):
-    # In real app, filter by current user
-    result = await db.execute(select(Notification).order_by(Notification.created_at.desc()))
-    return result.scalars().all()
+@query_budget(max_queries=1 + AUTH_MAX_QUERIES)
+async def get_notifications(
+    cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    unread_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    The current user's notifications newest first, one page at a time
+    (admins and managers also get the shared staff inbox).
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    page_after = None
+    if cursor:
+        try:
+            page_after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(feed_query(current_user, page_after, limit + 1, unread_only))
+    notifications = result.mappings().all()
+
+    headers = {}
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(notifications[-1]["created_at"], notifications[-1]["id"])
+    return list_response(NotificationResponse, notifications, headers)
+
+# Unread badge count
+@router.get("/unread-count", response_model=UnreadCountResponse)
+@query_budget(max_queries=2 + AUTH_MAX_QUERIES)  # One count per inbox (own, staff)
+async def get_unread_count(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return {"unread": await unread_count(db, current_user)}
+
+# Mark several (or all) notifications as read
+@router.post("/read", response_model=MarkReadResponse)
+async def mark_notifications_read(
+    request: MarkReadRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    updated = await mark_read(db, current_user, None if request.all else request.ids)
+    return {"updated": len(updated), "unread": await unread_count(db, current_user)}
 
 # Create notification
 @router.post("/", response_model=NotificationResponse, status_code=status.HTTP_201_CREATED)
@@ -41,17 +158,117 @@ async def create_notification(notification: NotificationCreate, db: AsyncSession
     db.add(new_notification)
     await db.commit()
     await db.refresh(new_notification)
+    record_created(new_notification)
+    publish_notification(new_notification)
     return new_notification
 
+# Send one message to a whole audience
+@router.post("/fanout", response_model=NotificationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def fanout_notification(
+    request: FanoutRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue a notification for every user in the audience (e.g. everyone with a
+    booking on a turf and date). Returns the job at once; poll
+    GET /api/notifications/fanout/{id} for progress.
+    """
+    if current_user.role not in ["admin", "manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized to send bulk notifications")
+
+    job = NotificationJob(
+        type=request.type,
+        message=request.message,
+        audience=request.audience_spec(),
+        status="queued",
+        sent=0,
+        created_by=current_user.id,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    background_tasks.add_task(run_fanout_job, job.id)
+    return job
+
+# Fan-out progress
+@router.get("/fanout/{job_id}", response_model=NotificationJobResponse)
+async def get_fanout_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if current_user.role not in ["admin", "manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view bulk notifications")
+    job = await db.get(NotificationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Fan-out job not found")
+    return job
+
+# Live notifications (Server-Sent Events)
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: UUID | None = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_stream_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Pushes the current user's notifications (and the staff inbox's, for
+    admins and managers) as they are
+    created, replacing polling of GET /api/notifications/. Each event carries
+    the notification id, so a reconnecting EventSource sends Last-Event-ID
+    and gets whatever it missed replayed first.
+
+    A client that stops reading is disconnected once SSE_MAX_QUEUED_EVENTS
+    pile up for it; it reconnects and catches up through the replay.
+    """
+    # Subscribe before the replay query so nothing created in between is missed
+    subscription = hub.subscribe(*notification_topics(current_user), drop_oldest=False)
+    try:
+        missed = []
+        if last_event_id:
+            missed = await notifications_since(db, current_user, last_event_id, settings.NOTIFICATION_REPLAY_LIMIT)
+    except Exception:
+        hub.unsubscribe(subscription)
+        raise
+    # Release the pooled connection: the stream may stay open for hours
+    await db.close()
+
+    async def stream():
+        async with subscription:
+            yield format_retry(settings.SSE_RETRY_MS)
+            replayed = set()
+            for notification in missed:
+                replayed.add(notification["id"])
+                yield format_sse(notification, event="notification", id=notification["id"])
+
+            while True:
+                event = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield HEARTBEAT
+                elif event is OVERFLOW:
+                    return
+                elif event["id"] not in replayed:
+                    yield format_sse(event, event="notification", id=event["id"])
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # Mark as read
 @router.put("/{notification_id}/read", response_model=NotificationResponse)
-async def mark_notification_read(notification_id: UUID, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Notification).where(Notification.id == notification_id))
+async def mark_notification_read(
+    notification_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(Notification).where(Notification.id == notification_id, visible_to(current_user))
+    )
     notification = result.scalars().first()
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
-    
-    notification.read = True
-    await db.commit()
-    await db.refresh(notification)
+
+    if not notification.read:
+        await mark_read(db, current_user, [notification_id])
+        await db.refresh(notification)
     return notification
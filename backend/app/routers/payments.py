@@ -1,12 +1,19 @@
+import time
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.models import Payment, Booking
+from app.models.payment import PAYMENT_TRANSITIONS
 from app.schemas import STKPushRequest, STKPushResponse, PaymentStatusResponse
 from app.services.mpesa import initiate_stk_push
+from app.services.payment_callbacks import parse_callback, record_callback, apply_callback, publish_outcome, UnknownPaymentError
+from app.services.pubsub import hub, payment_topic
+from app.utils.sse import format_sse, SSE_HEADERS, HEARTBEAT
+from app.services.callback_worker import callback_workers
+from app.config import settings
 from app.utils.logger import log_payment_event
-from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["payments"])
 
@@ -41,37 +48,38 @@ async def trigger_stk_push(
 
 @router.post("/callback")
 async def mpesa_callback(request: Request, db: AsyncSession = Depends(get_db)):
-    """Handle M-Pesa Callback"""
+    """
+    Handle M-Pesa Callback (idempotent: duplicates and retries are acknowledged and ignored).
+    In queue mode the callback is only stored here and applied by the background workers.
+    """
     data = await request.json()
 
-    if not data.get("Body") or not data["Body"].get("stkCallback"):
+    parsed = parse_callback(data)
+    if parsed is None:
         log_payment_event("INVALID_CALLBACK", {"data": data})
         return {"ResultCode": 0, "ResultDesc": "Invalid Callback"}
 
-    callback = data["Body"]["stkCallback"]
-    checkout_request_id = callback["CheckoutRequestID"]
-    result_code = callback["ResultCode"]
-    result_desc = callback["ResultDesc"]
+    log_payment_event("CALLBACK_RECEIVED", {"checkout_request_id": parsed.checkout_request_id, "result_code": parsed.result_code})
 
-    log_payment_event("CALLBACK_RECEIVED", {"checkout_request_id": checkout_request_id, "result_code": result_code})
+    if not await record_callback(db, parsed):
+        await db.rollback()
+        log_payment_event("CALLBACK_DUPLICATE", {"checkout_request_id": parsed.checkout_request_id})
+        return {"ResultCode": 0, "ResultDesc": "Callback Received"}
 
-    # Find payment
-    result = await db.execute(select(Payment).where(Payment.checkout_request_id == checkout_request_id))
-    payment = result.scalars().first()
-
-    if payment:
-        payment.callback_metadata = callback
-        if result_code == 0:
-            payment.status = "completed"
-            payment.completed_at = datetime.utcnow()
-            payment.reference = next((item["Value"] for item in callback["CallbackMetadata"]["Item"] if item["Name"] == "MpesaReceiptNumber"), None)
-            log_payment_event("PAYMENT_COMPLETED", {"checkout_request_id": checkout_request_id, "reference": payment.reference})
-        else:
-            payment.status = "failed"
-            payment.failure_reason = result_desc
-            log_payment_event("PAYMENT_FAILED", {"checkout_request_id": checkout_request_id, "reason": result_desc})
+    if settings.MPESA_CALLBACK_MODE == "queue":
+        await db.commit()
+        callback_workers.notify()
+        return {"ResultCode": 0, "ResultDesc": "Callback Received"}
 
+    try:
+        outcome = await apply_callback(db, parsed)
+    except UnknownPaymentError:
+        # The callback beat /stkpush's commit of the payment. Keep the delivery
+        # unprocessed and ask for a retry, which record_callback lets through.
         await db.commit()
+        raise HTTPException(status_code=503, detail="Payment not recorded yet, retry later")
+    await db.commit()
+    publish_outcome(outcome)
 
     return {"ResultCode": 0, "ResultDesc": "Callback Received"}
 
@@ -91,3 +99,41 @@ async def check_payment_status(
         "amount": payment.amount,
         "phone": payment.phone
     }
+
+@router.get("/payments/{checkout_request_id}/events")
+async def payment_events(checkout_request_id: str):
+    """
+    Server-Sent Events stream of a payment's status, replacing polling of
+    /api/payment-status. Sends the current status first, then every change,
+    and closes once the payment is settled or PAYMENT_EVENTS_TIMEOUT passes.
+    An expired payment is not settled: it still completes if paid late.
+    """
+    # Subscribe before reading the current status so no change can slip in between
+    subscription = hub.subscribe(payment_topic(checkout_request_id))
+
+    # Short-lived session: the stream itself must not hold a pooled connection
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Payment.status, Payment.id).where(Payment.checkout_request_id == checkout_request_id)
+        )
+        payment = result.first()
+
+    if not payment:
+        hub.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Payment not found")
+
+    async def stream():
+        async with subscription:
+            status = payment.status
+            yield format_sse({"checkout_request_id": checkout_request_id, "status": status}, event="status")
+
+            deadline = time.monotonic() + settings.PAYMENT_EVENTS_TIMEOUT
+            while PAYMENT_TRANSITIONS.get(status) and time.monotonic() < deadline:
+                event = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield HEARTBEAT
+                    continue
+                status = event["status"]
+                yield format_sse(event, event="status")
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,17 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from uuid import UUID
+from app.config import settings
 from app.database import get_db
 from app.models import Turf
-from app.schemas import TurfResponse, TurfCreate
+from app.schemas import TurfResponse, TurfCreate, TurfAvailability
+from app.services.availability import occupancy_index
+from app.services.turf_catalog import turf_catalog
+from app.utils.http_cache import cached_response
+from app.utils.query_budget import query_budget
 
 router = APIRouter(prefix="/api/turfs", tags=["turfs"])
 
+def resolve_availability_range(from_date: Optional[date], to_date: Optional[date]) -> tuple[date, date]:
+    """Default to a one week window starting today and reject oversized ranges"""
+    start = from_date or datetime.utcnow().date()
+    end = to_date or start + timedelta(days=6)
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must be on or after 'from'")
+    if (end - start).days + 1 > settings.AVAILABILITY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Availability range cannot exceed {settings.AVAILABILITY_MAX_DAYS} days"
+        )
+    return start, end
+
 @router.get("/", response_model=List[TurfResponse])
-async def get_turfs(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Turf))
-    return result.scalars().all()
+@query_budget(max_queries=1)
+async def get_turfs(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    The turf catalogue, served from memory. Clients revalidate with
+    If-None-Match and get a 304 while the catalogue is unchanged.
+    """
+    catalog = await turf_catalog.get(db)
+    return cached_response(request, catalog.body, catalog.etag, f"public, max-age={settings.TURF_CATALOG_MAX_AGE}")
 
 @router.post("/", response_model=TurfResponse)
 async def create_turf(turf: TurfCreate, db: AsyncSession = Depends(get_db)):
@@ -19,4 +45,33 @@ async def create_turf(turf: TurfCreate, db: AsyncSession = Depends(get_db)):
     db.add(new_turf)
     await db.commit()
     await db.refresh(new_turf)
+    turf_catalog.invalidate()
     return new_turf
+
+@router.get("/availability", response_model=List[TurfAvailability])
+async def get_all_turfs_availability(
+    from_date: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD), defaults to today"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day (YYYY-MM-DD), defaults to from + 6 days"),
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = resolve_availability_range(from_date, to_date)
+    await occupancy_index.ensure_loaded(db)
+
+    result = await db.execute(select(Turf.id))
+    return occupancy_index.availability(result.scalars().all(), start, end)
+
+@router.get("/{turf_id}/availability", response_model=TurfAvailability)
+async def get_turf_availability(
+    turf_id: UUID,
+    from_date: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD), defaults to today"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day (YYYY-MM-DD), defaults to from + 6 days"),
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = resolve_availability_range(from_date, to_date)
+
+    turf = await db.get(Turf, turf_id)
+    if not turf:
+        raise HTTPException(status_code=404, detail="Turf not found")
+
+    await occupancy_index.ensure_loaded(db)
+    return occupancy_index.availability([turf_id], start, end)[0]
@@ -6,7 +6,10 @@ from pydantic import BaseModel, EmailStr
 from uuid import UUID
 from app.database import get_db
 from app.models import User
-from app.dependencies.auth import get_current_user
+from app.dependencies.auth import AUTH_MAX_QUERIES, get_current_user, invalidate_cached_user
+from app.services.dashboard import invalidate_dashboard_cache
+from app.utils.query_budget import query_budget
+from app.utils.responses import list_response, response_columns
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -37,6 +40,7 @@ class UserResponse(UserBase):
 
 # Get all users (admin only in production - add auth middleware)
 @router.get("/", response_model=List[UserResponse])
+@query_budget(max_queries=1 + AUTH_MAX_QUERIES)
 async def get_users(
     skip: int = 0, 
     limit: int = 100, 
@@ -48,8 +52,8 @@ async def get_users(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Not authorized to view users"
         )
-    result = await db.execute(select(User).offset(skip).limit(limit))
-    return result.scalars().all()
+    result = await db.execute(select(*response_columns(User, UserResponse)).offset(skip).limit(limit))
+    return list_response(UserResponse, result.mappings())
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
@@ -77,6 +81,7 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    invalidate_dashboard_cache()
     return new_user
 
 # Update user
@@ -94,6 +99,8 @@ async def update_user(user_id: UUID, user_update: UserUpdate, db: AsyncSession =
     
     await db.commit()
     await db.refresh(user)
+    invalidate_cached_user(user.id)
+    invalidate_dashboard_cache()
     return user
 
 # Delete user
@@ -106,4 +113,6 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db)):
     
     await db.delete(user)
     await db.commit()
+    invalidate_cached_user(user_id)
+    invalidate_dashboard_cache()
     return None
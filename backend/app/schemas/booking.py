@@ -68,6 +68,16 @@ class TurfResponse(TurfBase):
     class Config:
         from_attributes = True
 
+# --- Availability Schemas ---
+class DayAvailability(BaseModel):
+    date: date
+    booked: List[str]
+    available: List[str]
+
+class TurfAvailability(BaseModel):
+    turf_id: UUID
+    days: List[DayAvailability]
+
 # --- Booking Schemas ---
 class BookingBase(BaseModel):
     turf_id: UUID
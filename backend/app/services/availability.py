@@ -0,0 +1,209 @@
+"""
+Slot availability engine.
+
+Keeps an in-process occupancy index of hourly slots per turf and per date,
+stored as a compact integer bitmap (bit N set = hour N is taken). The index
+is built once from the bookings table and then updated incrementally by the
+booking handlers, so availability lookups never scan the bookings table.
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Booking
+
+# Booking statuses that hold on to their slot
+ACTIVE_BOOKING_STATUSES = ("pending", "confirmed", "completed")
+
+HOURS_PER_DAY = 24
+_TIME_SLOT_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I %p", "%I%p")
+
+
+def parse_time_slot(time_slot: str) -> int:
+    """Return the starting hour (0-23) of a time slot such as "14:00" or "2:00 PM"."""
+    value = (time_slot or "").strip().upper()
+    for fmt in _TIME_SLOT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).hour
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time slot: {time_slot!r}. Expected format HH:MM")
+
+
+def slot_hours(start_hour: int, duration: Optional[int]) -> tuple[int, int]:
+    """
+    First and past-the-end hour of a booking starting at start_hour. Bookings
+    end at midnight at the latest: the index and the exclusion constraint
+    (through slot_range) both see the same hours.
+    """
+    hours = max(int(duration or 1), 1)
+    return start_hour, min(start_hour + hours, HOURS_PER_DAY)
+
+
+def slot_mask(start_hour: int, duration: Optional[int]) -> int:
+    """Bitmap of the hours covered by a booking starting at start_hour"""
+    start_hour, end_hour = slot_hours(start_hour, duration)
+    return ((1 << (end_hour - start_hour)) - 1) << start_hour
+
+
+def slot_range(day: date, time_slot: str, duration: Optional[int]) -> tuple[datetime, datetime]:
+    """Start and end timestamps of a booking, as stored in Booking.slot_start/slot_end"""
+    start_hour, end_hour = slot_hours(parse_time_slot(time_slot), duration)
+    midnight = datetime.combine(day, datetime.min.time())
+    return midnight + timedelta(hours=start_hour), midnight + timedelta(hours=end_hour)
+
+
+def format_hour(hour: int) -> str:
+    return f"{hour:02d}:00"
+
+
+class BookingSlot(NamedTuple):
+    """Snapshot of the slot-related columns of a booking"""
+    turf_id: UUID
+    date: date
+    time_slot: str
+    duration: Optional[int]
+    status: Optional[str]
+
+    @classmethod
+    def from_booking(cls, booking: Booking) -> "BookingSlot":
+        return cls(booking.turf_id, booking.date, booking.time_slot, booking.duration, booking.status)
+
+
+class OccupancyIndex:
+    """
+    Per-turf, per-date bitmap of booked hourly slots.
+
+    The index is lazily loaded on first use and rebuilt from the database every
+    AVAILABILITY_REFRESH_SECONDS so writes made by other worker processes are
+    eventually picked up. Writes made by this process are applied immediately
+    through add_booking/remove_booking.
+    """
+
+    def __init__(self, refresh_seconds: int = 60):
+        self.refresh_seconds = refresh_seconds
+        self._slots: Dict[UUID, Dict[date, int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._is_stale():
+            return
+        async with self._lock:
+            # Another request may have refreshed the index while we waited
+            if self._is_stale():
+                await self.reload(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Rebuild the index from all active bookings from today onwards"""
+        result = await db.execute(
+            select(Booking.turf_id, Booking.date, Booking.time_slot, Booking.duration).where(
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                Booking.date >= datetime.utcnow().date(),
+            )
+        )
+        slots: Dict[UUID, Dict[date, int]] = {}
+        for turf_id, day, time_slot, duration in result.all():
+            try:
+                mask = slot_mask(parse_time_slot(time_slot), duration)
+            except ValueError:
+                continue
+            days = slots.setdefault(turf_id, {})
+            days[day] = days.get(day, 0) | mask
+
+        self._slots = slots
+        self._loaded_at = time.monotonic()
+
+    async def refresh_day(self, db: AsyncSession, turf_id: UUID, day: date) -> None:
+        """
+        Re-read one turf's bookings for one day, e.g. to confirm a slot the
+        index reports as taken before rejecting a booking: cancellations and
+        moves made by other workers only reach the index on the next reload.
+        """
+        result = await db.execute(
+            select(Booking.time_slot, Booking.duration).where(
+                Booking.turf_id == turf_id,
+                Booking.date == day,
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            )
+        )
+        mask = 0
+        for time_slot, duration in result.all():
+            try:
+                mask |= slot_mask(parse_time_slot(time_slot), duration)
+            except ValueError:
+                continue
+        days = self._slots.setdefault(turf_id, {})
+        if mask:
+            days[day] = mask
+        else:
+            days.pop(day, None)
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next query"""
+        self._loaded_at = None
+
+    def add_booking(self, booking: Booking | BookingSlot) -> None:
+        if booking.status not in ACTIVE_BOOKING_STATUSES:
+            return
+        try:
+            mask = slot_mask(parse_time_slot(booking.time_slot), booking.duration)
+        except ValueError:
+            return
+        days = self._slots.setdefault(booking.turf_id, {})
+        days[booking.date] = days.get(booking.date, 0) | mask
+
+    def remove_booking(self, booking: Booking | BookingSlot) -> None:
+        # Clearing the booking's bits cannot free an hour another booking holds:
+        # the exclusion constraint keeps active bookings of a turf from sharing hours
+        if booking.status not in ACTIVE_BOOKING_STATUSES:
+            return
+        try:
+            mask = slot_mask(parse_time_slot(booking.time_slot), booking.duration)
+        except ValueError:
+            return
+        days = self._slots.get(booking.turf_id)
+        if not days or booking.date not in days:
+            return
+        remaining = days[booking.date] & ~mask
+        if remaining:
+            days[booking.date] = remaining
+        else:
+            del days[booking.date]
+
+    def occupied(self, turf_id: UUID, day: date) -> int:
+        return self._slots.get(turf_id, {}).get(day, 0)
+
+    def is_free(self, turf_id: UUID, day: date, time_slot: str, duration: Optional[int]) -> bool:
+        return not self.occupied(turf_id, day) & slot_mask(parse_time_slot(time_slot), duration)
+
+    def availability(self, turf_ids: Iterable[UUID], start: date, end: date) -> List[dict]:
+        """Booked and free opening-hour slots for each turf and each day in [start, end]"""
+        opening_hours = range(settings.OPENING_HOUR, settings.CLOSING_HOUR)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+        response = []
+        for turf_id in turf_ids:
+            turf_slots = self._slots.get(turf_id, {})
+            turf_days = []
+            for day in days:
+                mask = turf_slots.get(day, 0)
+                booked, available = [], []
+                for hour in opening_hours:
+                    (booked if mask >> hour & 1 else available).append(format_hour(hour))
+                turf_days.append({"date": day, "booked": booked, "available": available})
+            response.append({"turf_id": turf_id, "days": turf_days})
+        return response
+
+
+# Shared index for this worker process
+occupancy_index = OccupancyIndex(refresh_seconds=settings.AVAILABILITY_REFRESH_SECONDS)
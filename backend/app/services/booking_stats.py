@@ -0,0 +1,90 @@
+"""
+Incremental maintenance of the daily_booking_stats rollup.
+
+Every booking contributes (+1 booking, +amount revenue) to the row keyed by
+(creation day, turf, status). Handlers that create bookings or change their
+turf/status call the functions below inside the same transaction, so the
+rollup commits (or rolls back) together with the booking itself.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Booking, DailyBookingStat
+
+
+class StatsKey(NamedTuple):
+    """The columns of a booking that decide which rollup row it counts towards"""
+    day: date
+    turf_id: UUID
+    status: str
+    amount: Decimal
+
+    @classmethod
+    def from_booking(cls, booking: Booking) -> "StatsKey":
+        created_at = booking.created_at or datetime.utcnow()
+        return cls(created_at.date(), booking.turf_id, booking.status or "pending", booking.amount or Decimal(0))
+
+
+async def apply_deltas(db: AsyncSession, deltas: Iterable[Tuple[StatsKey, int]]) -> None:
+    """Add sign * (1 booking, amount) to the rollup row of each key, in one statement"""
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for key, sign in deltas:
+        row = totals[(key.day, key.turf_id, key.status)]
+        row[0] += sign
+        row[1] += sign * Decimal(key.amount)
+
+    values = [
+        {"day": day, "turf_id": turf_id, "status": status, "bookings": bookings, "revenue": revenue}
+        for (day, turf_id, status), (bookings, revenue) in totals.items()
+        if bookings or revenue
+    ]
+    if not values:
+        return
+
+    stmt = insert(DailyBookingStat).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyBookingStat.day, DailyBookingStat.turf_id, DailyBookingStat.status],
+        set_={
+            "bookings": DailyBookingStat.bookings + stmt.excluded.bookings,
+            "revenue": DailyBookingStat.revenue + stmt.excluded.revenue,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_booking_created(db: AsyncSession, booking: Booking) -> None:
+    await apply_deltas(db, [(StatsKey.from_booking(booking), 1)])
+
+
+async def record_booking_changed(db: AsyncSession, previous: StatsKey, booking: Booking) -> None:
+    current = StatsKey.from_booking(booking)
+    if current != previous:
+        await apply_deltas(db, [(previous, -1), (current, 1)])
+
+
+BACKFILL_SQL = """
+INSERT INTO daily_booking_stats (day, turf_id, status, bookings, revenue)
+SELECT CAST(created_at AS DATE), turf_id, COALESCE(status, 'pending'), count(*), COALESCE(sum(amount), 0)
+FROM bookings
+WHERE created_at IS NOT NULL
+GROUP BY CAST(created_at AS DATE), turf_id, COALESCE(status, 'pending')
+"""
+
+
+async def backfill(db: AsyncSession) -> int:
+    """
+    Rebuild the whole rollup from the bookings table. The exclusive lock makes
+    concurrent booking writes wait until the rebuilt rows are committed.
+    """
+    await db.execute(text("LOCK TABLE daily_booking_stats IN EXCLUSIVE MODE"))
+    await db.execute(text("DELETE FROM daily_booking_stats"))
+    result = await db.execute(text(BACKFILL_SQL))
+    await db.commit()
+    return result.rowcount
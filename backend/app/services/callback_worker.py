@@ -0,0 +1,134 @@
+"""
+Background ingestion of queued M-Pesa callbacks.
+
+In MPESA_CALLBACK_MODE=queue the /api/callback handler only validates the
+callback, appends it to the payment_callbacks table (the durable queue) and
+acknowledges Safaricom immediately. The worker pool below drains unprocessed
+rows in batches with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+workers across processes can share the queue without double-processing.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import PaymentCallback
+from app.services.payment_callbacks import parse_callback, apply_callback, publish_outcome
+from app.utils.logger import log_payment_event
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackWorkerPool:
+    def __init__(self, workers: int, batch_size: int, poll_interval: float, max_attempts: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.processed = 0
+        self.failed = 0
+        self.last_lag_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"callback-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a callback was enqueued"""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                drained = await self.drain_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("⚠️ Callback worker error: %s", e)
+                drained = 0
+
+            if drained < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain_batch(self) -> int:
+        """Apply up to batch_size queued callbacks in one transaction. Returns how many were taken."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(PaymentCallback)
+                .where(PaymentCallback.processed_at.is_(None))
+                .order_by(PaymentCallback.received_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                return 0
+
+            now = datetime.utcnow()
+            outcomes = []
+            self.last_lag_seconds = max((now - row.received_at).total_seconds() for row in rows)
+
+            for row in rows:
+                parsed = parse_callback({"Body": {"stkCallback": row.payload}})
+                try:
+                    # Savepoint per callback so one bad row cannot poison the batch
+                    async with db.begin_nested():
+                        outcomes.append(await apply_callback(db, parsed))
+                    self.processed += 1
+                except Exception as e:
+                    row.attempts = (row.attempts or 0) + 1
+                    row.last_error = str(e)[:500]
+                    if row.attempts >= self.max_attempts:
+                        row.processed_at = now
+                        self.failed += 1
+                        log_payment_event("CALLBACK_DEAD_LETTERED", {"checkout_request_id": row.checkout_request_id, "error": row.last_error})
+
+            await db.commit()
+            for outcome in outcomes:
+                publish_outcome(outcome)
+            return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+        }
+
+
+async def queue_depth(db) -> tuple[int, Optional[float]]:
+    """Number of unprocessed callbacks and the age in seconds of the oldest one"""
+    result = await db.execute(
+        select(func.count(), func.min(PaymentCallback.received_at)).where(PaymentCallback.processed_at.is_(None))
+    )
+    depth, oldest = result.one()
+    lag = (datetime.utcnow() - oldest).total_seconds() if oldest else None
+    return depth, lag
+
+
+callback_workers = CallbackWorkerPool(
+    workers=settings.CALLBACK_WORKERS,
+    batch_size=settings.CALLBACK_BATCH_SIZE,
+    poll_interval=settings.CALLBACK_POLL_INTERVAL,
+    max_attempts=settings.CALLBACK_MAX_ATTEMPTS,
+)
@@ -0,0 +1,40 @@
+"""
+Short-lived response cache for the admin dashboard.
+
+All admin/manager callers share one cached copy of each dashboard payload, so
+a room full of managers refreshing the page costs one query per TTL window.
+Booking and user writes call invalidate_dashboard_cache() so totals do not
+lag behind changes made through this worker.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from app.config import settings
+from app.utils.cache import LRUCache
+
+dashboard_cache = LRUCache(maxsize=16, ttl=settings.DASHBOARD_CACHE_TTL)
+_load_lock = asyncio.Lock()
+_generation = 0
+
+
+async def get_cached(key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for key, running loader at most once per miss"""
+    value = dashboard_cache.get(key)
+    if value is not None:
+        return value
+
+    async with _load_lock:
+        value = dashboard_cache.get(key)
+        if value is None:
+            generation = _generation
+            value = await loader()
+            # Skip caching if a write invalidated the cache while we were loading
+            if generation == _generation:
+                dashboard_cache.set(key, value)
+    return value
+
+
+def invalidate_dashboard_cache() -> None:
+    global _generation
+    _generation += 1
+    dashboard_cache.clear()
@@ -1,107 +1,263 @@
+import asyncio
 import httpx
 import base64
+import logging
 import time
 from datetime import datetime
+from typing import Optional
 from app.config import settings
+from app.utils.metrics import Histogram
 from fastapi import HTTPException
 
-async def get_access_token() -> str:
-    """Generate M-Pesa Access Token"""
-    consumer_key = settings.MPESA_CONSUMER_KEY
-    consumer_secret = settings.MPESA_CONSUMER_SECRET
-    
-    if not consumer_key or not consumer_secret:
-        raise HTTPException(status_code=500, detail="M-Pesa credentials not configured")
-        
-    api_url = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-    if settings.MPESA_ENV == "production":
-        api_url = "https://api.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-        
-    auth_string = f"{consumer_key}:{consumer_secret}"
-    encoded_auth = base64.b64encode(auth_string.encode()).decode()
-    
-    headers = {"Authorization": f"Basic {encoded_auth}"}
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SANDBOX_BASE_URL = "https://sandbox.safaricom.co.ke"
+PRODUCTION_BASE_URL = "https://api.safaricom.co.ke"
+
+SIMULATED_TOKEN = "SIMULATED_TOKEN_AUTH_FAILED"
+
+mpesa_request_seconds = Histogram(
+    "mpesa_request_duration_seconds", "Daraja API call latency (until response headers)", ("path", "status")
+)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to time every request; failures are recorded with status "error"."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            mpesa_request_seconds.labels(request.url.path, status).observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class MpesaClient:
+    """
+    Long-lived Daraja API client.
+
+    Keeps one pooled keep-alive httpx client for the lifetime of the app and
+    caches the OAuth access token until shortly before it expires. Concurrent
+    callers that need a new token share a single in-flight refresh request.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or settings.MPESA_BASE_URL or (
+            PRODUCTION_BASE_URL if settings.MPESA_ENV == "production" else SANDBOX_BASE_URL
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.MPESA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MPESA_MAX_CONNECTIONS,
+                keepalive_expiry=60.0,
+            ),
+            http2=HTTP2_AVAILABLE,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(15.0, connect=10.0),
+            transport=InstrumentedTransport(transport) if settings.METRICS_ENABLED else transport,
+        )
+
+    async def close(self) -> None:
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("MpesaClient.start() must be called before making requests")
+        return self._client
+
+    async def get_access_token(self) -> str:
+        """Return a cached access token, refreshing it when it is about to expire"""
+        await self.start()
+        remaining = self._token_expires_at - time.monotonic()
+
+        if self._token and remaining > settings.MPESA_TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        if self._token and remaining > 0:
+            # Still valid: refresh in the background and keep serving the current token
+            self._start_refresh()
+            return self._token
+
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a token refresh unless one is already in flight (single-flight)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch_access_token())
+            # Background refresh failures are surfaced to the next caller that awaits a refresh
+            self._refresh_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refresh_task
+
+    async def _fetch_access_token(self) -> str:
+        """Generate M-Pesa Access Token"""
+        consumer_key = settings.MPESA_CONSUMER_KEY
+        consumer_secret = settings.MPESA_CONSUMER_SECRET
+
+        if not consumer_key or not consumer_secret:
+            raise HTTPException(status_code=500, detail="M-Pesa credentials not configured")
+
+        auth_string = f"{consumer_key}:{consumer_secret}"
+        encoded_auth = base64.b64encode(auth_string.encode()).decode()
+        headers = {"Authorization": f"Basic {encoded_auth}"}
+
         try:
-            response = await client.get(api_url, headers=headers)
+            response = await self.client.get(
+                "/oauth/v1/generate", params={"grant_type": "client_credentials"}, headers=headers
+            )
             response.raise_for_status()
-            return response.json()["access_token"]
+            data = response.json()
         except httpx.TimeoutException:
-            print("M-Pesa Token Request Timeout")
+            logger.warning("M-Pesa Token Request Timeout")
             if settings.MPESA_ENV == "sandbox":
-                print("⚠️ Sandbox timeout - returning simulation token")
-                return "SIMULATED_TOKEN_AUTH_FAILED"
+                logger.warning("⚠️ Sandbox timeout - returning simulation token")
+                return SIMULATED_TOKEN
             raise HTTPException(status_code=504, detail="M-Pesa authentication timeout")
         except httpx.HTTPError as e:
-            print(f"M-Pesa Token Error: {e}")
+            logger.error("M-Pesa Token Error: %s", e)
 
             # In sandbox mode, allow simulation fallback
             if settings.MPESA_ENV == "sandbox":
-                print("⚠️ Sandbox auth failed - returning simulation token")
-                return "SIMULATED_TOKEN_AUTH_FAILED"
+                logger.warning("⚠️ Sandbox auth failed - returning simulation token")
+                return SIMULATED_TOKEN
 
             raise HTTPException(status_code=502, detail="Failed to authenticate with M-Pesa")
 
-async def initiate_stk_push(phone: str, amount: int) -> dict:
-    """Initiate STK Push"""
-    access_token = await get_access_token()
-
-    # SIMULATION MODE (sandbox fallback)
-    if access_token == "SIMULATED_TOKEN_AUTH_FAILED":
-        print("⚠️ Using simulated STK Push response")
-        return {
-            "MerchantRequestID": f"Mj_{int(time.time())}",
-            "CheckoutRequestID": f"ws_CO_{int(time.time())}_0000",
-            "ResponseCode": "0",
-            "ResponseDescription": "Success. Request accepted for processing",
-            "CustomerMessage": "Success. Request accepted for processing (SIMULATED)"
+        self._token = data["access_token"]
+        # Daraja returns expires_in as a string of seconds (usually "3599")
+        self._token_expires_at = time.monotonic() + float(data.get("expires_in", 3599))
+        return self._token
+
+    async def initiate_stk_push(self, phone: str, amount: int) -> dict:
+        """Initiate STK Push"""
+        access_token = await self.get_access_token()
+
+        # SIMULATION MODE (sandbox fallback)
+        if access_token == SIMULATED_TOKEN:
+            logger.warning("⚠️ Using simulated STK Push response")
+            return {
+                "MerchantRequestID": f"Mj_{int(time.time())}",
+                "CheckoutRequestID": f"ws_CO_{int(time.time())}_0000",
+                "ResponseCode": "0",
+                "ResponseDescription": "Success. Request accepted for processing",
+                "CustomerMessage": "Success. Request accepted for processing (SIMULATED)"
+            }
+
+        timestamp, password = stk_password()
+
+        # Format phone number (Ensure 254...)
+        formatted_phone = phone.replace("+", "").replace(" ", "")
+        if formatted_phone.startswith("0"):
+            formatted_phone = "254" + formatted_phone[1:]
+
+        # Use configurable callback URL or default to localhost
+        callback_url = settings.CALLBACK_URL or f"http://localhost:{settings.PORT}/api/callback"
+
+        payload = {
+            "BusinessShortCode": settings.MPESA_SHORTCODE,
+            "Password": password,
+            "Timestamp": timestamp,
+            "TransactionType": "CustomerPayBillOnline",
+            "Amount": amount,
+            "PartyA": formatted_phone,
+            "PartyB": settings.MPESA_SHORTCODE,
+            "PhoneNumber": formatted_phone,
+            "CallBackURL": callback_url,
+            "AccountReference": "GoalHub",
+            "TransactionDesc": "Turf Booking"
         }
 
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    password_str = f"{settings.MPESA_SHORTCODE}{settings.MPESA_PASSKEY}{timestamp}"
-    password = base64.b64encode(password_str.encode()).decode()
-
-    # Format phone number (Ensure 254...)
-    formatted_phone = phone.replace("+", "").replace(" ", "")
-    if formatted_phone.startswith("0"):
-        formatted_phone = "254" + formatted_phone[1:]
-
-    # Use configurable callback URL or default to localhost
-    callback_url = settings.CALLBACK_URL or f"http://localhost:{settings.PORT}/api/callback"
-
-    payload = {
-        "BusinessShortCode": settings.MPESA_SHORTCODE,
-        "Password": password,
-        "Timestamp": timestamp,
-        "TransactionType": "CustomerPayBillOnline",
-        "Amount": amount,
-        "PartyA": formatted_phone,
-        "PartyB": settings.MPESA_SHORTCODE,
-        "PhoneNumber": formatted_phone,
-        "CallBackURL": callback_url,
-        "AccountReference": "GoalHub",
-        "TransactionDesc": "Turf Booking"
-    }
-    
-    api_url = "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest"
-    if settings.MPESA_ENV == "production":
-        api_url = "https://api.safaricom.co.ke/mpesa/stkpush/v1/processrequest"
-        
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-    async with httpx.AsyncClient(timeout=15.0) as client:
+        headers = {"Authorization": f"Bearer {access_token}"}
+
         try:
-            response = await client.post(api_url, json=payload, headers=headers)
+            response = await self.client.post("/mpesa/stkpush/v1/processrequest", json=payload, headers=headers)
             response_data = response.json()
 
-            # Log response (in a real app use a logger)
-            print(f"STK Push Response: {response_data}")
+            logger.debug("STK Push Response: %s", response_data)
 
             return response_data
         except httpx.TimeoutException:
-            print("STK Push Request Timeout")
+            logger.warning("STK Push Request Timeout")
             raise HTTPException(status_code=504, detail="M-Pesa STK Push request timeout")
         except httpx.HTTPError as e:
-            print(f"STK Push Error: {e}")
+            logger.error("STK Push Error: %s", e)
             raise HTTPException(status_code=502, detail="Failed to initiate STK Push")
+
+    async def query_stk_status(self, checkout_request_id: str) -> dict:
+        """
+        Ask Daraja for the result of an STK push (STK Push Query API).
+        Returns the raw response; "ResultCode" is present once the request has
+        completed, while Daraja answers with an "errorCode" as long as it is
+        still being processed.
+        """
+        access_token = await self.get_access_token()
+        if access_token == SIMULATED_TOKEN:
+            raise HTTPException(status_code=502, detail="M-Pesa unavailable (simulation mode)")
+
+        timestamp, password = stk_password()
+        payload = {
+            "BusinessShortCode": settings.MPESA_SHORTCODE,
+            "Password": password,
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id,
+        }
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        try:
+            response = await self.client.post("/mpesa/stkpushquery/v1/query", json=payload, headers=headers)
+            return response.json()
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="M-Pesa STK query timeout")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("STK Query Error: %s", e)
+            raise HTTPException(status_code=502, detail="Failed to query STK Push status")
+
+
+def stk_password() -> tuple[str, str]:
+    """Timestamp and password for STK requests (base64 of shortcode + passkey + timestamp)"""
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    password_str = f"{settings.MPESA_SHORTCODE}{settings.MPESA_PASSKEY}{timestamp}"
+    return timestamp, base64.b64encode(password_str.encode()).decode()
+
+
+# Shared client, started and closed by the application lifespan
+mpesa_client = MpesaClient()
+
+
+async def get_access_token() -> str:
+    """Generate M-Pesa Access Token"""
+    return await mpesa_client.get_access_token()
+
+
+async def initiate_stk_push(phone: str, amount: int) -> dict:
+    """Initiate STK Push"""
+    return await mpesa_client.initiate_stk_push(phone, amount)
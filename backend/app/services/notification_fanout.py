@@ -0,0 +1,142 @@
+"""
+Bulk notification fan-out.
+
+A fan-out job sends one message to every user matched by an audience query.
+Rows are generated inside PostgreSQL with INSERT ... SELECT, in batches
+walking the audience in user_id order (keyset), so no recipient data makes a
+round trip through the application. Every batch commits together with the
+job's progress counter.
+
+Jobs run as FastAPI background tasks in the worker that accepted them. A job
+interrupted by a worker restart stays "running" with its partial progress.
+"""
+import logging
+from datetime import date, datetime
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import DateTime, String, false, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Booking, Notification, NotificationJob, User
+from app.services.availability import ACTIVE_BOOKING_STATUSES
+from app.services.notifications import record_created_for
+from app.services.pubsub import hub, user_topic
+
+logger = logging.getLogger(__name__)
+
+def audience_query(audience: dict):
+    """SELECT of the distinct recipient ids (column "user_id") for an audience spec"""
+    kind = audience["kind"]
+    if kind == "all_users":
+        return select(User.id.label("user_id")).where(User.is_active.is_not(False))
+    if kind == "role":
+        return select(User.id.label("user_id")).where(User.role == audience["role"], User.is_active.is_not(False))
+    if kind == "turf_bookings":
+        return (
+            select(Booking.user_id.label("user_id"))
+            .where(
+                Booking.turf_id == UUID(audience["turf_id"]),
+                Booking.date == date.fromisoformat(audience["date"]),
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                Booking.user_id.is_not(None),
+            )
+            .distinct()
+        )
+    raise ValueError(f"Unknown audience {kind!r}")
+
+
+def insert_batch(job: NotificationJob, after: Optional[UUID], batch_size: int, created_at: datetime):
+    """INSERT ... SELECT creating the job's notifications for the next batch_size recipients after `after`"""
+    recipients = audience_query(job.audience).subquery()
+    page = select(recipients.c.user_id).order_by(recipients.c.user_id).limit(batch_size)
+    if after is not None:
+        page = page.where(recipients.c.user_id > after)
+    page = page.subquery()
+
+    notifications = Notification.__table__
+    return (
+        notifications.insert()
+        .from_select(
+            ["id", "user_id", "type", "message", "read", "created_at"],
+            select(
+                func.gen_random_uuid(),
+                page.c.user_id,
+                literal(job.type, String),
+                literal(job.message, String),
+                false(),
+                literal(created_at, DateTime),
+            ),
+        )
+        .returning(notifications.c.id, notifications.c.user_id)
+    )
+
+
+async def count_audience(db: AsyncSession, audience: dict) -> int:
+    return (await db.execute(select(func.count()).select_from(audience_query(audience).subquery()))).scalar()
+
+
+def deliver_batch(job: NotificationJob, rows: List, created_at: datetime) -> None:
+    """Push a committed batch to connected recipients and bump their unread counters"""
+    created = created_at.isoformat()
+    hub.publish_many([
+        (user_topic(row.user_id), {
+            "id": str(row.id),
+            "type": job.type,
+            "message": job.message,
+            "user_id": str(row.user_id),
+            "read": False,
+            "created_at": created,
+        })
+        for row in rows
+    ])
+    record_created_for(row.user_id for row in rows)
+
+
+async def run_fanout_job(job_id: UUID, batch_size: int = settings.FANOUT_BATCH_SIZE) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(NotificationJob, job_id)
+        if job is None:
+            logger.warning("⚠️ Notification fan-out %s not found, nothing to send", job_id)
+            return
+
+        try:
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.total = await count_audience(db, job.audience)
+            await db.commit()
+
+            created_at = datetime.utcnow()
+            after = None
+            while True:
+                rows = (await db.execute(insert_batch(job, after, batch_size, created_at))).all()
+                if not rows:
+                    break
+                await db.execute(
+                    update(NotificationJob)
+                    .where(NotificationJob.id == job_id)
+                    .values(sent=NotificationJob.sent + len(rows))
+                )
+                await db.commit()
+                deliver_batch(job, rows, created_at)
+                after = max(row.user_id for row in rows)
+                if len(rows) < batch_size:
+                    break
+
+            await db.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id)
+                .values(status="completed", finished_at=datetime.utcnow())
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.exception("❌ Notification fan-out %s failed: %s", job_id, e)
+            await db.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id)
+                .values(status="failed", error=str(e), finished_at=datetime.utcnow())
+            )
+            await db.commit()
@@ -0,0 +1,191 @@
+"""
+Per-user notification feed, unread counters and real-time delivery.
+
+A notification with a user_id belongs to that user. One without a user_id
+(booking alerts and other system messages) belongs to the shared
+admin/manager inbox: every admin and manager sees it, and marking it read
+marks it read for all of them.
+
+Unread counts are cached per owner (a user id, or None for the staff inbox)
+and adjusted in place when notifications are created or marked read, so the
+bell badge normally costs no query at all. The cache TTL bounds how long a
+count may miss writes made by other workers.
+"""
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select, tuple_, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.pubsub import STAFF_TOPIC, hub, user_topic
+from app.utils.cache import LRUCache
+
+# Unread notifications per owner id (None = staff inbox)
+unread_counts = LRUCache(maxsize=settings.NOTIFICATION_COUNT_CACHE_SIZE, ttl=settings.NOTIFICATION_COUNT_CACHE_TTL)
+_generation = 0
+
+
+def is_staff(user: User) -> bool:
+    return user.role in ["admin", "manager"]
+
+
+def inbox_owners(user: User) -> List[Optional[UUID]]:
+    """Owner ids whose notifications the user sees"""
+    return [user.id, None] if is_staff(user) else [user.id]
+
+
+def owned_by(owner: Optional[UUID]):
+    return Notification.user_id.is_(None) if owner is None else Notification.user_id == owner
+
+
+def visible_to(user: User):
+    return or_(*(owned_by(owner) for owner in inbox_owners(user)))
+
+
+def is_unread():
+    # Matches the partial index ix_notifications_unread_user_id
+    return Notification.read.is_not(True)
+
+
+def notification_payload(notification: Notification) -> dict:
+    """JSON-safe event body, shaped like NotificationResponse"""
+    return {
+        "id": str(notification.id),
+        "type": notification.type,
+        "message": notification.message,
+        "user_id": str(notification.user_id) if notification.user_id else None,
+        "read": notification.read,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def notification_topics(user: User) -> Tuple[str, ...]:
+    """Topics a user's stream listens on"""
+    return tuple(STAFF_TOPIC if owner is None else user_topic(owner) for owner in inbox_owners(user))
+
+
+def publish_notification(notification: Notification) -> int:
+    """Push a committed notification to its recipient's open streams"""
+    topic = user_topic(notification.user_id) if notification.user_id else STAFF_TOPIC
+    return hub.publish(topic, notification_payload(notification))
+
+
+# Columns of a feed entry, shaped like NotificationResponse
+FEED_COLUMNS = (
+    Notification.id, Notification.type, Notification.message,
+    Notification.user_id, Notification.read, Notification.created_at,
+)
+
+
+def feed_query(user: User, cursor: Optional[Tuple], limit: int, unread_only: bool = False):
+    """
+    Newest-first page of the user's notifications after cursor (created_at, id),
+    as FEED_COLUMNS rows.
+
+    Each inbox is read with its own index-ordered range scan on
+    (user_id, created_at, id); staff get both inboxes merged, which still
+    touches at most 2 * limit rows.
+    """
+    pages = []
+    for owner in inbox_owners(user):
+        page = select(*FEED_COLUMNS).where(owned_by(owner))
+        if unread_only:
+            page = page.where(is_unread())
+        if cursor:
+            page = page.where(tuple_(Notification.created_at, Notification.id) < cursor)
+        pages.append(page.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit))
+
+    if len(pages) == 1:
+        return pages[0]
+    merged = union_all(*pages).subquery()
+    return select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(limit)
+
+
+async def notifications_since(db: AsyncSession, user: User, last_event_id: UUID, limit: int) -> List[dict]:
+    """
+    Notifications visible to the user that were created after the one with
+    id last_event_id (oldest first), for replay when a stream reconnects.
+    Returns nothing if that notification is unknown.
+    """
+    last = (await db.execute(
+        select(Notification.created_at, Notification.id).where(
+            and_(Notification.id == last_event_id, visible_to(user))
+        )
+    )).first()
+    if last is None:
+        return []
+
+    result = await db.execute(
+        select(Notification)
+        .where(
+            visible_to(user),
+            tuple_(Notification.created_at, Notification.id) > tuple_(last.created_at, last.id),
+        )
+        .order_by(Notification.created_at, Notification.id)
+        .limit(limit)
+    )
+    return [notification_payload(notification) for notification in result.scalars()]
+
+
+async def unread_count(db: AsyncSession, user: User) -> int:
+    total = 0
+    for owner in inbox_owners(user):
+        count = unread_counts.get(owner)
+        if count is None:
+            generation = _generation
+            count = (await db.execute(
+                select(func.count()).select_from(Notification).where(owned_by(owner), is_unread())
+            )).scalar()
+            # Skip caching if a write adjusted the counters while we were counting
+            if generation == _generation:
+                unread_counts.set(owner, count)
+        total += count
+    return total
+
+
+def _adjust_unread(owner: Optional[UUID], delta: int) -> None:
+    global _generation
+    _generation += 1
+    count = unread_counts.get(owner)
+    if count is not None:
+        unread_counts.set(owner, max(count + delta, 0))
+
+
+def record_created(notification: Notification) -> None:
+    """Count a committed notification as unread"""
+    if not notification.read:
+        _adjust_unread(notification.user_id, 1)
+
+
+def record_created_for(user_ids: Iterable[UUID]) -> None:
+    """Count one new unread notification for each user (bulk inserts)"""
+    for user_id in user_ids:
+        _adjust_unread(user_id, 1)
+
+
+async def mark_read(db: AsyncSession, user: User, ids: Optional[Iterable[UUID]] = None) -> List[UUID]:
+    """
+    Mark the given notifications (or all of them when ids is None) read with
+    a single UPDATE, limited to the user's inboxes. Commits, then adjusts
+    the unread counters. Returns the ids that changed.
+    """
+    statement = (
+        update(Notification)
+        .where(visible_to(user), is_unread())
+        .values(read=True)
+        .returning(Notification.id, Notification.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        statement = statement.where(Notification.id.in_(list(ids)))
+    rows = (await db.execute(statement)).all()
+    await db.commit()
+
+    for owner in inbox_owners(user):
+        changed = sum(1 for row in rows if row.user_id == owner)
+        if changed:
+            _adjust_unread(owner, -changed)
+    return [row.id for row in rows]
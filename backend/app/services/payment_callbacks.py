@@ -0,0 +1,249 @@
+"""
+Idempotent processing of M-Pesa STK callbacks.
+
+A callback is applied with a single conditional UPDATE that only matches
+payments whose current status may legally move to the new one (see
+PAYMENT_TRANSITIONS), so concurrent, retried and out-of-order deliveries
+cannot overwrite a settled payment. Each distinct delivery is also recorded
+under a dedupe key, letting exact duplicates be acknowledged without touching
+the payments table at all.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Booking, Payment, PaymentCallback
+from app.models.payment import payment_statuses_leading_to
+from app.services.availability import BookingSlot, occupancy_index
+from app.services.booking_stats import StatsKey, apply_deltas
+from app.services.dashboard import invalidate_dashboard_cache
+from app.services.pubsub import hub, payment_topic
+from app.utils.logger import log_payment_event
+
+
+class UnknownPaymentError(LookupError):
+    """
+    A callback arrived for a checkout request with no payment row yet:
+    /api/stkpush commits the payment only after Daraja has answered, and the
+    callback can beat it. The callback stays unprocessed so a retry or the
+    queue workers can apply it once the payment exists.
+    """
+
+
+@dataclass(frozen=True)
+class ParsedCallback:
+    checkout_request_id: str
+    result_code: int
+    result_desc: str
+    receipt: Optional[str]
+    callback: dict
+
+    @property
+    def succeeded(self) -> bool:
+        return self.result_code == 0
+
+    @property
+    def dedupe_key(self) -> str:
+        raw = f"{self.checkout_request_id}:{self.result_code}:{self.receipt or ''}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def parse_callback(data: dict) -> Optional[ParsedCallback]:
+    """Extract the fields we need from a Daraja callback body, or None if it is malformed"""
+    try:
+        callback = data["Body"]["stkCallback"]
+        checkout_request_id = str(callback["CheckoutRequestID"])
+        result_code = int(callback["ResultCode"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    receipt = None
+    if result_code == 0:
+        items = (callback.get("CallbackMetadata") or {}).get("Item") or []
+        receipt = next((item.get("Value") for item in items if item.get("Name") == "MpesaReceiptNumber"), None)
+
+    return ParsedCallback(checkout_request_id, result_code, str(callback.get("ResultDesc", "")), receipt, callback)
+
+
+@dataclass
+class CallbackOutcome:
+    """What applying a callback changed, for the post-commit side effects"""
+    checkout_request_id: str
+    status: str
+    payment_id: UUID
+    booking_ids: List[UUID] = field(default_factory=list)
+    released_slots: List[BookingSlot] = field(default_factory=list)
+
+
+async def record_callback(db: AsyncSession, parsed: ParsedCallback) -> bool:
+    """
+    Store the delivery. Returns False if the same callback was already
+    received and processed; a retry of one still waiting for its payment
+    (see UnknownPaymentError) is let through to be applied again.
+    """
+    statement = insert(PaymentCallback).values(
+        dedupe_key=parsed.dedupe_key,
+        checkout_request_id=parsed.checkout_request_id,
+        result_code=parsed.result_code,
+        payload=parsed.callback,
+        received_at=datetime.utcnow(),
+    )
+    result = await db.execute(
+        statement
+        .on_conflict_do_update(
+            index_elements=[PaymentCallback.dedupe_key],
+            set_={"received_at": statement.excluded.received_at},
+            where=PaymentCallback.processed_at.is_(None),
+        )
+        .returning(PaymentCallback.dedupe_key)
+    )
+    return result.first() is not None
+
+
+async def apply_callback(db: AsyncSession, parsed: ParsedCallback) -> Optional[CallbackOutcome]:
+    """
+    Move the payment to completed/failed if its current status allows it, and
+    confirm (or cancel, on failure) the pending bookings linked to it.
+    Returns None if the payment is already settled, and raises
+    UnknownPaymentError if there is no payment for the callback (yet).
+    Does not commit; call publish_outcome() after committing.
+    """
+    now = datetime.utcnow()
+    if parsed.succeeded:
+        target, booking_status = "completed", "confirmed"
+        values = {"status": target, "completed_at": now, "reference": parsed.receipt}
+    else:
+        target, booking_status = "failed", "cancelled"
+        values = {"status": target, "failure_reason": parsed.result_desc}
+
+    result = await db.execute(
+        update(Payment)
+        .where(
+            Payment.checkout_request_id == parsed.checkout_request_id,
+            Payment.status.in_(payment_statuses_leading_to(target)),
+        )
+        .values(callback_metadata=parsed.callback, **values)
+        .returning(Payment.id)
+        .execution_options(synchronize_session=False)
+    )
+    payment_id = result.scalar_one_or_none()
+
+    if payment_id is None and (await db.execute(
+        select(Payment.id).where(Payment.checkout_request_id == parsed.checkout_request_id)
+    )).first() is None:
+        log_payment_event("CALLBACK_DEFERRED", {"checkout_request_id": parsed.checkout_request_id, "result_code": parsed.result_code})
+        raise UnknownPaymentError(f"No payment for checkout request {parsed.checkout_request_id}")
+
+    await db.execute(
+        update(PaymentCallback)
+        .where(PaymentCallback.dedupe_key == parsed.dedupe_key)
+        .values(processed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    if payment_id is None:
+        if parsed.succeeded and parsed.receipt:
+            # A payment completed by STK query reconciliation has no receipt yet
+            await db.execute(
+                update(Payment)
+                .where(
+                    Payment.checkout_request_id == parsed.checkout_request_id,
+                    Payment.status == "completed",
+                    Payment.reference.is_(None),
+                )
+                .values(reference=parsed.receipt, callback_metadata=parsed.callback)
+                .execution_options(synchronize_session=False)
+            )
+        log_payment_event("CALLBACK_IGNORED", {"checkout_request_id": parsed.checkout_request_id, "result_code": parsed.result_code})
+        return None
+
+    if parsed.succeeded:
+        log_payment_event("PAYMENT_COMPLETED", {"checkout_request_id": parsed.checkout_request_id, "reference": parsed.receipt})
+    else:
+        log_payment_event("PAYMENT_FAILED", {"checkout_request_id": parsed.checkout_request_id, "reason": parsed.result_desc})
+
+    outcome = CallbackOutcome(parsed.checkout_request_id, target, payment_id)
+    await settle_linked_bookings(db, [outcome], booking_status)
+
+    if parsed.succeeded and not outcome.booking_ids:
+        # Paid after the sweeper expired the payment and released its bookings
+        released = (await db.execute(
+            select(func.count()).select_from(Booking)
+            .where(Booking.payment_id == payment_id, Booking.status == "cancelled")
+        )).scalar()
+        if released:
+            log_payment_event("PAID_AFTER_EXPIRY", {"checkout_request_id": parsed.checkout_request_id, "released_bookings": released})
+    return outcome
+
+
+# Columns to RETURN from an UPDATE that settles pending bookings
+SETTLED_BOOKING_COLUMNS = (
+    Booking.id, Booking.payment_id, Booking.turf_id, Booking.date,
+    Booking.time_slot, Booking.duration, Booking.amount, Booking.created_at,
+)
+
+
+async def settle_linked_bookings(db: AsyncSession, outcomes: List[CallbackOutcome], booking_status: str) -> None:
+    """Flip the pending bookings reserved against these payments in the same transaction"""
+    by_payment = {outcome.payment_id: outcome for outcome in outcomes}
+    result = await db.execute(
+        update(Booking)
+        .where(Booking.payment_id.in_(list(by_payment)), Booking.status == "pending")
+        .values(status=booking_status)
+        .returning(*SETTLED_BOOKING_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    if not rows:
+        return
+
+    released = await record_settled_bookings(db, rows, booking_status)
+    for row, slot in zip(rows, released):
+        outcome = by_payment[row.payment_id]
+        outcome.booking_ids.append(row.id)
+        if slot is not None:
+            outcome.released_slots.append(slot)
+
+    for outcome in outcomes:
+        if outcome.booking_ids:
+            log_payment_event("BOOKINGS_SETTLED", {"checkout_request_id": outcome.checkout_request_id, "status": booking_status, "count": len(outcome.booking_ids)})
+
+
+async def record_settled_bookings(db: AsyncSession, rows: List, booking_status: str) -> List[Optional[BookingSlot]]:
+    """
+    Move settled bookings (rows of SETTLED_BOOKING_COLUMNS, previously
+    pending) between rollup buckets. Returns, per row, the slot it released
+    (when cancelled) or None.
+    """
+    deltas, released = [], []
+    for row in rows:
+        day = (row.created_at or datetime.utcnow()).date()
+        deltas.append((StatsKey(day, row.turf_id, "pending", row.amount), -1))
+        deltas.append((StatsKey(day, row.turf_id, booking_status, row.amount), 1))
+        released.append(
+            BookingSlot(row.turf_id, row.date, row.time_slot, row.duration, "pending")
+            if booking_status == "cancelled" else None
+        )
+    await apply_deltas(db, deltas)
+    return released
+
+
+def publish_outcome(outcome: Optional[CallbackOutcome]) -> None:
+    """Post-commit side effects: caches, occupancy index and push notifications"""
+    if outcome is None:
+        return
+    for slot in outcome.released_slots:
+        occupancy_index.remove_booking(slot)
+    if outcome.booking_ids:
+        invalidate_dashboard_cache()
+    hub.publish(payment_topic(outcome.checkout_request_id), {
+        "checkout_request_id": outcome.checkout_request_id,
+        "status": outcome.status,
+        "booking_ids": outcome.booking_ids,
+    })
@@ -0,0 +1,97 @@
+"""
+Background liveness checks for the connection pool.
+
+Instead of pinging every connection on checkout (pool_pre_ping, one extra
+round trip per request), each worker checks out an idle connection every
+DB_HEALTHCHECK_INTERVAL seconds and runs SELECT 1 on it. The queue pool
+hands out idle connections oldest-returned first, so consecutive checks
+visit every idle connection in turn.
+
+When a check hits a dead connection (database restart, failover, a
+connection dropped by a firewall), SQLAlchemy invalidates the whole pool:
+every connection opened before the failure is replaced on its next
+checkout. Requests then get fresh connections instead of discovering the
+dead ones themselves. Checks are skipped while no connection is idle,
+since the requests holding them are exercising them anyway, and in
+pgbouncer mode, where the app keeps no connections open.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class PoolHealthCheck:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.checks = 0
+        self.skipped = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_check_seconds = 0.0
+        self.last_check_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0 and isinstance(engine.pool, QueuePool):
+            self._task = asyncio.create_task(self._run(), name="pool-health-check")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval * random.uniform(0.8, 1.2))
+            if engine.pool.checkedin() == 0:
+                self.skipped += 1
+                continue
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Database health check failed: %s", e)
+
+    async def check(self) -> None:
+        started = time.perf_counter()
+        self.checks += 1
+        self.last_check_at = datetime.utcnow()
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        except Exception:
+            self.failures += 1
+            self.consecutive_failures += 1
+            raise
+        else:
+            self.consecutive_failures = 0
+        finally:
+            self.last_check_seconds = time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "healthy": self.consecutive_failures == 0,
+            "last_check_seconds": round(self.last_check_seconds, 4),
+            "last_check_at": self.last_check_at.isoformat() if self.last_check_at else None,
+        }
+
+
+pool_health = PoolHealthCheck(interval=settings.DB_HEALTHCHECK_INTERVAL)
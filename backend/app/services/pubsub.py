@@ -0,0 +1,283 @@
+"""
+Publish/subscribe hub used to push events to streaming clients.
+
+Subscribers get a bounded queue per subscription; publishing never blocks.
+When a subscriber falls behind, its queue either drops the oldest event
+(fine when only the latest state matters, e.g. a payment status) or the
+subscription is closed so the client reconnects and catches up from the
+database (notifications, where every event matters).
+
+Events published in one worker process only reach that process's
+subscribers. With PUBSUB_BACKEND=postgres, PostgresBridge relays every
+event through PostgreSQL LISTEN/NOTIFY so all workers see it.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Delivered to a subscription that was closed because it fell too far behind
+OVERFLOW = object()
+
+
+class Subscription:
+    def __init__(self, hub: "PubSubHub", topics: Iterable[str], queue_size: int, drop_oldest: bool = True):
+        self.hub = hub
+        self.topics = tuple(topics)
+        self.drop_oldest = drop_oldest
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, event: Any) -> None:
+        if self.closed:
+            return
+        if self.queue.full():
+            if not self.drop_oldest:
+                self._overflow()
+                return
+            # Keep the newest events for slow consumers
+            self.queue.get_nowait()
+            self.hub.dropped += 1
+        self.queue.put_nowait(event)
+
+    def _overflow(self) -> None:
+        # Free the buffered events right away and wake the consumer with the marker
+        self.closed = True
+        self.hub.unsubscribe(self)
+        self.hub.disconnected += 1
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout: float) -> Any:
+        """Next event, OVERFLOW if the subscription was closed, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.hub.unsubscribe(self)
+
+
+class PubSubHub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.bridge: Optional["PostgresBridge"] = None
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._subscriptions: Set[Subscription] = set()
+
+    def subscribe(self, *topics: str, drop_oldest: bool = True) -> Subscription:
+        subscription = Subscription(self, topics, self.queue_size, drop_oldest)
+        for topic in subscription.topics:
+            self._subscribers[topic].add(subscription)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def publish(self, topic: str, event: Any) -> int:
+        """
+        Deliver event to every local subscriber of topic and hand it to the
+        bridge (if any) for the other workers. Returns the number of local
+        subscribers reached.
+        """
+        return self.publish_many([(topic, event)])
+
+    def publish_many(self, events: List[Tuple[str, Any]]) -> int:
+        """publish() for a batch of (topic, event) pairs; the bridge packs them into few messages"""
+        self.published += len(events)
+        if self.bridge is not None:
+            self.bridge.send(events)
+        return sum(self.deliver_local(topic, event) for topic, event in events)
+
+    def deliver_local(self, topic: str, event: Any) -> int:
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+        for subscription in list(subscribers):
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres" if self.bridge else "memory",
+            "subscriptions": len(self._subscriptions),
+            "topics": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "bridge": self.bridge.stats() if self.bridge else None,
+        }
+
+
+class PostgresBridge:
+    """
+    Relays hub events between worker processes over PostgreSQL LISTEN/NOTIFY.
+
+    Uses one dedicated asyncpg connection per worker (outside the SQLAlchemy
+    pool) that LISTENs on a single channel; outgoing events are queued and
+    sent from a background task, so publish() stays synchronous. Each worker
+    tags its notifications with an origin id and ignores its own, since it
+    already delivered them locally. The connection is re-established with
+    backoff if it drops; events published while it is down are not relayed.
+
+    LISTEN needs a session-level connection: point PUBSUB_DATABASE_URL at the
+    database directly (not through a transaction-mode pooler).
+    """
+
+    # NOTIFY payloads must stay below 8000 bytes (leaves room for the envelope)
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, hub: PubSubHub, dsn: str, channel: str, max_pending: int = 1000):
+        self.hub = hub
+        self.dsn = dsn
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.connected = False
+        self.sent = 0
+        self.received = 0
+        self.lost = 0
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.hub.bridge = self
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self.hub.bridge = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def send(self, events: List[Tuple[str, Any]]) -> None:
+        """Queue events for the other workers, packed into as few NOTIFY payloads as fit"""
+        if not self.connected:
+            self.lost += len(events)
+            return
+        packed: List[str] = []
+        size = 0
+        for topic, event in events:
+            encoded = json.dumps([topic, event], default=str)
+            if len(encoded.encode()) > self.MAX_PAYLOAD_BYTES:
+                logger.warning("⚠️ Pub/sub event on %s too large to relay (%d bytes)", topic, len(encoded))
+                self.lost += 1
+                continue
+            if packed and size + len(encoded.encode()) + 1 > self.MAX_PAYLOAD_BYTES:
+                self._enqueue(packed)
+                packed, size = [], 0
+            packed.append(encoded)
+            size += len(encoded.encode()) + 1
+        if packed:
+            self._enqueue(packed)
+
+    def _enqueue(self, encoded_events: List[str]) -> None:
+        if self._outbox.full():
+            self.lost += len(encoded_events)
+            return
+        payload = f'{{"origin":"{self.origin}","events":[{",".join(encoded_events)}]}}'
+        self._outbox.put_nowait((payload, len(encoded_events)))
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return
+        self.received += len(message["events"])
+        for topic, event in message["events"]:
+            self.hub.deliver_local(topic, event)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        backoff = 1
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                terminated = asyncio.Event()
+                connection.add_termination_listener(lambda _: terminated.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self.connected = True
+                backoff = 1
+                logger.info("📡 Pub/sub bridge listening on \"%s\"", self.channel)
+                await self._pump(connection, terminated)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Pub/sub bridge connection failed: %s", e)
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close(timeout=5)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def _pump(self, connection, terminated: asyncio.Event) -> None:
+        """Send queued events until the connection terminates"""
+        while not terminated.is_set():
+            try:
+                payload, count = await asyncio.wait_for(self._outbox.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                continue
+            await connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            self.sent += count
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "sent": self.sent,
+            "received": self.received,
+            "lost": self.lost,
+            "pending": self._outbox.qsize(),
+        }
+
+
+def build_pubsub_bridge(hub: PubSubHub) -> Optional[PostgresBridge]:
+    """Bridge configured by PUBSUB_BACKEND, or None for a single in-process hub"""
+    if settings.PUBSUB_BACKEND != "postgres":
+        return None
+    url = make_url(settings.PUBSUB_DATABASE_URL or settings.DATABASE_URL)
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return PostgresBridge(hub, dsn, settings.PUBSUB_CHANNEL)
+
+
+def payment_topic(checkout_request_id: str) -> str:
+    return f"payment:{checkout_request_id}"
+
+
+def user_topic(user_id) -> str:
+    return f"user:{user_id}"
+
+
+# Notifications without a user_id form the shared admin/manager inbox
+STAFF_TOPIC = "staff"
+
+
+hub = PubSubHub(queue_size=settings.SSE_MAX_QUEUED_EVENTS)
@@ -0,0 +1,171 @@
+"""
+Rate limiting with GCRA (Generic Cell Rate Algorithm).
+
+GCRA is the token bucket expressed as a single timestamp per key: the
+"theoretical arrival time" (TAT) of the next request. Checking and updating a
+key is O(1) in time and memory, and a key whose TAT is in the past carries no
+state at all, which makes idle keys trivial to evict.
+
+Stores:
+    MemoryRateLimitStore  - per-process dict, for a single worker
+    RedisRateLimitStore   - shared between workers/hosts via a Redis-compatible server
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Allow `limit` requests per `period` seconds on paths starting with `prefix`"""
+    prefix: str
+    limit: int
+    period: float
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.limit
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+def parse_policies(spec: str) -> List[RateLimitPolicy]:
+    """
+    Parse "prefix=limit/seconds" entries separated by commas, e.g.
+    "/api/stkpush=10/900,/api/bookings=120/60". Longest prefixes come first.
+    """
+    policies = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            prefix, rate = entry.split("=", 1)
+            limit, period = rate.split("/", 1)
+            policy = RateLimitPolicy(prefix.strip(), int(limit), float(period))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit policy {entry!r}. Expected prefix=limit/seconds")
+        if policy.limit <= 0 or not policy.period > 0:
+            raise ValueError(f"Invalid rate limit policy {entry!r}. Limit and seconds must be positive")
+        policies.append(policy)
+    return sorted(policies, key=lambda policy: len(policy.prefix), reverse=True)
+
+
+def gcra(tat: Optional[float], now: float, policy: RateLimitPolicy) -> tuple[RateLimitResult, Optional[float]]:
+    """Apply one request to a key. Returns the result and the new TAT to store (None = unchanged)."""
+    interval = policy.emission_interval
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - policy.period
+
+    if now < allow_at:
+        return RateLimitResult(False, 0, allow_at - now), None
+
+    remaining = int((policy.period - (new_tat - now)) / interval)
+    return RateLimitResult(True, remaining, 0.0), new_tat
+
+
+class MemoryRateLimitStore:
+    """
+    Per-process store. Keys whose TAT has passed are evicted every sweep_interval seconds.
+    `clock` returns the current time in seconds (monotonic by default).
+    """
+
+    def __init__(self, sweep_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._tats: dict[str, float] = {}
+        self._last_sweep = clock()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult:
+        now = self.clock()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.evict_idle(now)
+
+        result, new_tat = gcra(self._tats.get(key), now, policy)
+        if new_tat is not None:
+            self._tats[key] = new_tat
+        return result
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = self.clock() if now is None else now
+        idle = [key for key, tat in self._tats.items() if tat <= now]
+        for key in idle:
+            del self._tats[key]
+        self._last_sweep = now
+        return len(idle)
+
+
+# Same algorithm as gcra(), executed atomically inside Redis using the server clock.
+# Keys expire on their own once their TAT has passed.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((period - (new_tat - now)) / interval), '0'}
+"""
+
+
+class RedisRateLimitStore:
+    """
+    Store shared by all workers. `client` is a redis.asyncio.Redis (or any
+    object with a compatible async `eval(script, numkeys, *keys_and_args)`).
+    """
+
+    def __init__(self, client, key_prefix: str = "ratelimit:"):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult:
+        allowed, remaining, retry_after = await self.client.eval(
+            GCRA_SCRIPT, 1, f"{self.key_prefix}{key}", policy.emission_interval, policy.period
+        )
+        return RateLimitResult(bool(int(allowed)), int(remaining), float(retry_after))
+
+
+class RateLimiter:
+    """Matches a request path to its policy and applies it through the configured store"""
+
+    def __init__(self, policies: List[RateLimitPolicy], store):
+        self.policies = policies
+        self.store = store
+
+    def policy_for(self, path: str) -> Optional[RateLimitPolicy]:
+        for policy in self.policies:
+            if path.startswith(policy.prefix):
+                return policy
+        return None
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult:
+        return await self.store.hit(f"{policy.prefix}:{key}", policy)
+
+
+def build_rate_limiter() -> RateLimiter:
+    """Create the limiter described by RATE_LIMITS / RATE_LIMIT_BACKEND in settings"""
+    policies = parse_policies(settings.RATE_LIMITS)
+
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (pip install redis)")
+        store = RedisRateLimitStore(redis.Redis.from_url(settings.REDIS_URL))
+    else:
+        store = MemoryRateLimitStore(sweep_interval=settings.RATE_LIMIT_SWEEP_SECONDS)
+
+    return RateLimiter(policies, store)
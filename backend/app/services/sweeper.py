@@ -0,0 +1,237 @@
+"""
+Background expiry of stale pending payments and bookings.
+
+Every worker runs an ExpirySweeper task, but each sweep first takes a
+PostgreSQL advisory lock (transaction-scoped, held open on a dedicated
+connection for the sweep), so only one worker sweeps at a time and a crashed
+leader releases the lock with its connection. Work is done in batches of
+indexed range updates:
+
+    UPDATE ... WHERE id IN (SELECT id ... WHERE status = 'pending'
+                            AND created_at < :cutoff ORDER BY created_at
+                            LIMIT :batch FOR UPDATE SKIP LOCKED)
+
+served by partial indexes on the pending rows. SKIP LOCKED keeps the sweeper
+from waiting on rows a callback or booking request is updating right now.
+
+- Payments pending longer than PAYMENT_PENDING_TTL_MINUTES become "expired"
+  and their pending bookings are cancelled, releasing the slots.
+- Pending bookings older than BOOKING_PENDING_TTL_MINUTES without a live
+  payment are cancelled.
+- With SWEEPER_RECONCILE, the oldest stale payments are first checked with
+  Daraja's STK query API and settled from its answer.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, text, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models import Booking, Payment
+from app.models.payment import payment_statuses_leading_to
+from app.services.availability import occupancy_index
+from app.services.dashboard import invalidate_dashboard_cache
+from app.services.mpesa import mpesa_client
+from app.services.payment_callbacks import (
+    SETTLED_BOOKING_COLUMNS, CallbackOutcome, apply_callback, parse_callback,
+    publish_outcome, record_callback, record_settled_bookings, settle_linked_bookings,
+)
+from app.utils.logger import log_payment_event
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key shared by every worker ("goalhub sweeper")
+SWEEPER_LOCK_KEY = 0x60A15EE9
+
+
+def stk_query_callback(response: dict) -> Optional[dict]:
+    """
+    Callback body equivalent to a Daraja STK query answer, or None while the
+    request is still being processed (Daraja then answers with an errorCode).
+    """
+    if "ResultCode" not in response or response.get("ResponseCode") not in (None, "0"):
+        return None
+    return {
+        "MerchantRequestID": response.get("MerchantRequestID", ""),
+        "CheckoutRequestID": response.get("CheckoutRequestID"),
+        "ResultCode": int(response["ResultCode"]),
+        "ResultDesc": response.get("ResultDesc", ""),
+        "Source": "stk_query",
+    }
+
+
+class ExpirySweeper:
+    def __init__(self, interval: float, payment_ttl: timedelta, booking_ttl: Optional[timedelta],
+                 batch_size: int, reconcile_limit: int):
+        self.interval = interval
+        self.payment_ttl = payment_ttl
+        self.booking_ttl = booking_ttl
+        self.batch_size = batch_size
+        self.reconcile_limit = reconcile_limit
+        self.sweeps = 0
+        self.expired_payments = 0
+        self.expired_bookings = 0
+        self.reconciled = 0
+        self.last_sweep_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="expiry-sweeper")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Jitter keeps the workers from all contending for the lock at once
+            await asyncio.sleep(self.interval * random.uniform(0.8, 1.2))
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("⚠️ Expiry sweeper error: %s", e)
+
+    async def sweep(self) -> bool:
+        """Run one sweep if no other worker is sweeping. Returns whether this worker swept."""
+        async with engine.connect() as lock_connection:
+            async with lock_connection.begin():
+                leader = (await lock_connection.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SWEEPER_LOCK_KEY}
+                )).scalar()
+                if not leader:
+                    return False
+
+                now = datetime.utcnow()
+                if self.reconcile_limit:
+                    await self.reconcile(now - self.payment_ttl)
+                while await self.expire_payments(now - self.payment_ttl) == self.batch_size:
+                    pass
+                if self.booking_ttl:
+                    while await self.expire_bookings(now - self.booking_ttl) == self.batch_size:
+                        pass
+
+        self.sweeps += 1
+        self.last_sweep_at = datetime.utcnow()
+        return True
+
+    async def reconcile(self, cutoff: datetime) -> None:
+        """Settle the oldest stale pending payments from Daraja's STK query answers"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Payment.checkout_request_id)
+                .where(Payment.status == "pending", Payment.created_at < cutoff)
+                .order_by(Payment.created_at)
+                .limit(self.reconcile_limit)
+            )
+            checkout_request_ids = result.scalars().all()
+
+        for checkout_request_id in checkout_request_ids:
+            try:
+                response = await mpesa_client.query_stk_status(checkout_request_id)
+            except Exception as e:
+                logger.warning("⚠️ STK query for %s failed: %s", checkout_request_id, e)
+                continue
+
+            callback = stk_query_callback(response)
+            if callback is None:
+                continue
+            parsed = parse_callback({"Body": {"stkCallback": callback}})
+            async with AsyncSessionLocal() as db:
+                await record_callback(db, parsed)
+                outcome = await apply_callback(db, parsed)
+                await db.commit()
+            publish_outcome(outcome)
+            if outcome:
+                self.reconciled += 1
+                log_payment_event("PAYMENT_RECONCILED", {"checkout_request_id": checkout_request_id, "status": outcome.status})
+
+    async def expire_payments(self, cutoff: datetime) -> int:
+        """Expire one batch of stale pending payments and cancel their pending bookings"""
+        async with AsyncSessionLocal() as db:
+            stale = (
+                select(Payment.id)
+                .where(Payment.status == "pending", Payment.created_at < cutoff)
+                .order_by(Payment.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(Payment)
+                .where(Payment.id.in_(stale.scalar_subquery()), Payment.status.in_(payment_statuses_leading_to("expired")))
+                .values(status="expired", failure_reason="No payment confirmation received in time")
+                .returning(Payment.id, Payment.checkout_request_id)
+                .execution_options(synchronize_session=False)
+            )
+            outcomes = [CallbackOutcome(row.checkout_request_id, "expired", row.id) for row in result]
+            if not outcomes:
+                return 0
+            await settle_linked_bookings(db, outcomes, "cancelled")
+            await db.commit()
+
+        for outcome in outcomes:
+            publish_outcome(outcome)
+        self.expired_payments += len(outcomes)
+        log_payment_event("PAYMENTS_EXPIRED", {"count": len(outcomes)})
+        return len(outcomes)
+
+    async def expire_bookings(self, cutoff: datetime) -> int:
+        """Cancel one batch of stale pending bookings that no live payment can still confirm"""
+        live_payment = (
+            select(Payment.id)
+            .where(Payment.id == Booking.payment_id, Payment.status.in_(["pending", "completed"]))
+            .exists()
+        )
+        async with AsyncSessionLocal() as db:
+            stale = (
+                select(Booking.id)
+                .where(Booking.status == "pending", Booking.created_at < cutoff, ~live_payment)
+                .order_by(Booking.created_at)
+                .limit(self.batch_size)
+                .with_for_update(of=Booking, skip_locked=True)
+            )
+            result = await db.execute(
+                update(Booking)
+                .where(Booking.id.in_(stale.scalar_subquery()), Booking.status == "pending")
+                .values(status="cancelled")
+                .returning(*SETTLED_BOOKING_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            if not rows:
+                return 0
+            released = await record_settled_bookings(db, rows, "cancelled")
+            await db.commit()
+
+        for slot in released:
+            occupancy_index.remove_booking(slot)
+        invalidate_dashboard_cache()
+        self.expired_bookings += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "sweeps": self.sweeps,
+            "last_sweep_at": self.last_sweep_at.isoformat() if self.last_sweep_at else None,
+            "expired_payments": self.expired_payments,
+            "expired_bookings": self.expired_bookings,
+            "reconciled": self.reconciled,
+        }
+
+
+expiry_sweeper = ExpirySweeper(
+    interval=settings.SWEEPER_INTERVAL_SECONDS,
+    payment_ttl=timedelta(minutes=settings.PAYMENT_PENDING_TTL_MINUTES),
+    booking_ttl=timedelta(minutes=settings.BOOKING_PENDING_TTL_MINUTES) if settings.BOOKING_PENDING_TTL_MINUTES else None,
+    batch_size=settings.SWEEPER_BATCH_SIZE,
+    reconcile_limit=settings.SWEEPER_RECONCILE_LIMIT if settings.SWEEPER_RECONCILE else 0,
+)
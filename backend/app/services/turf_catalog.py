@@ -0,0 +1,76 @@
+"""
+In-memory turf catalogue for GET /api/turfs/.
+
+The catalogue is tiny and changes only through create_turf, so each worker
+keeps the rendered JSON body and its ETag and serves them without touching
+the database. Writes through this worker bump a version counter, which
+discards the snapshot immediately; TURF_CATALOG_CACHE_TTL bounds how long
+other workers keep serving a catalogue that changed elsewhere.
+"""
+import asyncio
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Turf
+from app.schemas import TurfResponse
+from app.utils.http_cache import strong_etag
+from app.utils.responses import list_response, response_columns
+
+
+class CatalogSnapshot(NamedTuple):
+    version: int
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+class TurfCatalog:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.loads = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._load_lock = asyncio.Lock()
+
+    def _fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self.version
+            and time.monotonic() - snapshot.loaded_at < self.ttl
+        )
+
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        """The current catalogue, loading it at most once per miss"""
+        if self._fresh(self._snapshot):
+            self.hits += 1
+            return self._snapshot
+
+        async with self._load_lock:
+            if self._fresh(self._snapshot):
+                self.hits += 1
+                return self._snapshot
+
+            version = self.version
+            result = await db.execute(select(*response_columns(Turf, TurfResponse)).order_by(Turf.name, Turf.id))
+            body = list_response(TurfResponse, result.mappings()).body
+            snapshot = CatalogSnapshot(version, body, strong_etag(body), time.monotonic())
+            self.loads += 1
+            # Skip caching if a write invalidated the catalogue while we were loading
+            if version == self.version:
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._snapshot = None
+
+    def stats(self) -> dict:
+        return {"version": self.version, "cached": self._snapshot is not None, "hits": self.hits, "loads": self.loads}
+
+
+turf_catalog = TurfCatalog(ttl=settings.TURF_CATALOG_CACHE_TTL)
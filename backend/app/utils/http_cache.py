@@ -0,0 +1,34 @@
+"""
+HTTP validation caching helpers (ETag / If-None-Match).
+
+ETags are strong and derived from the response body, so every worker hands
+out the same tag for the same payload and a client revalidating against any
+of them gets a 304 Not Modified without the body.
+"""
+import hashlib
+from typing import Mapping, Optional
+
+from fastapi import Request, Response
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 prescribes for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cached_response(request: Request, body: bytes, etag: str, cache_control: str,
+                    media_type: str = "application/json", headers: Optional[Mapping[str, str]] = None) -> Response:
+    """The pre-rendered body, or an empty 304 when the client already holds it"""
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -1,14 +1,180 @@
+"""
+Structured, non-blocking logging.
+
+Records are put on an in-memory queue by a QueueHandler on the root logger
+and written by a QueueListener on a background thread, so formatting and
+stream I/O never run on the event loop. Records are enqueued as they are:
+the message is only rendered, and the extra fields only serialised, on the
+listener thread (so do not mutate a dict after logging it).
+
+Output is one JSON object per line (LOG_FORMAT=json) or a readable line
+(LOG_FORMAT=text). Every record carries the id of the request it was logged
+from (see RequestIdMiddleware), taken from a context variable that follows
+the request into the tasks it starts.
+
+High-volume events can be sampled with LOG_SAMPLE_RATES, e.g.
+"CALLBACK_RECEIVED=0.1"; sampled records carry their rate so counts can be
+scaled back up.
+"""
+import atexit
 import logging
-from datetime import datetime
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+from app.config import settings
+
+# Correlation id of the request being served (None outside requests)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+# (uvicorn adds a duplicate "color_message" to its own records)
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "color_message",
+}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "EVENT=rate" entries separated by commas, e.g. "CALLBACK_RECEIVED=0.1" """
+    rates = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            event, rate = entry.split("=", 1)
+            rates[event.strip()] = float(rate)
+        except ValueError:
+            raise ValueError(f"Invalid log sample rate {entry!r}. Expected EVENT=rate")
+    return rates
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id, in the caller's context before they are queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener. The stock prepare()
+    renders the message and exception text in the calling thread; here only
+    the exception is rendered (its traceback frames may change once the
+    caller moves on) and the record is enqueued otherwise untouched.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(levelname)s [%(asctime)s] - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(levelname)s [%(asctime)s] - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.request_id:
+            line += f" request_id={record.request_id}"
+        return line
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging() -> None:
+    """Route all logging through the background queue (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # Uvicorn's loggers (including the per-request access log) write to
+    # their own stream handlers; send them through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    # httpx logs every outbound request (each Daraja call) at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+configure_logging()
 
 logger = logging.getLogger("goalhub")
+payment_logger = logging.getLogger("goalhub.payments")
+_sample_rates = parse_sample_rates(settings.LOG_SAMPLE_RATES)
+
+
+def log_event(target: logging.Logger, event: str, data: dict, level: int = logging.INFO) -> None:
+    """
+    Log a named event with structured fields. Costs one level check when the
+    level is disabled and one random() when the event is sampled out.
+    """
+    if not target.isEnabledFor(level):
+        return
+    rate = _sample_rates.get(event)
+    if rate is not None:
+        if random.random() >= rate:
+            return
+        data = {**data, "sample_rate": rate}
+    # Field names that clash with LogRecord attributes (e.g. "name") get a trailing underscore
+    fields = {f"{key}_" if key in _RECORD_ATTRIBUTES else key: value for key, value in data.items()}
+    target.log(level, "%s", event, extra={"event": event, **fields})
 
 
 def log_payment_event(event: str, data: dict):
@@ -19,4 +185,4 @@ def log_payment_event(event: str, data: dict):
         event: Description of the payment event (e.g., "STK_PUSH_INITIATED", "CALLBACK_RECEIVED")
         data: Dictionary containing relevant payment data
     """
-    logger.info(f"💳 {event}: {data}")
+    log_event(payment_logger, event, data)
@@ -0,0 +1,29 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor encodes the sort key of the last row of a page, e.g.
+(created_at, id), so the next page can start with an indexed
+"WHERE (created_at, id) < (:created_at, :id)" instead of an OFFSET scan.
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, row_id: UUID) -> str:
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(sort_value), UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
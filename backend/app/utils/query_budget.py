@@ -0,0 +1,242 @@
+"""
+Query budgets: N+1 and slow-query detection for development and CI.
+
+Every SQL statement the engine runs is fingerprinted (parameters and
+literals replaced by "?", IN lists collapsed) and recorded into the QueryLog
+of the current request and into any active capture_queries() block. A log is
+then checked against a QueryBudget:
+
+- max_queries: statements allowed per request
+- max_seconds: total database time allowed per request
+- max_repeats: times one fingerprint may run before it is reported as a
+  likely N+1 (a per-row query in a loop)
+- slow_query_seconds: any single statement slower than this is reported
+
+Routes declare their budget with @query_budget(...); the others get the
+defaults from settings. With QUERY_BUDGET_ENABLED, QueryBudgetMiddleware
+checks every request, reports violations (logged, and passed to any
+collect_violations() block, which is how the pytest fixtures fail a test)
+and adds X-Query-Count / X-Query-Time-Ms response headers.
+
+This is a development aid: fingerprinting costs a few regex passes per
+statement, so leave it off in production and rely on /metrics there.
+"""
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+_PARAMETER = re.compile(r"(?:\$\d+|%\(\w+\)s|%s)(?:::\w+(?:\[\])?)?")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with parameters and literals replaced by "?" """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (?)", statement)
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    max_queries: Optional[int] = None
+    max_seconds: Optional[float] = None
+    max_repeats: Optional[int] = None
+    slow_query_seconds: Optional[float] = None
+
+
+def default_budget() -> QueryBudget:
+    return QueryBudget(
+        max_queries=settings.QUERY_BUDGET_MAX_QUERIES or None,
+        max_seconds=settings.QUERY_BUDGET_MAX_SECONDS or None,
+        max_repeats=settings.QUERY_BUDGET_MAX_REPEATS or None,
+        slow_query_seconds=settings.QUERY_BUDGET_SLOW_QUERY_SECONDS or None,
+    )
+
+
+def query_budget(max_queries: Optional[int] = None, max_seconds: Optional[float] = None,
+                 max_repeats: Optional[int] = None, slow_query_seconds: Optional[float] = None):
+    """
+    Declare a route's query budget. Unset limits fall back to the defaults
+    from settings.
+
+        @router.get("/")
+        @query_budget(max_queries=2)
+        async def get_turfs(...):
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        defaults = default_budget()
+        endpoint.__query_budget__ = QueryBudget(
+            max_queries=defaults.max_queries if max_queries is None else max_queries,
+            max_seconds=defaults.max_seconds if max_seconds is None else max_seconds,
+            max_repeats=defaults.max_repeats if max_repeats is None else max_repeats,
+            slow_query_seconds=defaults.slow_query_seconds if slow_query_seconds is None else slow_query_seconds,
+        )
+        return endpoint
+    return decorate
+
+
+def budget_for(scope: Scope) -> QueryBudget:
+    return getattr(scope.get("endpoint"), "__query_budget__", None) or default_budget()
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries: List[Tuple[str, float]] = []  # (fingerprint, seconds)
+
+    def record(self, statement_fingerprint: str, seconds: float) -> None:
+        self.queries.append((statement_fingerprint, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.queries)
+
+    def repeated(self, more_than: int) -> Dict[str, int]:
+        """Fingerprints run more than `more_than` times, with their counts"""
+        counts: Dict[str, int] = {}
+        for statement, _ in self.queries:
+            counts[statement] = counts.get(statement, 0) + 1
+        return {statement: count for statement, count in counts.items() if count > more_than}
+
+    def violations(self, budget: QueryBudget) -> List[str]:
+        problems = []
+        if budget.max_queries is not None and self.count > budget.max_queries:
+            problems.append(f"{self.count} queries (budget {budget.max_queries})")
+        if budget.max_seconds is not None and self.total_seconds > budget.max_seconds:
+            problems.append(f"{self.total_seconds * 1000:.0f} ms in the database (budget {budget.max_seconds * 1000:.0f} ms)")
+        if budget.max_repeats is not None:
+            for statement, count in self.repeated(budget.max_repeats).items():
+                problems.append(f"possible N+1, ran {count} times: {statement}")
+        if budget.slow_query_seconds is not None:
+            for statement, seconds in self.queries:
+                if seconds > budget.slow_query_seconds:
+                    problems.append(f"slow query ({seconds * 1000:.0f} ms): {statement}")
+        return problems
+
+    def assert_within(self, max_queries: Optional[int] = None, max_seconds: Optional[float] = None,
+                      max_repeats: Optional[int] = None, slow_query_seconds: Optional[float] = None) -> None:
+        problems = self.violations(QueryBudget(max_queries, max_seconds, max_repeats, slow_query_seconds))
+        if problems:
+            listing = "\n".join(f"  {statement}" for statement, _ in self.queries)
+            raise AssertionError("Query budget exceeded: " + "; ".join(problems) + f"\nQueries:\n{listing}")
+
+
+# Log of the request being served (set by QueryBudgetMiddleware)
+_request_log: ContextVar[Optional[QueryLog]] = ContextVar("query_budget_log", default=None)
+# Process-wide captures (capture_queries), e.g. around a test
+_captures: List[QueryLog] = []
+# Receivers of (route, problems) for requests over budget
+_violation_collectors: List[List[Tuple[str, List[str]]]] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_budget_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_budget_started"].pop()
+    request_log = _request_log.get()
+    if request_log is None and not _captures:
+        return
+    statement_fingerprint = fingerprint(statement)
+    if request_log is not None:
+        request_log.record(statement_fingerprint, elapsed)
+    for log in _captures:
+        log.record(statement_fingerprint, elapsed)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_budget_started"):
+        connection.info["query_budget_started"].pop()
+
+
+def install(target=engine) -> None:
+    """Attach the recording hooks to an engine (idempotent)"""
+    sync_engine = getattr(target, "sync_engine", target)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryLog]:
+    """Record every statement run by this process while the block is active"""
+    install()
+    log = QueryLog()
+    _captures.append(log)
+    try:
+        yield log
+    finally:
+        _captures.remove(log)
+
+
+@contextmanager
+def collect_violations() -> Iterator[List[Tuple[str, List[str]]]]:
+    """Collect (route, problems) for every over-budget request served during the block"""
+    violations: List[Tuple[str, List[str]]] = []
+    _violation_collectors.append(violations)
+    try:
+        yield violations
+    finally:
+        _violation_collectors.remove(violations)
+
+
+def report_violations(route: str, problems: List[str]) -> None:
+    logger.warning("⚠️ Query budget exceeded on %s: %s", route, "; ".join(problems))
+    for violations in _violation_collectors:
+        violations.append((route, problems))
+
+
+class QueryBudgetMiddleware:
+    """Checks every HTTP request against its route's query budget"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+
+        async def send_with_counts(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(log.count)
+                headers["X-Query-Time-Ms"] = f"{log.total_seconds * 1000:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counts)
+        finally:
+            _request_log.reset(token)
+            problems = log.violations(budget_for(scope))
+            if problems:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                report_violations(f"{scope['method']} {route}", problems)
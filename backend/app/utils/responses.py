@@ -0,0 +1,60 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse is the application's default response class: orjson
+instead of the stdlib json module, with Decimal rendered as a string the same
+way Pydantic renders it, so prices and amounts keep their exact value.
+
+List endpoints use list_response() to skip the per-object response_model
+round trip (ORM object -> Pydantic model -> dict -> JSON). They select only
+the columns of their response schema and hand the row mappings straight to
+orjson, which serialises UUID, datetime and date natively. Rows come from our
+own database, so re-validating them is not needed in production; with
+VALIDATE_LIST_RESPONSES the whole page is validated in one TypeAdapter call
+first, which keeps the schema honest in development.
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterable, List, Mapping, Optional, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.config import settings
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def response_columns(model, schema: Type[BaseModel], exclude: Iterable[str] = ()) -> list:
+    """The model's columns for every field of the response schema, in schema order"""
+    return [getattr(model, name) for name in schema.model_fields if name not in exclude]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def list_response(schema: Type[BaseModel], rows: Iterable[Mapping], headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    """
+    JSON array response built from row mappings shaped like `schema`.
+
+    Returning a Response bypasses the route's response_model, which then only
+    documents the payload, so `headers` must carry anything the endpoint set
+    on its injected Response.
+    """
+    content = [dict(row) for row in rows]
+    if settings.VALIDATE_LIST_RESPONSES:
+        adapter = _list_adapter(schema)
+        content = adapter.dump_python(adapter.validate_python(content), mode="json")
+    return FastJSONResponse(content, headers=headers)
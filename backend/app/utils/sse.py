@@ -0,0 +1,28 @@
+"""
+Server-Sent Events helpers.
+"""
+import json
+from typing import Any, Optional
+
+# Headers for text/event-stream responses (no caching, no proxy buffering)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None, id: Optional[str] = None) -> str:
+    """Encode one SSE message. The id is echoed back by the browser as Last-Event-ID on reconnect."""
+    message = f"event: {event}\n" if event else ""
+    if id is not None:
+        message += f"id: {id}\n"
+    return f"{message}data: {json.dumps(data, default=str)}\n\n"
+
+
+def format_retry(milliseconds: int) -> str:
+    """Tell the client how long to wait before reconnecting"""
+    return f"retry: {milliseconds}\n\n"
+
+
+# Comment line sent periodically to keep idle connections (and proxies) alive
+HEARTBEAT = ": keep-alive\n\n"
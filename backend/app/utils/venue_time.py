@@ -0,0 +1,18 @@
+"""
+Current time at the venues.
+
+Event start times are stored as naive wall-clock times in
+settings.VENUE_TIMEZONE, so comparisons against "now" must use the venue's
+local time, not UTC.
+"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+
+VENUE_TZ = ZoneInfo(settings.VENUE_TIMEZONE)
+
+
+def venue_now() -> datetime:
+    """Naive local time at the venues, comparable with Event.starts_at"""
+    return datetime.now(VENUE_TZ).replace(tzinfo=None)
@@ -0,0 +1,11 @@
+import asyncio
+from app.database import AsyncSessionLocal
+from app.services.booking_stats import backfill
+
+async def backfill_booking_stats():
+    async with AsyncSessionLocal() as session:
+        rows = await backfill(session)
+        print(f"✅ Rebuilt daily_booking_stats ({rows} rows)")
+
+if __name__ == "__main__":
+    asyncio.run(backfill_booking_stats())
@@ -0,0 +1 @@
+# Benchmark and load-test scripts (run against a local backend in mock mode)
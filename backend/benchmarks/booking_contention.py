@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Double-booking contention benchmark.
+
+Fires many simultaneous POST /api/bookings/ requests for the exact same turf,
+date and time slot and checks that exactly one of them wins while every other
+request is rejected with 409, within a bounded p99 latency.
+
+Usage:
+    python -m benchmarks.booking_contention --requests 300 --max-p99-ms 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.common import DEFAULT_BASE_URL, mock_auth_headers, summarize_latencies
+
+
+async def fire(client: httpx.AsyncClient, payload: dict, uid: str, start: asyncio.Event):
+    await start.wait()
+    started = time.perf_counter()
+    response = await client.post("/api/bookings/", json=payload, headers=mock_auth_headers(uid))
+    return response.status_code, (time.perf_counter() - started) * 1000
+
+
+async def run(base_url: str, requests: int, slot_date: date, time_slot: str) -> dict:
+    limits = httpx.Limits(max_connections=requests, max_keepalive_connections=requests)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        turfs = (await client.get("/api/turfs/")).json()
+        if not turfs:
+            raise SystemExit("❌ No turfs found. Run seed.py first.")
+
+        payload = {
+            "turf_id": turfs[0]["id"],
+            "date": slot_date.isoformat(),
+            "time_slot": time_slot,
+            "duration": 1,
+            "amount": str(turfs[0]["price"]),
+        }
+
+        # Warm up user records so the race is on the booking insert, not user creation
+        uids = [f"bench-{i}" for i in range(requests)]
+        await asyncio.gather(*(client.get("/api/users/me", headers=mock_auth_headers(uid)) for uid in uids))
+
+        start = asyncio.Event()
+        tasks = [asyncio.create_task(fire(client, payload, uid, start)) for uid in uids]
+        wall_started = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks)
+        wall_ms = (time.perf_counter() - wall_started) * 1000
+
+    statuses = Counter(status for status, _ in results)
+    return {
+        "requests": requests,
+        "statuses": dict(statuses),
+        "winners": statuses.get(200, 0),
+        "wall_ms": round(wall_ms, 2),
+        "latency": summarize_latencies([latency for _, latency in results]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--max-p99-ms", type=float, default=1000.0)
+    parser.add_argument("--time-slot", default="10:00")
+    parser.add_argument(
+        "--days-ahead", type=int, default=None,
+        help="Day to book, relative to today (random day within a year by default)"
+    )
+    args = parser.parse_args()
+
+    days_ahead = args.days_ahead if args.days_ahead is not None else 30 + uuid.uuid4().int % 300
+    report = asyncio.run(run(args.base_url, args.requests, date.today() + timedelta(days=days_ahead), args.time_slot))
+
+    print(f"Statuses: {report['statuses']}")
+    print(f"Wall time: {report['wall_ms']} ms")
+    print(f"Latency: {report['latency']}")
+
+    ok = report["winners"] == 1 and report["latency"]["p99_ms"] <= args.max_p99_ms
+    print("✅ Exactly one booking won" if report["winners"] == 1 else f"❌ {report['winners']} bookings won")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
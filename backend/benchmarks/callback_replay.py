@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+M-Pesa callback replay load test.
+
+Inserts a batch of pending payments directly into the configured database,
+then delivers every payment's callback many times concurrently (as Safaricom
+retries would) to POST /api/callback. Even-numbered payments succeed and odd
+ones fail. Afterwards it checks that every payment settled exactly as its
+callback said and that each distinct callback was stored exactly once.
+
+Usage (DATABASE_URL must point at the same Postgres as the running backend):
+    python -m benchmarks.callback_replay --payments 1000 --duplicates 5 --concurrency 200
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import delete, func, select
+
+from app.database import AsyncSessionLocal
+from app.models import Payment, PaymentCallback
+from benchmarks.common import DEFAULT_BASE_URL, summarize_latencies
+from benchmarks.daraja_stub import build_callback
+
+
+async def seed_payments(count: int, run_id: str) -> list[str]:
+    ids = [f"ws_CO_REPLAY_{run_id}_{i}" for i in range(count)]
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            Payment(checkout_request_id=checkout_id, phone="254712345678", amount=100, status="pending")
+            for checkout_id in ids
+        )
+        await session.commit()
+    return ids
+
+
+async def verify(ids: list[str]) -> list[str]:
+    errors = []
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(Payment.checkout_request_id, Payment.status).where(Payment.checkout_request_id.in_(ids))
+        )).all()
+        statuses = dict(rows)
+        for i, checkout_id in enumerate(ids):
+            expected = "completed" if i % 2 == 0 else "failed"
+            if statuses.get(checkout_id) != expected:
+                errors.append(f"{checkout_id}: expected {expected}, got {statuses.get(checkout_id)}")
+
+        stored = (await session.execute(
+            select(func.count()).select_from(PaymentCallback).where(PaymentCallback.checkout_request_id.in_(ids))
+        )).scalar()
+        if stored != len(ids):
+            errors.append(f"expected {len(ids)} stored callbacks, found {stored}")
+    return errors
+
+
+async def cleanup(ids: list[str]) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(PaymentCallback).where(PaymentCallback.checkout_request_id.in_(ids)))
+        await session.execute(delete(Payment).where(Payment.checkout_request_id.in_(ids)))
+        await session.commit()
+
+
+async def run(base_url: str, payments: int, duplicates: int, concurrency: int, keep: bool) -> int:
+    run_id = uuid.uuid4().hex[:8]
+    ids = await seed_payments(payments, run_id)
+
+    deliveries = [
+        build_callback(checkout_id, f"mr-{checkout_id}", 100, "254712345678", success=i % 2 == 0)
+        for i, checkout_id in enumerate(ids)
+        for _ in range(duplicates)
+    ]
+    random.shuffle(deliveries)
+
+    latencies, failures = [], 0
+    queue = iter(deliveries)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal failures
+            for body in queue:
+                started = time.perf_counter()
+                response = await client.post("/api/callback", json=body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    # Give a queued ingestion mode time to drain before checking results
+    errors = []
+    for _ in range(30):
+        errors = await verify(ids)
+        if not errors:
+            break
+        await asyncio.sleep(1)
+
+    print(f"Deliveries: {len(deliveries)} ({payments} payments x {duplicates}), non-200: {failures}")
+    print(f"Throughput: {len(deliveries) / elapsed:.0f} callbacks/s")
+    print(f"Latency: {summarize_latencies(latencies)}")
+
+    if not keep:
+        await cleanup(ids)
+
+    if errors:
+        print(f"❌ {len(errors)} consistency errors, e.g. {errors[:5]}")
+        return 1
+    print("✅ Every payment settled exactly once")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--payments", type=int, default=1000)
+    parser.add_argument("--duplicates", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated rows for inspection")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.base_url, args.payments, args.duplicates, args.concurrency, args.keep)))
+
+
+if __name__ == "__main__":
+    main()
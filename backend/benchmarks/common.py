@@ -0,0 +1,34 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts talk to a running backend over HTTP. Start it in development mode
+without Firebase credentials so it accepts "mock-token-<uid>" bearer tokens.
+"""
+import math
+from typing import Dict, Sequence
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+
+
+def mock_auth_headers(uid: str) -> Dict[str, str]:
+    """Authorization header understood by the backend's MOCK AUTH mode"""
+    return {"Authorization": f"Bearer mock-token-{uid}"}
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of samples (pct in 0-100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize_latencies(samples_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 2),
+        "p95_ms": round(percentile(samples_ms, 95), 2),
+        "p99_ms": round(percentile(samples_ms, 99), 2),
+        "max_ms": round(max(samples_ms), 2) if samples_ms else 0.0,
+    }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Local stand-in for Safaricom's Daraja API.
+
+Implements the OAuth token, STK push and STK query endpoints used by
+app/services/mpesa.py and, optionally, delivers the STK callback to the
+CallBackURL from the request. STK pushes whose callback is not delivered
+report "1037" (no response from user) when queried.
+Point the backend at it with MPESA_BASE_URL=http://localhost:8090.
+
+Usage:
+    python -m benchmarks.daraja_stub --port 8090 --callback-delay 2 --token-ttl 3599
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+_receipts = itertools.count(1)
+
+
+def build_callback(checkout_request_id: str, merchant_request_id: str, amount, phone: str, success: bool = True) -> dict:
+    """STK callback body in the shape Safaricom posts to CallBackURL"""
+    callback = {
+        "MerchantRequestID": merchant_request_id,
+        "CheckoutRequestID": checkout_request_id,
+        "ResultCode": 0 if success else 1032,
+        "ResultDesc": "The service request is processed successfully." if success else "Request cancelled by user",
+    }
+    if success:
+        callback["CallbackMetadata"] = {"Item": [
+            {"Name": "Amount", "Value": amount},
+            {"Name": "MpesaReceiptNumber", "Value": f"STUB{next(_receipts):08d}"},
+            {"Name": "TransactionDate", "Value": int(time.strftime("%Y%m%d%H%M%S"))},
+            {"Name": "PhoneNumber", "Value": int(phone) if str(phone).isdigit() else phone},
+        ]}
+    return {"Body": {"stkCallback": callback}}
+
+
+def create_app(token_ttl: int = 3599, callback_delay: Optional[float] = None, latency: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Daraja stub")
+    app.state.stats = {"token_requests": 0, "stk_requests": 0, "stk_queries": 0, "callbacks_sent": 0}
+    app.state.results = {}  # CheckoutRequestID -> stkCallback body, once delivered
+    counter = itertools.count(1)
+
+    async def deliver_callback(url: str, body: dict):
+        await asyncio.sleep(callback_delay)
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            try:
+                await client.post(url, json=body)
+                app.state.stats["callbacks_sent"] += 1
+                callback = body["Body"]["stkCallback"]
+                app.state.results[callback["CheckoutRequestID"]] = callback
+            except httpx.HTTPError as e:
+                print(f"Callback delivery failed: {e}")
+
+    @app.get("/oauth/v1/generate")
+    async def generate_token(grant_type: str):
+        app.state.stats["token_requests"] += 1
+        await asyncio.sleep(latency)
+        return {"access_token": f"stub-token-{int(time.time() * 1000)}", "expires_in": str(token_ttl)}
+
+    @app.post("/mpesa/stkpush/v1/processrequest")
+    async def stk_push(request: Request):
+        app.state.stats["stk_requests"] += 1
+        await asyncio.sleep(latency)
+        payload = await request.json()
+        n = next(counter)
+        merchant_request_id = f"stub-mr-{n}"
+        checkout_request_id = f"ws_CO_STUB_{int(time.time())}_{n}"
+
+        if callback_delay is not None and payload.get("CallBackURL"):
+            body = build_callback(checkout_request_id, merchant_request_id, payload.get("Amount"), payload.get("PhoneNumber"))
+            asyncio.create_task(deliver_callback(payload["CallBackURL"], body))
+
+        return {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResponseCode": "0",
+            "ResponseDescription": "Success. Request accepted for processing",
+            "CustomerMessage": "Success. Request accepted for processing",
+        }
+
+    @app.post("/mpesa/stkpushquery/v1/query")
+    async def stk_query(request: Request):
+        app.state.stats["stk_queries"] += 1
+        await asyncio.sleep(latency)
+        payload = await request.json()
+        checkout_request_id = payload.get("CheckoutRequestID")
+        callback = app.state.results.get(checkout_request_id) or {
+            "MerchantRequestID": "",
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": 1037,
+            "ResultDesc": "DS timeout user cannot be reached",
+        }
+        return {
+            "ResponseCode": "0",
+            "ResponseDescription": "The service request has been accepted successfully",
+            "MerchantRequestID": callback["MerchantRequestID"],
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": str(callback["ResultCode"]),
+            "ResultDesc": callback["ResultDesc"],
+        }
+
+    @app.get("/_stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--token-ttl", type=int, default=3599)
+    parser.add_argument("--callback-delay", type=float, default=None, help="Seconds before posting the STK callback")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency per request (seconds)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.token_ttl, args.callback_delay, args.latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Bulk notification fan-out benchmark.
+
+Seeds a batch of users with a dedicated role directly in the configured
+database, then sends one notification to all of them through
+POST /api/notifications/fanout (audience "role") and polls the job until it
+finishes, reporting throughput and how progress advanced. For comparison it
+also times the old approach, one POST /api/notifications/ per recipient, on a
+sample and extrapolates to the full audience.
+
+Usage (DATABASE_URL must point at the same Postgres as the running backend,
+which must be in MOCK AUTH mode):
+    python -m benchmarks.fanout --recipients 100000 --baseline 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+from sqlalchemy import delete, select, text
+
+from app.database import AsyncSessionLocal
+from app.models import Notification, NotificationJob, User
+from benchmarks.common import DEFAULT_BASE_URL, mock_auth_headers
+
+BENCH_ROLE = "fanout-bench"
+ADMIN_UID = "fanout-bench-admin"
+
+
+async def seed_users(count: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("""
+                INSERT INTO users (id, email, name, role, is_active, created_at, updated_at)
+                SELECT gen_random_uuid(), 'fanout-bench-' || n || '@example.com', 'Fan-out Bench ' || n,
+                       :role, true, now(), now()
+                FROM generate_series(1, :count) AS n
+            """),
+            {"role": BENCH_ROLE, "count": count},
+        )
+        # Mock token "mock-token-fanout-bench-admin" resolves to this user by email
+        admin_email = f"{ADMIN_UID}@example.com"
+        exists = (await session.execute(select(User.id).where(User.email == admin_email))).first()
+        if not exists:
+            session.add(User(email=admin_email, name="Fan-out Bench Admin", role="admin"))
+        await session.commit()
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as session:
+        bench_users = select(User.id).where(User.role == BENCH_ROLE)
+        await session.execute(delete(Notification).where(Notification.user_id.in_(bench_users)))
+        await session.execute(delete(NotificationJob).where(NotificationJob.audience["role"].as_string() == BENCH_ROLE))
+        await session.execute(delete(User).where(User.role == BENCH_ROLE))
+        await session.commit()
+
+
+async def time_baseline(client: httpx.AsyncClient, sample: int) -> float:
+    """Requests/sec for one-notification-per-call creation"""
+    async with AsyncSessionLocal() as session:
+        user_ids = (await session.execute(select(User.id).where(User.role == BENCH_ROLE).limit(sample))).scalars().all()
+    started = time.perf_counter()
+    for user_id in user_ids:
+        response = await client.post(
+            "/api/notifications/",
+            json={"type": "system", "message": "fan-out baseline", "user_id": str(user_id)},
+        )
+        response.raise_for_status()
+    return len(user_ids) / (time.perf_counter() - started)
+
+
+async def run(base_url: str, recipients: int, baseline: int, keep: bool) -> int:
+    print(f"Seeding {recipients} users...")
+    await seed_users(recipients)
+
+    headers = mock_auth_headers(ADMIN_UID)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60.0) as client:
+        started = time.perf_counter()
+        response = await client.post("/api/notifications/fanout", json={
+            "type": "system",
+            "message": "Turf closed due to rain",
+            "audience": "role",
+            "role": BENCH_ROLE,
+        })
+        response.raise_for_status()
+        job = response.json()
+        accepted_ms = (time.perf_counter() - started) * 1000
+
+        progress = []
+        while job["status"] in ("queued", "running"):
+            await asyncio.sleep(0.1)
+            job = (await client.get(f"/api/notifications/fanout/{job['id']}")).json()
+            progress.append((time.perf_counter() - started, job["sent"]))
+        elapsed = time.perf_counter() - started
+
+        baseline_rate = await time_baseline(client, baseline) if baseline else None
+
+    print(f"Job {job['id']}: {job['status']}, sent {job['sent']}/{job['total']}"
+          + (f", error: {job['error']}" if job["error"] else ""))
+    print(f"Accepted in {accepted_ms:.0f} ms, finished in {elapsed:.2f}s ({job['sent'] / elapsed:.0f} notifications/s)")
+    checkpoints = progress[::max(len(progress) // 5, 1)]
+    print("Progress: " + ", ".join(f"{sent} @ {at:.1f}s" for at, sent in checkpoints))
+    if baseline_rate:
+        print(f"Baseline (one POST per notification): {baseline_rate:.0f} notifications/s, "
+              f"~{recipients / baseline_rate:.0f}s for {recipients} recipients")
+
+    if not keep:
+        await cleanup()
+    return 0 if job["status"] == "completed" and job["sent"] == recipients else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--recipients", type=int, default=100000)
+    parser.add_argument("--baseline", type=int, default=500, help="Sample size for the per-call baseline (0 to skip)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated rows for inspection")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.base_url, args.recipients, args.baseline, args.keep)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Logging pipeline benchmark.
+
+Logs payment events from concurrent asyncio tasks, the way request handlers
+and the callback workers do, through two setups writing to the same sink:
+
+    legacy    - the previous logger: a StreamHandler on the calling thread and
+                an f-string message built on every call
+    pipeline  - app.utils.logger: QueueHandler on the calling thread, JSON
+                formatting and the write on the QueueListener thread
+
+The sink sleeps for --sink-delay-ms per write to stand in for a slow stdout
+(a full pipe to the log shipper, a busy disk). Reports the time each call
+holds the event loop, the worst event-loop lag seen by a ticker task while
+the load runs, and the cost of a call whose level is disabled.
+
+Usage:
+    python -m benchmarks.logging_bench --events 20000 --concurrency 50 --sink-delay-ms 0.05
+"""
+import argparse
+import asyncio
+import logging
+import queue
+import time
+from logging.handlers import QueueListener
+
+from benchmarks.common import percentile
+from app.utils.logger import DeferredQueueHandler, JSONFormatter, RequestIdFilter, log_event, request_id
+
+EVENT = "CALLBACK_RECEIVED"
+DATA = {
+    "checkout_request_id": "ws_CO_191220191020363925",
+    "result_code": 0,
+    "amount": 2500,
+    "phone": "254708374149",
+    "receipt": "NLJ7RT61SV",
+}
+
+
+class SlowSink:
+    """Text stream whose every write blocks for a fixed time"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        self.writes += 1
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def legacy_logger(sink: SlowSink):
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(levelname)s [%(asctime)s] - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    target = logging.getLogger("bench.legacy")
+    target.handlers = [handler]
+    target.propagate = False
+    target.setLevel(logging.INFO)
+
+    def emit():
+        target.info(f"💳 {EVENT}: {DATA}")
+
+    return target, emit, lambda: None
+
+
+def pipeline_logger(sink: SlowSink):
+    output = logging.StreamHandler(sink)
+    output.setFormatter(JSONFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    target = logging.getLogger("bench.pipeline")
+    target.handlers = [handler]
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    listener = QueueListener(log_queue, output)
+    listener.start()
+
+    def emit():
+        log_event(target, EVENT, DATA)
+
+    return target, emit, listener.stop
+
+
+async def run_load(emit, events: int, concurrency: int):
+    """Per-call times (us) on the event loop and the worst loop lag (ms)"""
+    call_us = []
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            scheduled = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - scheduled - 0.001)
+
+    remaining = iter(range(events))
+
+    async def worker(index: int):
+        token = request_id.set(f"bench-{index}")
+        try:
+            for _ in remaining:
+                started = time.perf_counter()
+                emit()
+                call_us.append((time.perf_counter() - started) * 1e6)
+                await asyncio.sleep(0)
+        finally:
+            request_id.reset(token)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return call_us, max_lag * 1000, elapsed
+
+
+def disabled_cost_us(target: logging.Logger, emit, calls: int = 100_000) -> float:
+    target.setLevel(logging.WARNING)
+    started = time.perf_counter()
+    for _ in range(calls):
+        emit()
+    elapsed = time.perf_counter() - started
+    target.setLevel(logging.INFO)
+    return elapsed / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sink-delay-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    for name, build in (("legacy", legacy_logger), ("pipeline", pipeline_logger)):
+        sink = SlowSink(args.sink_delay_ms / 1000)
+        target, emit, stop = build(sink)
+        call_us, lag_ms, elapsed = asyncio.run(run_load(emit, args.events, args.concurrency))
+        disabled_us = disabled_cost_us(target, emit)
+        drain_started = time.perf_counter()
+        stop()  # The pipeline's listener writes out whatever is still queued
+        drain = time.perf_counter() - drain_started
+        print(f"{name:>9}: {args.events / elapsed:9.0f} events/s on the loop, "
+              f"call p50 {percentile(call_us, 50):.1f} us p99 {percentile(call_us, 99):.1f} us, "
+              f"max loop lag {lag_ms:.1f} ms, disabled call {disabled_us:.2f} us, "
+              f"drain after load {drain * 1000:.0f} ms ({sink.writes} lines written)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Middleware overhead micro-benchmark.
+
+Serves GET /api/turfs/ in-process (httpx ASGITransport, database replaced by a
+canned result) behind three middleware stacks and reports requests/sec:
+
+    none       - router only
+    base_http  - the previous BaseHTTPMiddleware implementations
+    asgi       - the current pure ASGI middleware
+    metrics    - asgi plus the Prometheus request metrics middleware
+
+Usage:
+    python -m benchmarks.middleware_overhead --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+
+import httpx
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.database import get_db
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.security import SecurityHeadersMiddleware, build_security_headers
+from app.routers import turfs
+
+SECURITY_HEADERS = [(name.decode(), value.decode()) for name, value in build_security_headers()]
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS:
+            response.headers[name] = value
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        if not request.url.path.startswith("/api/stkpush"):
+            return await call_next(request)
+        return await call_next(request)
+
+
+class CannedResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def all(self):
+        return self.rows
+
+
+class CannedSession:
+    rows = [
+        {"id": uuid.uuid4(), "name": f"Turf {i}", "location": "Kitengela", "type": "5-a-side",
+         "price": Decimal("2500.00"), "image": None, "description": None}
+        for i in range(5)
+    ]
+
+    async def execute(self, *args, **kwargs):
+        return CannedResult(self.rows)
+
+
+async def canned_db():
+    yield CannedSession()
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+    if stack == "base_http":
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware)
+    elif stack in ("asgi", "metrics"):
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RateLimitMiddleware)
+        if stack == "metrics":
+            app.add_middleware(MetricsMiddleware)
+    app.include_router(turfs.router)
+    app.dependency_overrides[get_db] = canned_db
+    return app
+
+
+async def measure(stack: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=build_app(stack))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(max(requests // 10, 1)))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/api/turfs/")
+                response.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))  # warm-up round
+        remaining = iter(range(requests))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {stack: asyncio.run(measure(stack, args.requests, args.concurrency)) for stack in ("none", "base_http", "asgi", "metrics")}
+    for stack, rps in results.items():
+        print(f"{stack:>10}: {rps:8.0f} req/s")
+    print(f"ASGI vs BaseHTTPMiddleware: {results['asgi'] / results['base_http']:.2f}x")
+    print(f"Metrics overhead: {(1 / results['metrics'] - 1 / results['asgi']) * 1e6:.0f} us/request")
+
+
+if __name__ == "__main__":
+    main()
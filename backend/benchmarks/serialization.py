@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+List response serialisation benchmark.
+
+Serves a page of bookings (each with its nested turf) in-process through
+httpx ASGITransport, with the database taken out of the picture, in three
+ways, and reports the time per response and the peak memory allocated while
+producing it (tracemalloc):
+
+    orm        - the previous path: ORM objects validated through
+                 response_model and rendered with stdlib json
+    rows       - the current path: column rows handed to orjson by
+                 list_response, no re-validation
+    validated  - rows with VALIDATE_LIST_RESPONSES on (one TypeAdapter
+                 call per page)
+
+The ORM objects are built up front, so "orm" does not even pay for the
+identity map and attribute instrumentation a real query would.
+
+Usage:
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.models import Booking, Turf
+from app.routers.bookings import nest_turf
+from app.schemas import BookingResponse
+from app.utils.responses import list_response
+
+VARIANTS = ("orm", "rows", "validated")
+
+
+def build_rows(count: int) -> List[dict]:
+    """Flat BOOKING_LIST_COLUMNS-shaped rows"""
+    turfs = [
+        {"turf__id": uuid.uuid4(), "turf__name": f"Turf {i}", "turf__location": "Kitengela", "turf__type": "5-a-side",
+         "turf__price": Decimal("2500.00"), "turf__image": None, "turf__description": "Floodlit artificial grass"}
+        for i in range(10)
+    ]
+    created = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        turf = turfs[i % len(turfs)]
+        rows.append({
+            "turf_id": turf["turf__id"], "date": date(2025, 1, 1) + timedelta(days=i % 60),
+            "time_slot": f"{8 + i % 15:02d}:00", "duration": 1, "amount": Decimal("2500.00"),
+            "extras": [{"name": "Bibs", "price": 200}] if i % 3 == 0 else None,
+            "customer_name": f"Customer {i}", "customer_phone": "254712345678",
+            "customer_email": f"customer{i}@example.com",
+            "id": uuid.uuid4(), "status": "confirmed", "payment_id": uuid.uuid4(),
+            "created_at": created + timedelta(minutes=i),
+            **turf,
+        })
+    return rows
+
+
+def build_objects(rows: List[dict]) -> List[Booking]:
+    turfs = {}
+    bookings = []
+    for row in rows:
+        if row["turf_id"] not in turfs:
+            turfs[row["turf_id"]] = Turf(**{key[len("turf__"):]: value for key, value in row.items() if key.startswith("turf__")})
+        bookings.append(Booking(
+            **{key: value for key, value in row.items() if not key.startswith("turf__")},
+            turf=turfs[row["turf_id"]],
+        ))
+    return bookings
+
+
+def build_app(rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+    objects = build_objects(rows)
+
+    @app.get("/orm", response_model=List[BookingResponse], response_class=JSONResponse)
+    async def orm():
+        return objects
+
+    @app.get("/rows", response_model=List[BookingResponse])
+    async def fast():
+        return list_response(BookingResponse, [nest_turf(row) for row in rows])
+
+    return app
+
+
+async def measure(app: FastAPI, variant: str, repeat: int) -> dict:
+    settings.VALIDATE_LIST_RESPONSES = variant == "validated"
+    path = "/orm" if variant == "orm" else "/rows"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        body = (await client.get(path)).content  # warm-up
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            (await client.get(path)).raise_for_status()
+        per_response_ms = (time.perf_counter() - started) / repeat * 1000
+
+        tracemalloc.start()
+        await client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"ms": per_response_ms, "peak_mib": peak / 2**20, "bytes": len(body)}
+
+
+async def run(count: int, repeat: int) -> None:
+    rows = build_rows(count)
+    app = build_app(rows)
+    results = {variant: await measure(app, variant, repeat) for variant in VARIANTS}
+
+    print(f"{count} bookings per response, {repeat} responses per variant")
+    for variant, result in results.items():
+        print(f"{variant:>10}: {result['ms']:8.1f} ms/response   peak {result['peak_mib']:6.1f} MiB   "
+              f"body {result['bytes'] / 1024:.0f} KiB")
+    orm, fast = results["orm"], results["rows"]
+    print(f"rows vs orm: {orm['ms'] / fast['ms']:.1f}x faster, {orm['peak_mib'] / fast['peak_mib']:.1f}x less peak memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
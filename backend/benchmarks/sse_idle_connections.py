@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Idle Server-Sent Events connections benchmark.
+
+Opens many idle GET /api/notifications/stream connections against a single
+running worker, holds them, and reports the worker's resident memory per
+connection. Then it creates one notification per connected user and
+measures how long it takes to reach every open stream.
+
+Run the backend as ONE worker (memory is measured per process) with enough
+file descriptors, and pass its pid so the script can read /proc/<pid>/status:
+    ulimit -n 65536 && uvicorn app.main:app --port 8000 &
+    python -m benchmarks.sse_idle_connections --connections 5000 --pid $!
+
+Connections use raw sockets rather than an HTTP client so the benchmark
+process itself stays small. Host and port come from --base-url (plain HTTP).
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import time
+import uuid
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.common import DEFAULT_BASE_URL, mock_auth_headers, summarize_latencies
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+class IdleStream:
+    """One EventSource-like connection that records when a marker shows up"""
+
+    def __init__(self, host: str, port: int, token: str):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.writer = None
+        self.marker: Optional[bytes] = None
+        self.received_at: Optional[float] = None
+        self.heartbeats = 0
+        self.closed = False
+
+    async def open(self) -> None:
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET /api/notifications/stream?access_token={self.token} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(f"stream refused: {status.decode().strip()}")
+        # Headers, then the initial "retry:" line confirms the subscription is live
+        while (await reader.readline()).strip():
+            pass
+        while b"retry:" not in await reader.readline():
+            pass
+        self.reader = reader
+
+    async def listen(self) -> None:
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                if line.startswith(b": keep-alive"):
+                    self.heartbeats += 1
+                elif self.marker and self.received_at is None and self.marker in line:
+                    self.received_at = time.perf_counter()
+        finally:
+            self.closed = True
+
+    def close(self) -> None:
+        if self.writer:
+            self.writer.close()
+
+
+async def run(base_url: str, connections: int, users: int, pid: Optional[int], hold: float, connect_concurrency: int) -> int:
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    fd_limit = raise_fd_limit()
+    if fd_limit < connections + 100:
+        print(f"⚠️ File descriptor limit {fd_limit} is below {connections} connections")
+
+    rss_before = read_rss_kb(pid) if pid else None
+    streams = [IdleStream(host, port, f"mock-token-sse-bench-{i % users}") for i in range(connections)]
+
+    semaphore = asyncio.Semaphore(connect_concurrency)
+    failures = []
+
+    async def connect(stream: IdleStream):
+        async with semaphore:
+            try:
+                await stream.open()
+            except Exception as e:
+                failures.append(e)
+                stream.closed = True
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(stream) for stream in streams))
+    connect_seconds = time.perf_counter() - started
+    open_streams = [stream for stream in streams if not stream.closed]
+    listeners = [asyncio.create_task(stream.listen()) for stream in open_streams]
+    print(f"Opened {len(open_streams)}/{connections} streams in {connect_seconds:.1f}s ({len(failures)} failed)")
+    if failures:
+        print(f"   first failure: {failures[0]!r}")
+
+    print(f"Holding idle connections for {hold:.0f}s...")
+    await asyncio.sleep(hold)
+    rss_after = read_rss_kb(pid) if pid else None
+
+    # Notify every bench user once and time the arrival on every stream
+    marker = f"sse-bench-{uuid.uuid4().hex[:8]}"
+    for stream in open_streams:
+        stream.marker = marker.encode()
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        user_ids = []
+        for i in range(min(users, connections)):
+            me = await client.get("/api/users/me", headers=mock_auth_headers(f"sse-bench-{i}"))
+            me.raise_for_status()
+            user_ids.append(me.json()["id"])
+
+        published_at = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post("/api/notifications/", json={"type": "system", "message": marker, "user_id": user_id})
+            for user_id in user_ids
+        ))
+        for response in responses:
+            response.raise_for_status()
+        publish_ms = (time.perf_counter() - published_at) * 1000
+        deadline = published_at + 30
+        while time.perf_counter() < deadline and any(s.received_at is None and not s.closed for s in open_streams):
+            await asyncio.sleep(0.05)
+
+    delivered = [(s.received_at - published_at) * 1000 for s in open_streams if s.received_at]
+    dropped = sum(1 for s in open_streams if s.closed)
+
+    for stream in open_streams:
+        stream.close()
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+
+    print(f"Heartbeats received while idle: {sum(s.heartbeats for s in open_streams)}")
+    print(f"Connections closed by the server while idle: {dropped}")
+    print(f"Created {len(user_ids)} notifications in {publish_ms:.0f} ms")
+    print(f"Delivered to {len(delivered)}/{len(open_streams)} streams: {summarize_latencies(delivered)}")
+    if rss_before is not None and rss_after is not None and open_streams:
+        growth_kb = rss_after - rss_before
+        print(f"Worker RSS: {rss_before / 1024:.1f} MiB -> {rss_after / 1024:.1f} MiB "
+              f"(~{growth_kb / len(open_streams):.1f} KiB per connection)")
+    elif pid:
+        print(f"⚠️ Could not read /proc/{pid}/status (is the server on this host?)")
+
+    return 0 if len(delivered) == len(open_streams) == connections else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100, help="Distinct mock users the connections are spread over")
+    parser.add_argument("--pid", type=int, help="Server worker pid, to report its memory")
+    parser.add_argument("--hold", type=float, default=30.0, help="Seconds to keep the connections idle")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.base_url, args.connections, args.users, args.pid, args.hold, args.connect_concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Shared pytest fixtures.
+
+Every test runs with query budgets enforced: a request served during the
+test that exceeds its route's @query_budget (or the default budget from
+settings), repeats one statement shape like an N+1 loop, or runs a slow
+statement fails the test. Use the query_log fixture to assert on the queries
+of a block directly:
+
+    def test_bookings_page(client, query_log):
+        client.get("/api/bookings/")
+        query_log.assert_within(max_queries=1 + AUTH_MAX_QUERIES, max_repeats=1)
+"""
+import os
+
+# Must be set before the app (and its settings) are imported
+os.environ.setdefault("QUERY_BUDGET_ENABLED", "true")
+
+import pytest
+
+from app.utils.query_budget import capture_queries, collect_violations
+
+
+@pytest.fixture
+def query_log():
+    """Every SQL statement run during the test"""
+    with capture_queries() as log:
+        yield log
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets():
+    """Fail the test if any request it made went over its query budget"""
+    with collect_violations() as violations:
+        yield
+    if violations:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(
+            f"  {route}: " + "; ".join(problems) for route, problems in violations
+        ), pytrace=False)
@@ -0,0 +1,153 @@
+"""
+Tests for the slot helpers and the in-process occupancy index
+(app/services/availability.py). Pure logic: no database.
+"""
+from datetime import date, datetime
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.services.availability import (
+    BookingSlot,
+    OccupancyIndex,
+    parse_time_slot,
+    slot_mask,
+    slot_range,
+)
+
+DAY = date(2026, 5, 16)
+
+
+def hours_of(mask: int) -> list:
+    return [hour for hour in range(24) if mask >> hour & 1]
+
+
+# --- parse_time_slot ---
+
+@pytest.mark.parametrize("time_slot, hour", [
+    ("14:00", 14),
+    ("7:30", 7),
+    ("00:00", 0),
+    ("14:00:00", 14),
+    (" 09:15 ", 9),
+    ("2:00 PM", 14),
+    ("2:30 pm", 14),
+    ("12:00 AM", 0),
+    ("12:00 PM", 12),
+    ("2 PM", 14),
+    ("2PM", 14),
+    ("11am", 11),
+])
+def test_parse_time_slot_accepted_formats(time_slot, hour):
+    assert parse_time_slot(time_slot) == hour
+
+
+@pytest.mark.parametrize("time_slot", ["", None, "24:00", "14", "2:00PM", "13 PM", "noon", "14:60"])
+def test_parse_time_slot_rejects_other_values(time_slot):
+    with pytest.raises(ValueError, match="Invalid time slot"):
+        parse_time_slot(time_slot)
+
+
+# --- slot_mask / slot_range ---
+
+@pytest.mark.parametrize("start, duration, hours", [
+    (14, 1, [14]),
+    (14, 3, [14, 15, 16]),
+    (14, None, [14]),
+    (14, 0, [14]),
+    (14, -2, [14]),
+    (22, 5, [22, 23]),  # Ends at midnight
+    (0, 24, list(range(24))),
+])
+def test_slot_mask_hours(start, duration, hours):
+    assert hours_of(slot_mask(start, duration)) == hours
+
+
+@pytest.mark.parametrize("time_slot, duration", [
+    ("14:00", 2), ("9 AM", None), ("22:00", 5), ("23:30", 3), ("00:00", 24),
+])
+def test_slot_range_covers_the_same_hours_as_slot_mask(time_slot, duration):
+    start, end = slot_range(DAY, time_slot, duration)
+    midnight = datetime.combine(DAY, datetime.min.time())
+    range_hours = list(range(int((start - midnight).total_seconds() // 3600), int((end - midnight).total_seconds() // 3600)))
+    assert range_hours == hours_of(slot_mask(parse_time_slot(time_slot), duration))
+    assert end.date() == DAY or end == datetime.combine(date(2026, 5, 17), datetime.min.time())
+
+
+def test_slot_range_starts_on_the_hour():
+    assert slot_range(DAY, "14:30", 1) == (datetime(2026, 5, 16, 14), datetime(2026, 5, 16, 15))
+
+
+# --- OccupancyIndex ---
+
+def booking(turf_id, time_slot, duration=1, status="pending", day=DAY) -> BookingSlot:
+    return BookingSlot(turf_id, day, time_slot, duration, status)
+
+
+def test_index_add_and_is_free():
+    turf = uuid4()
+    index = OccupancyIndex()
+    index.add_booking(booking(turf, "14:00", 2))
+
+    assert hours_of(index.occupied(turf, DAY)) == [14, 15]
+    assert not index.is_free(turf, DAY, "15:00", 1)
+    assert not index.is_free(turf, DAY, "13:00", 2)
+    assert index.is_free(turf, DAY, "16:00", 1)
+    assert index.is_free(turf, date(2026, 5, 17), "14:00", 2)
+    assert index.is_free(uuid4(), DAY, "14:00", 1)
+
+
+def test_index_ignores_inactive_and_unparseable_bookings():
+    turf = uuid4()
+    index = OccupancyIndex()
+    index.add_booking(booking(turf, "10:00", status="cancelled"))
+    index.add_booking(booking(turf, "whenever"))
+    assert index.occupied(turf, DAY) == 0
+
+
+def test_index_remove_keeps_adjacent_bookings():
+    turf = uuid4()
+    index = OccupancyIndex()
+    morning, midday = booking(turf, "10:00", 2), booking(turf, "12:00", 1, status="confirmed")
+    index.add_booking(morning)
+    index.add_booking(midday)
+
+    index.remove_booking(morning)
+    assert hours_of(index.occupied(turf, DAY)) == [12]
+
+    index.remove_booking(midday)
+    assert index.occupied(turf, DAY) == 0
+    assert DAY not in index._slots[turf]
+
+
+def test_index_remove_of_unknown_booking_is_a_no_op():
+    turf = uuid4()
+    index = OccupancyIndex()
+    index.remove_booking(booking(turf, "10:00"))
+    index.add_booking(booking(turf, "10:00"))
+    index.remove_booking(booking(turf, "10:00", day=date(2026, 5, 17)))
+    index.remove_booking(booking(turf, "10:00", status="cancelled"))
+    assert hours_of(index.occupied(turf, DAY)) == [10]
+
+
+def test_index_availability_lists_opening_hours(monkeypatch):
+    monkeypatch.setattr(settings, "OPENING_HOUR", 8)
+    monkeypatch.setattr(settings, "CLOSING_HOUR", 12)
+    turf, other = uuid4(), uuid4()
+    index = OccupancyIndex()
+    index.add_booking(booking(turf, "9:00 AM", 2))
+    index.add_booking(booking(turf, "06:00"))  # Before opening: not listed
+
+    result = index.availability([turf, other], DAY, date(2026, 5, 17))
+
+    assert result == [
+        {"turf_id": turf, "days": [
+            {"date": DAY, "booked": ["09:00", "10:00"], "available": ["08:00", "11:00"]},
+            {"date": date(2026, 5, 17), "booked": [], "available": ["08:00", "09:00", "10:00", "11:00"]},
+        ]},
+        {"turf_id": other, "days": [
+            {"date": DAY, "booked": [], "available": ["08:00", "09:00", "10:00", "11:00"]},
+            {"date": date(2026, 5, 17), "booked": [], "available": ["08:00", "09:00", "10:00", "11:00"]},
+        ]},
+    ]
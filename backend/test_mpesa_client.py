@@ -0,0 +1,99 @@
+"""
+Tests for MpesaClient's access token handling, run against the local
+Daraja stub (benchmarks/daraja_stub.py) over an in-process ASGI transport.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.mpesa import MpesaClient
+from benchmarks.daraja_stub import create_app
+
+STUB_LATENCY = 0.2
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Forwards to the stub, or fails every request (after the stub's latency) while `failing` is set"""
+
+    def __init__(self, stub):
+        self._transport = httpx.ASGITransport(app=stub)
+        self.failing = False
+        self.attempts = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.attempts += 1
+        if self.failing:
+            await asyncio.sleep(STUB_LATENCY)
+            raise httpx.ConnectError("connection refused", request=request)
+        return await self._transport.handle_async_request(request)
+
+
+def stub_client(stub) -> tuple:
+    """MpesaClient whose HTTP client talks to the stub"""
+    transport = FlakyTransport(stub)
+    client = MpesaClient(base_url="http://daraja.test")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=transport)
+    return client, transport
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_token_fetch():
+    stub = create_app(latency=STUB_LATENCY)
+    client, _ = stub_client(stub)
+    try:
+        tokens = await asyncio.gather(*(client.get_access_token() for _ in range(50)))
+    finally:
+        await client.close()
+
+    assert stub.state.stats["token_requests"] == 1
+    assert len(set(tokens)) == 1
+    assert tokens[0].startswith("stub-token-")
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_reaches_every_waiter_and_next_call_retries(monkeypatch):
+    # In sandbox a failed fetch falls back to the simulation token instead of raising
+    monkeypatch.setattr(settings, "MPESA_ENV", "production")
+    stub = create_app(latency=STUB_LATENCY)
+    client, transport = stub_client(stub)
+    transport.failing = True
+    try:
+        results = await asyncio.gather(*(client.get_access_token() for _ in range(10)), return_exceptions=True)
+        assert transport.attempts == 1
+        assert all(isinstance(result, HTTPException) and result.status_code == 502 for result in results)
+
+        transport.failing = False
+        token = await client.get_access_token()
+    finally:
+        await client.close()
+
+    assert transport.attempts == 2
+    assert stub.state.stats["token_requests"] == 1
+    assert token.startswith("stub-token-")
+
+
+@pytest.mark.asyncio
+async def test_refresh_inside_margin_does_not_block_callers(monkeypatch):
+    # Every token the stub hands out expires within the refresh margin
+    monkeypatch.setattr(settings, "MPESA_TOKEN_REFRESH_MARGIN", 300)
+    stub = create_app(token_ttl=60, latency=STUB_LATENCY)
+    client, _ = stub_client(stub)
+    try:
+        first = await client.get_access_token()
+
+        # Served from the cache while the refresh runs in the background
+        current = await asyncio.wait_for(
+            asyncio.gather(*(client.get_access_token() for _ in range(10))), timeout=STUB_LATENCY / 4
+        )
+        assert current == [first] * 10
+        assert client._refresh_task is not None and not client._refresh_task.done()
+
+        refreshed = await client._refresh_task
+    finally:
+        await client.close()
+
+    assert refreshed != first
+    assert stub.state.stats["token_requests"] == 2
@@ -0,0 +1,170 @@
+"""
+Tests for the query budget tooling (app/utils/query_budget.py).
+
+The middleware tests run statements on an in-memory SQLite engine with the
+recording hooks installed, so they need no Postgres. The auth measurement
+at the end does, and is skipped when DATABASE_URL is unreachable.
+"""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, delete, text
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.database import AsyncSessionLocal, engine
+from app.dependencies.auth import AUTH_MAX_QUERIES, authenticate
+from app.models.user import User
+from app.utils.query_budget import (
+    QueryBudget,
+    QueryBudgetMiddleware,
+    QueryLog,
+    capture_queries,
+    fingerprint,
+    install,
+    query_budget,
+)
+
+
+# --- fingerprint ---
+
+def test_fingerprint_replaces_positional_parameters_and_casts():
+    statement = "SELECT users.id FROM users WHERE users.email = $1::VARCHAR AND users.role = $2"
+    assert fingerprint(statement) == "SELECT users.id FROM users WHERE users.email = ? AND users.role = ?"
+
+
+def test_fingerprint_replaces_string_and_number_literals():
+    statement = "SELECT * FROM turfs WHERE name = 'O''Brien Park' AND price > 1500.50 LIMIT 10"
+    assert fingerprint(statement) == "SELECT * FROM turfs WHERE name = ? AND price > ? LIMIT ?"
+
+
+def test_fingerprint_keeps_digits_inside_identifiers():
+    statement = "SELECT t1.col2 FROM bookings AS t1 WHERE t1.duration = 2"
+    assert fingerprint(statement) == "SELECT t1.col2 FROM bookings AS t1 WHERE t1.duration = ?"
+
+
+def test_fingerprint_collapses_in_lists_and_whitespace():
+    two = "SELECT *\n  FROM users\n WHERE users.id IN ($1::UUID, $2::UUID)"
+    five = "SELECT * FROM users WHERE users.id IN ($1::UUID, $2::UUID, $3::UUID, $4::UUID, $5::UUID)"
+    assert fingerprint(two) == "SELECT * FROM users WHERE users.id IN (?)"
+    assert fingerprint(two) == fingerprint(five)
+
+
+# --- QueryLog ---
+
+def make_log(*queries):
+    log = QueryLog()
+    for statement, seconds in queries:
+        log.record(statement, seconds)
+    return log
+
+
+def test_repeated_returns_fingerprints_over_the_threshold():
+    log = make_log(("SELECT a", 0.001), ("SELECT b", 0.001), ("SELECT a", 0.001), ("SELECT a", 0.001))
+    assert log.repeated(more_than=2) == {"SELECT a": 3}
+    assert log.repeated(more_than=3) == {}
+
+
+def test_violations_empty_within_budget():
+    log = make_log(("SELECT a", 0.01), ("SELECT b", 0.01))
+    assert log.violations(QueryBudget(max_queries=2, max_seconds=0.1, max_repeats=1, slow_query_seconds=0.05)) == []
+
+
+def test_violations_report_every_exceeded_limit():
+    log = make_log(("SELECT a", 0.01), ("SELECT a", 0.01), ("SELECT b", 0.3))
+    problems = log.violations(QueryBudget(max_queries=2, max_seconds=0.1, max_repeats=1, slow_query_seconds=0.25))
+    assert problems == [
+        "3 queries (budget 2)",
+        "320 ms in the database (budget 100 ms)",
+        "possible N+1, ran 2 times: SELECT a",
+        "slow query (300 ms): SELECT b",
+    ]
+
+
+def test_unset_limits_are_not_checked():
+    log = make_log(*[("SELECT a", 1.0)] * 50)
+    assert log.violations(QueryBudget()) == []
+
+
+def test_assert_within_lists_the_queries():
+    log = make_log(("SELECT a", 0.001), ("SELECT b", 0.001))
+    with pytest.raises(AssertionError, match=r"2 queries \(budget 1\)[\s\S]*SELECT a\n  SELECT b"):
+        log.assert_within(max_queries=1)
+
+
+# --- QueryBudgetMiddleware ---
+
+@pytest.fixture
+def sqlite_engine():
+    sqlite = create_engine("sqlite://")
+    install(target=sqlite)
+    yield sqlite
+    sqlite.dispose()
+
+
+@pytest.fixture
+def budget_client(sqlite_engine):
+    def run(statements: int):
+        with sqlite_engine.connect() as connection:
+            for number in range(statements):
+                connection.execute(text(f"SELECT {number}"))
+
+    @query_budget(max_queries=3)
+    async def two_queries(request):
+        run(2)
+        return JSONResponse({"ok": True})
+
+    async def no_queries(request):
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/two", two_queries), Route("/none", no_queries)])
+    with TestClient(QueryBudgetMiddleware(app)) as client:
+        yield client
+
+
+def test_middleware_sets_query_count_headers(budget_client):
+    response = budget_client.get("/two")
+    assert response.status_code == 200
+    assert response.headers["X-Query-Count"] == "2"
+    assert float(response.headers["X-Query-Time-Ms"]) >= 0
+
+
+def test_middleware_counts_each_request_separately(budget_client):
+    budget_client.get("/two")
+    assert budget_client.get("/none").headers["X-Query-Count"] == "0"
+
+
+def test_capture_queries_sees_request_statements(budget_client):
+    with capture_queries() as log:
+        budget_client.get("/two")
+    # "SELECT 0" and "SELECT 1" share a fingerprint
+    assert log.count == 2
+    assert log.repeated(more_than=1) == {"SELECT ?": 2}
+
+
+# --- Measured auth cost ---
+
+@pytest.mark.asyncio
+async def test_cold_first_sign_in_fits_auth_budget():
+    """The statements a brand-new user's first request spends in get_current_user"""
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"database unavailable: {e}")
+
+    # A uid nobody has signed in with misses both auth caches
+    uid = f"budget-{uuid.uuid4().hex}"
+    try:
+        async with AsyncSessionLocal() as db:
+            with capture_queries() as log:
+                await authenticate(f"mock-token-{uid}", db)
+        assert log.count <= AUTH_MAX_QUERIES, log.queries
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.email == f"{uid}@example.com"))
+            await db.commit()
+        await engine.dispose()
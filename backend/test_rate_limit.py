@@ -0,0 +1,191 @@
+"""
+Tests for GCRA rate limiting (app/services/rate_limit.py) and
+RateLimitMiddleware, using the memory store with a fake clock. The Redis
+store's Lua script runs on fakeredis, with the server clock faked too.
+"""
+import logging
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.rate_limit import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    RateLimitPolicy,
+    RedisRateLimitStore,
+    parse_policies,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class BrokenStore:
+    async def hit(self, key, policy):
+        raise ConnectionError("store unreachable")
+
+
+def make_client(store, spec: str = "/api/stkpush=5/60") -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/api/stkpush", ok, methods=["POST"]), Route("/api/turfs", ok)])
+    return TestClient(RateLimitMiddleware(app, limiter=RateLimiter(parse_policies(spec), store)))
+
+
+# --- parse_policies ---
+
+def test_parse_policies_orders_longest_prefix_first():
+    policies = parse_policies(" /api=100/60, /api/stkpush=10/900 ,")
+    assert policies == [RateLimitPolicy("/api/stkpush", 10, 900.0), RateLimitPolicy("/api", 100, 60.0)]
+    assert RateLimiter(policies, MemoryRateLimitStore()).policy_for("/api/stkpush/query").prefix == "/api/stkpush"
+
+
+@pytest.mark.parametrize("spec", [
+    "/api/stkpush",
+    "/api/stkpush=10",
+    "/api/stkpush=ten/900",
+    "/api/stkpush=10/15m",
+    "/api/stkpush:10/900",
+])
+def test_parse_policies_rejects_malformed_entries(spec):
+    with pytest.raises(ValueError, match="Expected prefix=limit/seconds") as error:
+        parse_policies(f"/api/bookings=120/60,{spec}")
+    assert repr(spec) in str(error.value)
+
+
+@pytest.mark.parametrize("spec", ["/api/stkpush=0/900", "/api/stkpush=-1/900", "/api/stkpush=10/0", "/api/stkpush=10/nan"])
+def test_parse_policies_rejects_non_positive_rates(spec):
+    with pytest.raises(ValueError, match="must be positive"):
+        parse_policies(spec)
+
+
+# --- MemoryRateLimitStore ---
+
+@pytest.mark.asyncio
+async def test_memory_store_allows_burst_then_limits_until_emission_interval():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(clock=clock)
+    policy = RateLimitPolicy("/api/stkpush", limit=5, period=60)  # one request every 12 s
+
+    burst = [await store.hit("1.2.3.4", policy) for _ in range(5)]
+    assert [result.allowed for result in burst] == [True] * 5
+    assert [result.remaining for result in burst] == [4, 3, 2, 1, 0]
+
+    denied = await store.hit("1.2.3.4", policy)
+    assert not denied.allowed
+    assert denied.retry_after == pytest.approx(12.0)
+
+    clock.advance(5)
+    assert (await store.hit("1.2.3.4", policy)).retry_after == pytest.approx(7.0)
+
+    clock.advance(7)
+    assert (await store.hit("1.2.3.4", policy)).allowed
+    assert not (await store.hit("1.2.3.4", policy)).allowed
+
+
+@pytest.mark.asyncio
+async def test_memory_store_keys_are_independent_and_idle_keys_evicted():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(sweep_interval=60, clock=clock)
+    policy = RateLimitPolicy("/api/stkpush", limit=1, period=10)
+
+    assert (await store.hit("a", policy)).allowed
+    assert not (await store.hit("a", policy)).allowed
+    assert (await store.hit("b", policy)).allowed
+    assert len(store) == 2
+
+    clock.advance(60)
+    assert (await store.hit("c", policy)).allowed
+    assert len(store) == 1
+
+
+# --- RedisRateLimitStore ---
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    """RedisRateLimitStore on fakeredis, and the clock its Lua script reads through TIME"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs EVAL scripts with lupa
+    clock = FakeClock(now=1_700_000_000.0)
+    monkeypatch.setattr(time, "time", clock)
+    return RedisRateLimitStore(fakeredis.FakeAsyncRedis()), clock
+
+
+async def hit_sequence(store, clock: FakeClock) -> list:
+    """(allowed, remaining, retry_after) for a fixed script of hits and clock steps"""
+    policy = RateLimitPolicy("/api/stkpush", limit=5, period=60)
+    steps = [0] * 6 + [5, 7, 0, 0.5, 60, 0]
+    results = []
+    for step in steps:
+        clock.advance(step)
+        result = await store.hit("1.2.3.4", policy)
+        results.append((result.allowed, result.remaining, round(result.retry_after, 3)))
+    return results
+
+
+@pytest.mark.asyncio
+async def test_redis_store_matches_memory_store(redis_store):
+    store, redis_clock = redis_store
+    memory_clock = FakeClock(now=redis_clock.now)
+
+    expected = await hit_sequence(MemoryRateLimitStore(clock=memory_clock), memory_clock)
+    assert await hit_sequence(store, redis_clock) == expected
+    assert expected[:6] == [(True, 4, 0.0), (True, 3, 0.0), (True, 2, 0.0), (True, 1, 0.0), (True, 0, 0.0), (False, 0, 12.0)]
+    assert expected[6:] == [(False, 0, 7.0), (True, 0, 0.0), (False, 0, 12.0), (False, 0, 11.5), (True, 4, 0.0), (True, 3, 0.0)]
+
+
+@pytest.mark.asyncio
+async def test_redis_store_keys_expire_with_their_tat(redis_store):
+    store, clock = redis_store
+    policy = RateLimitPolicy("/api/stkpush", limit=2, period=10)
+
+    await store.hit("1.2.3.4", policy)
+    assert await store.client.exists("ratelimit:1.2.3.4")
+    assert not await store.client.exists("ratelimit:5.6.7.8")
+
+    clock.advance(5.001)
+    assert not await store.client.exists("ratelimit:1.2.3.4")
+
+
+# --- RateLimitMiddleware ---
+
+def test_middleware_returns_429_with_retry_after_then_recovers():
+    clock = FakeClock()
+    client = make_client(MemoryRateLimitStore(clock=clock))
+
+    assert [client.post("/api/stkpush").status_code for _ in range(5)] == [200] * 5
+
+    clock.advance(0.5)
+    limited = client.post("/api/stkpush")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "12"  # 11.5 s, rounded up
+
+    assert client.get("/api/turfs").status_code == 200  # No policy for this path
+
+    clock.advance(11.5)
+    assert client.post("/api/stkpush").status_code == 200
+    assert client.post("/api/stkpush").status_code == 429
+
+
+def test_middleware_fails_open_when_store_raises(caplog):
+    client = make_client(BrokenStore())
+    with caplog.at_level(logging.WARNING, logger="app.middleware.rate_limit"):
+        responses = [client.post("/api/stkpush") for _ in range(10)]
+
+    assert [response.status_code for response in responses] == [200] * 10
+    assert "Rate limiter unavailable" in caplog.text
+    assert "store unreachable" in caplog.text
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Calendar as CalendarIcon, Clock, MapPin, CreditCard, Users, CheckCircle,
   Menu, X, Phone, Mail, Shield, DollarSign, BarChart,
@@ -25,6 +25,7 @@ import Navbar from './components/Navbar';
 import Footer from './components/Footer';
 import NotificationsPanel from './components/NotificationsPanel';
 import { getGoogleCalendarUrl } from './utils/calendarUtils';
+import { API_ENDPOINTS, buildApiUrl, fetchAllPages } from './config/api';
 
 // --- THEME DEFINITIONS ---
 
@@ -54,6 +55,9 @@ const monitorConnection = (callback) => {
   return () => {};
 };
 
+// How long to wait for the M-Pesa payment, matching the backend's PAYMENT_EVENTS_TIMEOUT
+const PAYMENT_WAIT_MS = 5 * 60 * 1000;
+
 // --- COMPONENT: MAIN APP ---
 
 function GoalHubApp() {
@@ -97,7 +101,10 @@ function GoalHubApp() {
   const [cartExtras, setCartExtras] = useState([]);
   const [customerDetails, setCustomerDetails] = useState({ name: '', phone: '', email: '', note: '' });
   const [confirmedBooking, setConfirmedBooking] = useState(null);
-  const [currentCheckoutRequestId, setCurrentCheckoutRequestId] = useState(null);
+  const paymentStream = useRef(null);  // EventSource of the payment being awaited
+
+  // Stop following a payment when the app unmounts
+  useEffect(() => () => paymentStream.current?.close(), []);
 
   // Admin/Manager Data
   const [dashboardTab, setDashboardTab] = useState('calendar');
@@ -334,15 +341,11 @@ function GoalHubApp() {
 
       try {
         setIsLoadingBookings(true);
-        const response = await fetch(buildApiUrl(API_ENDPOINTS.BOOKINGS), {
+        // The list is paginated (newest first); follow X-Next-Cursor to load all of it
+        const data = await fetchAllPages(`${API_ENDPOINTS.BOOKINGS}/`, {
           headers: { 'Authorization': `Bearer ${token}` }
         });
-        if (response.ok) {
-          const data = await response.json();
-          setBookings(data);
-        } else {
-          console.error('Failed to fetch bookings:', response.status);
-        }
+        setBookings(data);
       } catch (error) {
         console.error('Error fetching bookings:', error);
       } finally {
@@ -360,14 +363,9 @@ function GoalHubApp() {
     const fetchEvents = async () => {
       try {
         setIsLoadingEvents(true);
-        const response = await fetch(buildApiUrl(API_ENDPOINTS.EVENTS));
-        if (response.ok) {
-          const data = await response.json();
-          setEventsList(data);
-        } else {
-          console.error('Failed to fetch events:', response.status);
-          // Fallback to empty if failed, or handle error
-        }
+        // The list is paginated (oldest first); follow X-Next-Cursor to load all of it
+        const data = await fetchAllPages(`${API_ENDPOINTS.EVENTS}/`);
+        setEventsList(data);
       } catch (error) {
         console.error('Error fetching events:', error);
       } finally {
@@ -405,7 +403,9 @@ function GoalHubApp() {
 
       try {
         setIsLoadingNotifications(true);
-        const response = await fetch(buildApiUrl(API_ENDPOINTS.NOTIFICATIONS));
+        const response = await fetch(buildApiUrl(API_ENDPOINTS.NOTIFICATIONS), {
+          headers: { 'Authorization': `Bearer ${userProfile.token}` }
+        });
         if (response.ok) {
           const data = await response.json();
           setNotifications(data);
@@ -598,11 +598,13 @@ function GoalHubApp() {
       // Check if STK Push was successful
       if (data.ResponseCode === "0") {
         const checkoutRequestId = data.CheckoutRequestID;
-        setCurrentCheckoutRequestId(checkoutRequestId);  // Store for later
         showNotification("📱 Check your phone for M-Pesa prompt");
 
-        // Start polling for payment status
-        pollPaymentStatus(checkoutRequestId, custName);
+        // Hold the slot now; the payment callback confirms the booking
+        const booking = await reserveBooking(checkoutRequestId, custName);
+        if (booking) {
+          watchPayment(checkoutRequestId, booking, custName);
+        }
       } else {
         showNotification(`❌ Payment failed: ${data.ResponseDescription}`);
         setTimeout(() => navigateTo('checkout'), 3000);
@@ -614,47 +616,10 @@ function GoalHubApp() {
     }
   };
 
-  // Poll payment status until completed or timeout
-  const pollPaymentStatus = async (requestId, custName, attempts = 0) => {
-    const maxAttempts = 30; // Poll for up to 60 seconds (30 attempts × 2s interval)
-
-    if (attempts >= maxAttempts) {
-      showNotification("⏱️ Payment timeout. Please verify your M-Pesa messages.");
-      setTimeout(() => navigateTo('checkout'), 3000);
-      return;
-    }
-
-    try {
-      const response = await fetch(buildApiUrl(API_ENDPOINTS.PAYMENT_STATUS(requestId)));
-
-      if (response.ok) {
-        const data = await response.json();
-
-        if (data.status === 'completed') {
-          // Payment confirmed! Show success page with QR code
-          showNotification("✅ Payment successful!");
-          completeBooking(custName);
-        } else if (data.status === 'failed') {
-          // Payment failed
-          showNotification("❌ Payment was cancelled or failed. Please try again.");
-          setTimeout(() => navigateTo('checkout'), 3000);
-        } else {
-          // Still pending, poll again after 2 seconds
-          setTimeout(() => pollPaymentStatus(requestId, custName, attempts + 1), 2000);
-        }
-      } else {
-        // Status check failed, retry
-        setTimeout(() => pollPaymentStatus(requestId, custName, attempts + 1), 2000);
-      }
-    } catch {
-      // Network error during status check, retry
-      setTimeout(() => pollPaymentStatus(requestId, custName, attempts + 1), 2000);
-    }
-  };
-
-  const completeBooking = async (custName) => {
+  // Create the booking as pending, linked to the payment
+  const reserveBooking = async (checkoutRequestId, custName) => {
     const bookingData = {
-      turf_id: selectedTurf.id, // Ensure this maps to UUID if backend expects UUID, or handle mapping
+      turf_id: selectedTurf.id,
       date: bookingDate,
       time_slot: selectedTime,
       duration: duration,
@@ -665,41 +630,63 @@ function GoalHubApp() {
       extras: cartExtras
     };
 
-    try {
-      // Include checkout request ID if available
-      const url = currentCheckoutRequestId
-        ? buildApiUrl(API_ENDPOINTS.BOOKINGS_WITH_PAYMENT(currentCheckoutRequestId))
-        : buildApiUrl(API_ENDPOINTS.BOOKINGS);
+    const response = await fetch(buildApiUrl(API_ENDPOINTS.BOOKINGS_WITH_PAYMENT(checkoutRequestId)), {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${userProfile.token}`
+      },
+      body: JSON.stringify(bookingData)
+    });
 
-      const response = await fetch(url, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${userProfile.token}`
-        },
-        body: JSON.stringify(bookingData)
-      });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      console.error("Booking failed:", errorData);
+      showNotification(`❌ ${errorData.detail || 'Could not reserve this slot'}`);
+      setTimeout(() => navigateTo('checkout'), 3000);
+      return null;
+    }
+    return response.json();
+  };
 
-      if (response.ok) {
-        const newBooking = await response.json();
-        // Update local state with the returned booking from backend
-        setBookings([newBooking, ...bookings]);
-        setConfirmedBooking(newBooking);
+  // Follow the payment's status stream until it settles or we give up waiting
+  const watchPayment = (checkoutRequestId, booking, custName) => {
+    paymentStream.current?.close();
+    const source = new EventSource(buildApiUrl(API_ENDPOINTS.PAYMENT_EVENTS(checkoutRequestId)));
+    paymentStream.current = source;
+
+    const stop = () => {
+      clearTimeout(giveUp);
+      source.close();
+      if (paymentStream.current === source) paymentStream.current = null;
+    };
+
+    // The stream reconnects by itself after network errors (and resends the
+    // current status), so only stop once the server's wait would be over
+    const giveUp = setTimeout(() => {
+      stop();
+      showNotification("⏱️ Payment timeout. Please verify your M-Pesa messages.");
+      setTimeout(() => navigateTo('checkout'), 3000);
+    }, PAYMENT_WAIT_MS);
+
+    source.addEventListener('status', (event) => {
+      const { status } = JSON.parse(event.data);
+
+      if (status === 'completed') {
+        stop();
+        const confirmed = { ...booking, status: 'confirmed' };
+        showNotification("✅ Payment successful!");
+        setBookings(prev => [confirmed, ...prev.filter(b => b.id !== confirmed.id)]);
+        setConfirmedBooking(confirmed);
         setPendingAdminNotifications(prev => [...prev, `New Booking Confirmed! ${custName} @ ${selectedTurf.name}`]);
         navigateTo('success');
-      } else {
-        console.error("Booking failed:", await response.text());
-        showNotification("⚠️ Booking processed, but failed to save to server.");
-        // Fallback to local state just to show success screen
-        setConfirmedBooking({ ...bookingData, id: 'LOCAL-ERR', turf: selectedTurf.name });
-        navigateTo('success');
+      } else if (status === 'failed') {
+        stop();
+        showNotification("❌ Payment was cancelled or failed. Please try again.");
+        setTimeout(() => navigateTo('checkout'), 3000);
       }
-    } catch (error) {
-      console.error("Booking network error:", error);
-      showNotification("⚠️ Network error saving booking.");
-      setConfirmedBooking({ ...bookingData, id: 'NET-ERR', turf: selectedTurf.name });
-      navigateTo('success');
-    }
+      // 'pending' and 'expired' keep waiting: an expired payment still completes if paid late
+    });
   };
 
   // --- OTHER HANDLERS ---
@@ -33,6 +33,7 @@ export const API_ENDPOINTS = {
   STK_PUSH: '/api/stkpush',
   CALLBACK: '/api/callback',
   PAYMENT_STATUS: (checkoutRequestId) => `/api/payment-status/${checkoutRequestId}`,
+  PAYMENT_EVENTS: (checkoutRequestId) => `/api/payments/${checkoutRequestId}/events`,
 
   // Events
   EVENTS: '/api/events',
@@ -87,6 +88,34 @@ export const apiClient = async (endpoint, options = {}) => {
   }
 };
 
+/**
+ * Fetch every page of a cursor-paginated list endpoint.
+ * The backend returns one page per request and the cursor of the next
+ * page in the X-Next-Cursor header (absent on the last page).
+ * @param {string} endpoint - List endpoint path
+ * @param {object} options - Fetch options (e.g. Authorization header)
+ * @param {number} pageSize - Rows requested per page (backend maximum is 200)
+ * @returns {Promise<Array>} All rows, in the endpoint's order
+ */
+export const fetchAllPages = async (endpoint, options = {}, pageSize = 200) => {
+  const rows = [];
+  let cursor = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(pageSize) });
+    if (cursor) params.set('cursor', cursor);
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const response = await fetch(buildApiUrl(`${endpoint}${separator}${params}`), options);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    rows.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return rows;
+};
+
 /**
  * Get Authorization header with Firebase token
  * @param {string} token - Firebase ID token
@@ -103,5 +132,6 @@ export default {
   API_ENDPOINTS,
   buildApiUrl,
   apiClient,
+  fetchAllPages,
   getAuthHeader,
 };